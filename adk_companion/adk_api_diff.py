@@ -0,0 +1,208 @@
+"""
+ADK API 差异
+对比两棵 ADK 源码树（已安装的 site-packages 与本地解压的 wheel/sdist 目录）的符号表，
+计算新增、删除、移动和签名变化的公开符号，并按版本对缓存到磁盘，
+供 diff_adk_api、check_upstream_release 和 generate_evolution_pr 直接使用。
+"""
+
+import json
+import re
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .adk_manifest import atomic_write, get_cache_dir
+from .adk_symbols import SymbolTable, load_or_build_symbol_table
+
+API_DIFF_FORMAT_VERSION = 1
+API_DIFF_DIR_NAME = "api-diff"
+# 参与比较的符号属性
+COMPARED_FIELDS = ("kind", "signature", "bases", "fields", "decorators")
+VERSION_PATTERN = re.compile(r"""__version__\s*=\s*['"]([^'"]+)['"]""")
+
+
+def resolve_adk_root(path) -> Optional[Path]:
+    """
+    将用户给出的目录解析为 google/adk 包目录
+
+    支持直接给出包目录、wheel 解压目录（包含 google/adk）和 sdist 解压目录（包含 src/google/adk）。
+    """
+    path = Path(path).expanduser()
+    for candidate in (path, path / "google" / "adk", path / "src" / "google" / "adk"):
+        if (candidate / "__init__.py").exists() and (candidate / "version.py").exists():
+            return candidate
+    return None
+
+
+def read_tree_version(root: Path) -> str:
+    """从源码树中的 version.py 读取版本号，无法识别时返回 unknown"""
+    try:
+        match = VERSION_PATTERN.search((root / "version.py").read_text(encoding="utf-8"))
+    except OSError:
+        return "unknown"
+    return match.group(1) if match else "unknown"
+
+
+def is_public(qualname: str, package: str) -> bool:
+    """限定名中任何一段以下划线开头（__init__ 等双下划线方法除外）即视为非公开"""
+    for part in qualname[len(package) + 1:].split("."):
+        if part.startswith("_") and not (part.startswith("__") and part.endswith("__")):
+            return False
+    return True
+
+
+def public_api(table: SymbolTable) -> Dict[str, dict]:
+    """提取符号表中的公开符号，限定名 → 用于比较的属性"""
+    api = {}
+    for symbol in table.symbols:
+        if not is_public(symbol["qualname"], table.package):
+            continue
+        entry = {field: symbol[field] for field in COMPARED_FIELDS}
+        entry["file"] = symbol["file"]
+        api[symbol["qualname"]] = entry
+    return api
+
+
+def diff_api(old: Dict[str, dict], new: Dict[str, dict]) -> dict:
+    """
+    对比两份公开 API
+
+    只在一侧出现、但短名称和类型在另一侧唯一对应的符号视为移动（moved），
+    其余分别计入新增（added）和删除（removed）；两侧都存在且属性不同的计入变化（changed）。
+    """
+    added_names = sorted(set(new) - set(old))
+    removed_names = sorted(set(old) - set(new))
+
+    def by_short_name(names, api):
+        groups: Dict[tuple, List[str]] = {}
+        for name in names:
+            groups.setdefault((name.rsplit(".", 1)[-1], api[name]["kind"]), []).append(name)
+        return groups
+
+    added_groups = by_short_name(added_names, new)
+    removed_groups = by_short_name(removed_names, old)
+    moved = []
+    for key, sources in removed_groups.items():
+        targets = added_groups.get(key, [])
+        if len(sources) == 1 and len(targets) == 1:
+            moved.append({
+                "from": sources[0],
+                "to": targets[0],
+                "kind": key[1],
+                "old_signature": old[sources[0]]["signature"],
+                "new_signature": new[targets[0]]["signature"],
+            })
+    moved_from = {item["from"] for item in moved}
+    moved_to = {item["to"] for item in moved}
+
+    changed = []
+    for name in sorted(set(old) & set(new)):
+        differences = {
+            field: {"old": old[name][field], "new": new[name][field]}
+            for field in COMPARED_FIELDS
+            if old[name][field] != new[name][field]
+        }
+        if differences:
+            changed.append({"qualname": name, "file": new[name]["file"], "changes": differences})
+
+    added = [dict(new[name], qualname=name) for name in added_names if name not in moved_to]
+    removed = [dict(old[name], qualname=name) for name in removed_names if name not in moved_from]
+    return {
+        "summary": {"added": len(added), "removed": len(removed), "moved": len(moved), "changed": len(changed)},
+        "added": added,
+        "removed": removed,
+        "moved": moved,
+        "changed": changed,
+    }
+
+
+def get_diff_path(old_version: str, new_version: str) -> Path:
+    return get_cache_dir() / API_DIFF_DIR_NAME / f"{old_version}__{new_version}.json"
+
+
+def load_cached_diff(old_version: str, new_version: str) -> Optional[dict]:
+    """读取已缓存的版本对差异，不存在或格式不兼容时返回 None"""
+    if "unknown" in (old_version, new_version):
+        return None
+    try:
+        with open(get_diff_path(old_version, new_version), "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception:
+        return None
+    if data.get("format") != API_DIFF_FORMAT_VERSION:
+        return None
+    return data
+
+
+def save_diff(diff: dict):
+    path = get_diff_path(diff["old_version"], diff["new_version"])
+    with atomic_write(path) as f:
+        json.dump(diff, f, ensure_ascii=False)
+
+
+def compute_api_diff(old_root, new_root, use_cache: bool = True) -> dict:
+    """
+    计算两棵 ADK 源码树之间的公开 API 差异
+
+    两侧的符号表都按版本持久化并增量维护（新版本以旧版本为起点，只解析变化的文件）；
+    版本号都已知时，差异结果按版本对缓存，已发布版本的内容不会再变化。
+    """
+    old_root = resolve_adk_root(old_root)
+    new_root = resolve_adk_root(new_root)
+    if old_root is None or new_root is None:
+        raise ValueError("未找到 google/adk 源码目录（需要包含 __init__.py 和 version.py）")
+
+    old_version = read_tree_version(old_root)
+    new_version = read_tree_version(new_root)
+    if use_cache:
+        cached = load_cached_diff(old_version, new_version)
+        if cached is not None:
+            cached["cached"] = True
+            return cached
+
+    old_table = load_or_build_symbol_table(old_root, old_version)
+    new_table = load_or_build_symbol_table(new_root, new_version)
+    diff = diff_api(public_api(old_table), public_api(new_table))
+    diff.update({
+        "format": API_DIFF_FORMAT_VERSION,
+        "old_version": old_version,
+        "new_version": new_version,
+        "old_root": str(old_root),
+        "new_root": str(new_root),
+    })
+    if "unknown" not in (old_version, new_version):
+        try:
+            save_diff(diff)
+        except OSError as e:
+            print(f"[adk_api_diff] 差异缓存写入失败: {e}")
+    diff["cached"] = False
+    return diff
+
+
+def format_diff_markdown(diff: dict, limit: int = 30) -> str:
+    """将 API 差异渲染为 Markdown，用于 PR 描述"""
+    summary = diff["summary"]
+    lines = [
+        f"### ADK API changes ({diff['old_version']} → {diff['new_version']})",
+        "",
+        f"Added: {summary['added']}, Removed: {summary['removed']}, "
+        f"Moved: {summary['moved']}, Changed: {summary['changed']}",
+    ]
+    sections = [
+        ("Added", [f"`{item['qualname']}` — `{item['signature']}`" for item in diff["added"]]),
+        ("Removed", [f"`{item['qualname']}`" for item in diff["removed"]]),
+        ("Moved", [f"`{item['from']}` → `{item['to']}`" for item in diff["moved"]]),
+        ("Changed", [
+            f"`{item['qualname']}`: " + "; ".join(
+                f"{field} `{change['old']}` → `{change['new']}`" for field, change in item["changes"].items()
+            )
+            for item in diff["changed"]
+        ]),
+    ]
+    for title, entries in sections:
+        if not entries:
+            continue
+        lines += ["", f"#### {title}"]
+        lines += [f"- {entry}" for entry in entries[:limit]]
+        if len(entries) > limit:
+            lines.append(f"- ... and {len(entries) - limit} more")
+    return "\n".join(lines)
@@ -0,0 +1,126 @@
+"""
+ADK 索引并行构建
+将源码文件列表分片后交给 ProcessPoolExecutor，在多个进程中完成读取、哈希、分词、
+trigram 提取和 AST 解析，再由调用方按文件顺序合并各分片的结果，冷启动时用满所有 CPU 核心。
+
+构建通常发生在导入包时启动的后台预加载线程里，此时进程中已有多个线程，
+fork 出的子进程可能继承被其他线程持有的锁而死锁，因此进程池固定使用 spawn 方式启动。
+索引和符号表的构建共用同一个进程池，总进程数不超过 get_worker_count()，
+最后一个使用者结束后关闭进程池，不常驻空闲进程。
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from itertools import repeat
+from pathlib import Path
+from typing import List, Optional
+
+# 文件数较少时进程启动和结果回传的开销大于收益，直接在当前进程中处理
+MIN_FILES_FOR_POOL = 64
+# 每个进程分到多个较小的分片，避免个别大文件拖慢整体进度
+SHARDS_PER_WORKER = 4
+
+
+def get_worker_count() -> int:
+    """获取并行构建使用的进程数（可通过 ADK_INDEX_WORKERS 环境变量覆盖）"""
+    workers = os.getenv("ADK_INDEX_WORKERS")
+    if workers:
+        try:
+            return max(1, int(workers))
+        except ValueError:
+            pass
+    return os.cpu_count() or 1
+
+
+_pool_lock = threading.Lock()
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_users = 0
+
+
+@contextmanager
+def _shared_pool(workers: int):
+    """获取进程内共享的 spawn 进程池，第一个使用者按 workers 创建，最后一个使用者退出时关闭"""
+    global _pool, _pool_users
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        _pool_users += 1
+        pool = _pool
+    try:
+        yield pool
+    except BrokenProcessPool:
+        # 进程池已损坏，丢弃后下一次构建会重新创建
+        with _pool_lock:
+            if _pool is pool:
+                _pool = None
+        pool.shutdown(wait=False)
+        raise
+    finally:
+        with _pool_lock:
+            _pool_users -= 1
+            if _pool_users == 0 and _pool is pool:
+                _pool = None
+                pool.shutdown(wait=False)
+
+
+def analyze_file(root: str, rel_path: str, kind: str, package: str):
+    """
+    分析单个源码文件
+
+    Returns:
+        kind="index" 时为 (相对路径, 清单条目, token → 行号, trigram 集合)；
+        kind="symbols" 时为 (相对路径, 清单条目, 符号列表, 引用列表)；文件不可读时返回 None
+    """
+    from .adk_manifest import read_source
+
+    try:
+        content, entry = read_source(Path(root) / rel_path)
+    except (OSError, UnicodeDecodeError):
+        return None
+    if kind == "index":
+        from .adk_index import extract_trigrams, index_file_content
+        return rel_path, entry, index_file_content(content), extract_trigrams(content)
+
+    from .adk_symbols import extract_module, module_name_for
+    try:
+        symbols, references = extract_module(content, module_name_for(rel_path, package), rel_path)
+    except SyntaxError:
+        symbols, references = [], []
+    return rel_path, entry, symbols, references
+
+
+def _analyze_shard(root: str, rel_paths: List[str], kind: str, package: str) -> list:
+    return [analyze_file(root, rel_path, kind, package) for rel_path in rel_paths]
+
+
+def analyze_files(
+    root: Path,
+    rel_paths: List[str],
+    kind: str,
+    package: str = "google.adk",
+    workers: Optional[int] = None
+) -> list:
+    """
+    分析一批源码文件，文件足够多时分片到进程池并行处理
+
+    返回结果与 rel_paths 顺序一致，因此合并后的文件编号与单进程构建完全相同。
+    """
+    workers = workers or get_worker_count()
+    if workers <= 1 or len(rel_paths) < MIN_FILES_FOR_POOL:
+        return _analyze_shard(str(root), rel_paths, kind, package)
+
+    shard_size = max(1, -(-len(rel_paths) // (workers * SHARDS_PER_WORKER)))
+    shards = [rel_paths[i:i + shard_size] for i in range(0, len(rel_paths), shard_size)]
+    try:
+        results = []
+        with _shared_pool(workers) as pool:
+            for shard_results in pool.map(_analyze_shard, repeat(str(root)), shards, repeat(kind), repeat(package)):
+                results.extend(shard_results)
+        return results
+    except (OSError, RuntimeError, BrokenProcessPool) as e:
+        print(f"[adk_builder] 进程池不可用，改为单进程构建: {e}")
+        return _analyze_shard(str(root), rel_paths, kind, package)
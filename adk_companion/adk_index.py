@@ -0,0 +1,624 @@
+"""
+ADK 源码倒排索引
+为 read_adk_codebase 提供持久化的 token → 文件/行号 倒排索引，
+每个已安装的 google-adk 版本只构建一次，之后的查询直接走索引。
+同时维护 trigram → 文件 索引，用于子串和正则查询前缩小候选文件范围。
+关键词查询按 BM25 排序，只返回命中行附近的代码窗口（带行号）。
+所有查询都以生成器逐个产出结果，可以在达到结果数或时间预算时提前结束。
+"""
+
+import heapq
+import json
+import math
+import multiprocessing
+import re
+import threading
+import time
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+try:
+    import re._parser as sre_parse
+    from re import _constants as sre_constants
+except ImportError:  # Python < 3.11
+    import sre_parse
+    import sre_constants
+
+from .adk_builder import analyze_files
+from .adk_manifest import atomic_write, get_adk_version, iter_source_files, load_incremental
+
+# 索引文件格式版本，结构变化时递增以触发重建
+INDEX_FORMAT_VERSION = 4
+INDEX_FILE_NAME = "inverted_index.json"
+
+TOKEN_PATTERN = re.compile(r"[A-Za-z0-9_]+")
+
+# BM25 参数
+BM25_K1 = 1.2
+BM25_B = 0.75
+# 每个文件最多返回的代码窗口数
+MAX_SNIPPET_WINDOWS = 2
+# 查询词不在词表中时，最多扩展到多少个包含它的词
+MAX_TERM_EXPANSIONS = 20
+# 不建索引、查询时按文件流式扫描的 ADK 资源文件
+RESOURCE_SUFFIXES = (".md", ".json")
+
+
+def tokenize(text: str) -> List[str]:
+    """将文本切分为小写 token（标识符、数字）"""
+    return [token.lower() for token in TOKEN_PATTERN.findall(text)]
+
+
+def index_file_content(content: str) -> Dict[str, List[int]]:
+    """为单个文件生成 token → 行号列表"""
+    token_lines: Dict[str, List[int]] = {}
+    for line_no, line in enumerate(content.splitlines(), start=1):
+        for token in set(tokenize(line)):
+            token_lines.setdefault(token, []).append(line_no)
+    return token_lines
+
+
+def extract_trigrams(text: str) -> Set[str]:
+    """提取文本（小写后）中出现的所有 trigram"""
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def plan_regex(pattern: str, flags: int = 0):
+    """
+    将正则表达式转换为 trigram 查询计划，只保留匹配时必然出现的字面量。
+
+    查询计划是嵌套的元组：("lit", 字面量) / ("and", [子计划]) / ("or", [子计划]) / ("all",)
+    """
+    return _plan_sequence(sre_parse.parse(pattern, flags))
+
+
+def _plan_sequence(parsed):
+    parts = []
+    run: List[str] = []
+
+    def flush():
+        if run:
+            parts.append(("lit", "".join(run)))
+            run.clear()
+
+    for op, av in parsed:
+        if op is sre_constants.LITERAL:
+            run.append(chr(av))
+        elif op is sre_constants.AT:
+            # ^、$、\b 等零宽断言不消耗字符，不打断字面量
+            continue
+        elif op is sre_constants.SUBPATTERN:
+            flush()
+            parts.append(_plan_sequence(av[-1]))
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) or op is getattr(sre_constants, "POSSESSIVE_REPEAT", None):
+            flush()
+            min_count, _, sub = av
+            if min_count >= 1:
+                parts.append(_plan_sequence(sub))
+        elif op is sre_constants.BRANCH:
+            flush()
+            parts.append(("or", [_plan_sequence(branch) for branch in av[1]]))
+        else:
+            # 字符集、任意字符、反向引用等无法提供确定的字面量
+            flush()
+    flush()
+    if not parts:
+        return ("all",)
+    return parts[0] if len(parts) == 1 else ("and", parts)
+
+
+def scan_keyword(root: Path, keyword: str, max_results: int = 10) -> List[str]:
+    """不使用索引，逐个文件读取并匹配关键词（索引不可用时的兜底实现）"""
+    results = []
+    needle = keyword.lower()
+    for rel_path, path in iter_source_files(root):
+        if len(results) >= max_results:
+            break
+        try:
+            content = path.read_text(encoding="utf-8")
+        except Exception:
+            continue
+        if needle in content.lower():
+            results.append(f"文件: {rel_path}\n{content[:500]}...")
+    return results
+
+
+def format_snippets(
+    rel_path: str,
+    content: str,
+    hit_lines,
+    context_lines: int = 2,
+    score: Optional[float] = None
+) -> Optional[str]:
+    """
+    将命中行扩展为前后 context_lines 行的代码窗口，重叠的窗口会合并
+
+    命中行越多的窗口越优先，每个文件最多保留 MAX_SNIPPET_WINDOWS 个窗口，命中行以 ">" 标记。
+    """
+    if not hit_lines:
+        return None
+    lines = content.splitlines()
+    hits = sorted(line_no for line_no in set(hit_lines) if 1 <= line_no <= len(lines))
+    if not hits:
+        return None
+
+    # 密集命中时不无限合并，单个窗口最多约为两个独立窗口的长度
+    max_span = 2 * (2 * context_lines + 1)
+    windows = []
+    for line_no in hits:
+        start, end = max(1, line_no - context_lines), min(len(lines), line_no + context_lines)
+        if windows and start <= windows[-1][1] + 1 and end - windows[-1][0] < max_span:
+            windows[-1][1] = max(windows[-1][1], end)
+            windows[-1][2] += 1
+        else:
+            windows.append([start, end, 1])
+    windows = sorted(heapq.nlargest(MAX_SNIPPET_WINDOWS, windows, key=lambda w: (w[2], -w[0])))
+
+    hit_set = set(hits)
+    width = len(str(windows[-1][1]))
+    header = f"文件: {rel_path}" + (f" (BM25 {score:.2f})" if score is not None else "")
+    parts = [header]
+    for start, end, _ in windows:
+        if len(parts) > 1:
+            parts.append("  ...")
+        for line_no in range(start, end + 1):
+            marker = ">" if line_no in hit_set else " "
+            parts.append(f"{marker} {line_no:>{width}} | {lines[line_no - 1]}")
+    return "\n".join(parts)
+
+
+def regex_hit_lines(content: str, regex) -> List[int]:
+    """返回正则在文件中每处匹配起始位置所在的行号"""
+    return [content.count("\n", 0, match.start()) + 1 for match in regex.finditer(content)]
+
+
+def keyword_hit_lines(content: str, keyword: str) -> List[int]:
+    """返回包含任一查询词（无法切分时为整个关键词）的行号，大小写不敏感"""
+    needles = list(dict.fromkeys(tokenize(keyword))) or [keyword.lower()]
+    return [
+        line_no for line_no, line in enumerate(content.lower().splitlines(), start=1)
+        if any(needle in line for needle in needles)
+    ]
+
+
+class SearchBudget:
+    """
+    查询的时间预算，生成器在读取每个文件前检查，超时后停止产出并标记为部分结果。
+    seconds 为 None 表示不限时；0 或负数没有意义，直接拒绝，避免被误当作不限时。
+    """
+
+    def __init__(self, seconds: Optional[float] = None):
+        if seconds is not None and seconds <= 0:
+            raise ValueError(f"时间预算必须为正数: {seconds}")
+        self.deadline = time.monotonic() + seconds if seconds is not None else None
+        self.exhausted = False
+
+    def remaining(self) -> Optional[float]:
+        """剩余秒数，不限时返回 None"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def expired(self) -> bool:
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            self.exhausted = True
+        return self.exhausted
+
+
+def iter_scan(
+    files,
+    hit_lines_fn,
+    context_lines: int = 2,
+    budget: Optional[SearchBudget] = None
+) -> Iterator[str]:
+    """逐个读取 (相对路径, 绝对路径) 并产出命中片段，时间预算耗尽时提前结束"""
+    for rel_path, path in files:
+        if budget is not None and budget.expired():
+            return
+        try:
+            content = path.read_text(encoding="utf-8")
+        except Exception:
+            continue
+        hit = format_snippets(rel_path, content, hit_lines_fn(content), context_lines)
+        if hit:
+            yield hit
+
+
+def scan_regex(root: Path, pattern: str, max_results: int = 10, context_lines: int = 2) -> List[str]:
+    """不使用索引，逐个文件执行正则匹配（索引不可用时的兜底实现）"""
+    regex = re.compile(pattern, re.MULTILINE)
+    return list(islice(
+        iter_scan(iter_source_files(root), lambda content: regex_hit_lines(content, regex), context_lines),
+        max_results,
+    ))
+
+
+def stream_search(
+    root: Path,
+    keyword: str,
+    regex: bool = False,
+    context_lines: int = 2,
+    suffixes: Tuple[str, ...] = (".py",) + RESOURCE_SUFFIXES,
+    index: Optional["AdkIndex"] = None,
+    budget: Optional[SearchBudget] = None,
+    max_results: int = 10
+) -> Iterator[str]:
+    """
+    流式搜索 ADK 包：先产出 .py 源码的命中（有索引时按 BM25 / trigram 候选，否则逐文件扫描），
+    再逐个扫描 .md、.json 等资源文件；调用方取够结果或预算耗尽后生成器即停止读取文件。
+    """
+    if regex:
+        compiled = re.compile(keyword, re.MULTILINE)
+        hit_lines_fn = lambda content: regex_hit_lines(content, compiled)
+    else:
+        hit_lines_fn = lambda content: keyword_hit_lines(content, keyword)
+
+    if ".py" in suffixes:
+        if index is None:
+            yield from iter_scan(iter_source_files(root), hit_lines_fn, context_lines, budget)
+        elif regex:
+            yield from index.iter_search_regex(keyword, context_lines, budget)
+        else:
+            yield from index.iter_search(keyword, max_results, context_lines, budget)
+
+    resource_suffixes = tuple(suffix for suffix in suffixes if suffix != ".py")
+    if resource_suffixes:
+        yield from iter_scan(iter_source_files(root, resource_suffixes), hit_lines_fn, context_lines, budget)
+
+
+class AdkIndex:
+    """ADK 源码索引：token → [文件编号, 行号...]，trigram → {文件编号}"""
+
+    def __init__(
+        self,
+        root: Path,
+        version: str,
+        files: List[str],
+        postings: Dict[str, Dict[int, List[int]]],
+        trigrams: Dict[str, Set[int]],
+        manifest: Dict[str, dict],
+        doc_lengths: List[int]
+    ):
+        self.root = Path(root)
+        self.version = version
+        self.files = files
+        self.postings = postings
+        self.trigrams = trigrams
+        self.manifest = manifest
+        # 每个文件的长度（token 在各行出现次数之和），用于 BM25 长度归一化
+        self.doc_lengths = doc_lengths
+        self.refresh_stats: dict = {}
+
+    def _add_file(self, file_id: int, token_lines: Dict[str, List[int]], trigrams: Set[str]):
+        for token, lines in token_lines.items():
+            self.postings.setdefault(token, {})[file_id] = lines
+        for trigram in trigrams:
+            self.trigrams.setdefault(trigram, set()).add(file_id)
+        doc_length = sum(len(lines) for lines in token_lines.values())
+        if file_id < len(self.doc_lengths):
+            self.doc_lengths[file_id] = doc_length
+        else:
+            self.doc_lengths.append(doc_length)
+
+    @classmethod
+    def build(cls, root: Path, version: str, workers: Optional[int] = None) -> "AdkIndex":
+        """全量构建索引，文件较多时分片到多个进程并行分析"""
+        index = cls(root, version, [], {}, {}, {}, [])
+        rel_paths = [rel_path for rel_path, _ in iter_source_files(root)]
+        for result in analyze_files(root, rel_paths, "index", workers=workers):
+            if result is None:
+                continue
+            rel_path, entry, token_lines, trigrams = result
+            index.manifest[rel_path] = entry
+            index.files.append(rel_path)
+            index._add_file(len(index.files) - 1, token_lines, trigrams)
+        return index
+
+    def update(self, changed: List[str], removed: List[str], manifest: Dict[str, dict]):
+        """只重新索引变化的文件，并移除已删除文件的倒排条目"""
+        file_ids = {rel_path: file_id for file_id, rel_path in enumerate(self.files)}
+        stale = {file_ids[rel_path] for rel_path in list(changed) + list(removed) if rel_path in file_ids}
+        if stale:
+            for table in (self.postings, self.trigrams):
+                for key in list(table):
+                    entries = table[key]
+                    for file_id in stale:
+                        if isinstance(entries, set):
+                            entries.discard(file_id)
+                        else:
+                            entries.pop(file_id, None)
+                    if not entries:
+                        del table[key]
+
+        if removed:
+            # 压缩文件编号，保持 files 列表中没有空洞
+            removed_set = set(removed)
+            remap = {}
+            kept = []
+            for file_id, rel_path in enumerate(self.files):
+                if rel_path not in removed_set:
+                    remap[file_id] = len(kept)
+                    kept.append(rel_path)
+            self.files = kept
+            self.doc_lengths = [self.doc_lengths[file_id] for file_id in sorted(remap)]
+            self.postings = {
+                token: {remap[file_id]: lines for file_id, lines in entries.items()}
+                for token, entries in self.postings.items()
+            }
+            self.trigrams = {trigram: {remap[file_id] for file_id in ids} for trigram, ids in self.trigrams.items()}
+            file_ids = {rel_path: file_id for file_id, rel_path in enumerate(self.files)}
+
+        for rel_path, result in zip(changed, analyze_files(self.root, list(changed), "index")):
+            if result is None:
+                manifest.pop(rel_path, None)
+                continue
+            _, manifest[rel_path], token_lines, trigrams = result
+            if rel_path not in file_ids:
+                file_ids[rel_path] = len(self.files)
+                self.files.append(rel_path)
+            self._add_file(file_ids[rel_path], token_lines, trigrams)
+        self.manifest = manifest
+
+    @classmethod
+    def load(cls, index_path: Path, root: Path) -> Optional["AdkIndex"]:
+        """从磁盘加载索引，格式不兼容时返回 None"""
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception:
+            return None
+        if data.get("format") != INDEX_FORMAT_VERSION:
+            return None
+        postings = {
+            token: {entry[0]: entry[1:] for entry in entries}
+            for token, entries in data["postings"].items()
+        }
+        trigrams = {trigram: set(file_ids) for trigram, file_ids in data["trigrams"].items()}
+        return cls(root, data["version"], data["files"], postings, trigrams, data["manifest"], data["doc_lengths"])
+
+    def save(self, index_path: Path):
+        """原子地写入索引文件"""
+        data = {
+            "format": INDEX_FORMAT_VERSION,
+            "version": self.version,
+            "root": str(self.root),
+            "files": self.files,
+            "postings": {
+                token: [[file_id] + lines for file_id, lines in entries.items()]
+                for token, entries in self.postings.items()
+            },
+            "trigrams": {trigram: sorted(file_ids) for trigram, file_ids in self.trigrams.items()},
+            "manifest": self.manifest,
+            "doc_lengths": self.doc_lengths,
+        }
+        with atomic_write(index_path) as f:
+            json.dump(data, f, separators=(",", ":"))
+
+    def _query_terms(self, keyword: str) -> List[str]:
+        """
+        将关键词转换为词表中的查询词
+
+        词表中存在的 token 直接使用；不存在时（例如 "agent" 只出现在 "llmagent" 中）
+        扩展为包含它的、文档频率最高的若干个词。
+        """
+        terms = []
+        for token in dict.fromkeys(tokenize(keyword)):
+            if token in self.postings:
+                terms.append(token)
+                continue
+            if hasattr(self.postings, "keys_containing"):
+                # 知识包中的词表直接在键数据上查找子串
+                expansions = self.postings.keys_containing(token)
+            else:
+                expansions = [t for t in self.postings if token in t]
+            terms.extend(heapq.nlargest(MAX_TERM_EXPANSIONS, expansions, key=lambda t: len(self.postings[t])))
+        return list(dict.fromkeys(terms))
+
+    def rank(self, keyword: str, max_results: int = 10) -> List[tuple]:
+        """
+        按 BM25 对文件打分
+
+        Returns:
+            [(文件编号, 分数, 命中行号集合)]，按分数从高到低排列
+        """
+        terms = self._query_terms(keyword)
+        if not terms or not self.files:
+            return []
+        total_files = len(self.files)
+        avg_length = (sum(self.doc_lengths) / total_files) or 1.0
+        scores: Dict[int, float] = {}
+        hits: Dict[int, Set[int]] = {}
+        for term in terms:
+            entries = self.postings[term]
+            idf = math.log(1 + (total_files - len(entries) + 0.5) / (len(entries) + 0.5))
+            for file_id, lines in entries.items():
+                tf = len(lines)
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[file_id] / avg_length)
+                scores[file_id] = scores.get(file_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+                hits.setdefault(file_id, set()).update(lines)
+        top = heapq.nlargest(max_results, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [(file_id, score, hits[file_id]) for file_id, score in top]
+
+    def _literal_candidates(self, literal: str) -> Optional[Set[int]]:
+        """字面量所有 trigram 对应文件集合的交集，字面量过短时返回 None（表示不限制）"""
+        if len(literal) < 3:
+            return None
+        candidates = None
+        for trigram in extract_trigrams(literal):
+            file_ids = self.trigrams.get(trigram)
+            if not file_ids:
+                return set()
+            candidates = set(file_ids) if candidates is None else candidates & file_ids
+            if not candidates:
+                break
+        return candidates
+
+    def _evaluate_plan(self, plan) -> Optional[Set[int]]:
+        """执行正则查询计划，返回候选文件集合，None 表示无法缩小范围"""
+        kind = plan[0]
+        if kind == "lit":
+            return self._literal_candidates(plan[1])
+        if kind == "and":
+            candidates = None
+            for sub_plan in plan[1]:
+                sub = self._evaluate_plan(sub_plan)
+                if sub is not None:
+                    candidates = sub if candidates is None else candidates & sub
+            return candidates
+        if kind == "or":
+            candidates = set()
+            for sub_plan in plan[1]:
+                sub = self._evaluate_plan(sub_plan)
+                if sub is None:
+                    return None
+                candidates |= sub
+            return candidates
+        return None
+
+    def candidate_files(self, keyword: str) -> List[int]:
+        """根据关键词的 trigram 求交集，得到可能包含该子串的文件编号（关键词过短时返回全部文件）"""
+        candidates = self._literal_candidates(keyword)
+        if candidates is None:
+            return list(range(len(self.files)))
+        return sorted(candidates)
+
+    def _read(self, file_id: int) -> Optional[str]:
+        try:
+            return (self.root / self.files[file_id]).read_text(encoding="utf-8")
+        except Exception:
+            return None
+
+    def iter_search(
+        self,
+        keyword: str,
+        max_results: int = 10,
+        context_lines: int = 2,
+        budget: Optional[SearchBudget] = None
+    ) -> Iterator[str]:
+        """
+        按 BM25 排序逐个产出最相关的文件，每个文件只附带命中行附近的代码窗口
+
+        关键词无法切分为 token 时（例如纯中文或符号），退回 trigram 子串匹配。
+        """
+        ranked = self.rank(keyword, max_results)
+        if ranked:
+            for file_id, score, hit_lines in ranked:
+                if budget is not None and budget.expired():
+                    return
+                content = self._read(file_id)
+                snippet = content and format_snippets(self.files[file_id], content, hit_lines, context_lines, score)
+                if snippet:
+                    yield snippet
+            return
+
+        needle = keyword.lower()
+        if not needle.strip():
+            return
+        for file_id in self.candidate_files(keyword):
+            if budget is not None and budget.expired():
+                return
+            content = self._read(file_id)
+            if not content or needle not in content.lower():
+                continue
+            hit_lines = [i for i, line in enumerate(content.splitlines(), start=1) if needle in line.lower()]
+            snippet = format_snippets(self.files[file_id], content, hit_lines, context_lines)
+            if snippet:
+                yield snippet
+
+    def search(self, keyword: str, max_results: int = 10, context_lines: int = 2) -> List[str]:
+        return list(islice(self.iter_search(keyword, max_results, context_lines), max_results))
+
+    def iter_search_regex(
+        self,
+        pattern: str,
+        context_lines: int = 2,
+        budget: Optional[SearchBudget] = None
+    ) -> Iterator[str]:
+        """通过 trigram 查询计划缩小候选文件，再用正则确认并逐个产出匹配片段"""
+        regex = re.compile(pattern, re.MULTILINE)
+        candidates = self._evaluate_plan(plan_regex(pattern, re.MULTILINE))
+        file_ids = range(len(self.files)) if candidates is None else sorted(candidates)
+        for file_id in file_ids:
+            if budget is not None and budget.expired():
+                return
+            content = self._read(file_id)
+            if content is None:
+                continue
+            hit = format_snippets(self.files[file_id], content, regex_hit_lines(content, regex), context_lines)
+            if hit:
+                yield hit
+
+    def search_regex(self, pattern: str, max_results: int = 10, context_lines: int = 2) -> List[str]:
+        return list(islice(self.iter_search_regex(pattern, context_lines), max_results))
+
+
+_index_lock = threading.Lock()
+_index: Optional[AdkIndex] = None
+
+
+def load_or_build_index(root: Path, version: Optional[str] = None) -> AdkIndex:
+    """加载当前版本的索引并按清单增量刷新，没有可用索引时全量构建"""
+    version = version or get_adk_version()
+    return load_incremental(
+        root,
+        version,
+        INDEX_FILE_NAME,
+        loader=lambda path: AdkIndex.load(path, root),
+        builder=lambda: AdkIndex.build(root, version),
+        label="adk_index",
+    )
+
+
+def get_adk_index(root: Path) -> AdkIndex:
+    """获取进程内共享的 ADK 索引（优先使用知识包，否则首次调用时加载或构建）"""
+    global _index
+    with _index_lock:
+        if _index is None or _index.root != Path(root):
+            from .adk_pack import get_knowledge_pack
+            pack = get_knowledge_pack(Path(root))
+            _index = pack.index() if pack else load_or_build_index(Path(root))
+        return _index
+
+
+_loader_lock = threading.Lock()
+_loader: Optional[threading.Thread] = None
+
+
+def _load_in_background(root: Path):
+    try:
+        get_adk_index(root)
+    except Exception as e:
+        print(f"[adk_index] 后台加载索引失败: {e}")
+
+
+def _start_loader(root: Path) -> threading.Thread:
+    """启动后台加载线程，已有线程在运行时直接复用"""
+    global _loader
+    with _loader_lock:
+        if _loader is None or not _loader.is_alive():
+            _loader = threading.Thread(target=_load_in_background, args=(root,), name="adk-index-preload", daemon=True)
+            _loader.start()
+        return _loader
+
+
+def get_adk_index_within(root: Path, timeout: Optional[float]) -> Optional[AdkIndex]:
+    """
+    在 timeout 秒内获取共享索引：尚未就绪时交给后台线程加载或构建，本次调用最多等待 timeout 秒，
+    超时（或加载失败）返回 None，调用方退回逐文件扫描，冷启动构建不会吃掉查询的时间预算
+    """
+    root = Path(root)
+    index = _index
+    if index is None or index.root != root:
+        _start_loader(root).join(timeout)
+        index = _index
+    return index if index is not None and index.root == root else None
+
+
+def preload_adk_index(root: Optional[Path]):
+    """在后台线程中预加载索引，避免首次查询时才付出构建开销"""
+    if not root or multiprocessing.parent_process() is not None:
+        # 并行构建的工作进程也会导入本包，不应在其中再次预加载
+        return None
+    return _start_loader(Path(root))
@@ -0,0 +1,186 @@
+"""
+ADK 源码清单（manifest）与增量索引维护
+记录每个源码文件的路径、mtime、大小和内容哈希，启动时只重新索引发生变化的文件，
+google-adk 原地升级后可以基于上一个版本的索引增量更新，而不必全量重建。
+"""
+
+import hashlib
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+def get_cache_dir() -> Path:
+    """获取索引缓存根目录（可通过 ADK_COMPANION_CACHE_DIR 环境变量覆盖）"""
+    cache_dir = os.getenv("ADK_COMPANION_CACHE_DIR")
+    if cache_dir:
+        return Path(cache_dir)
+    return Path.home() / ".cache" / "adk_companion"
+
+
+@contextmanager
+def atomic_write(path: Path, mode: str = "w"):
+    """
+    原子地写入文件：先写到同目录下唯一命名的临时文件，完成后 os.replace 到目标路径
+
+    多个进程（例如多个 uvicorn worker 与 adk_pack 命令行）同时写同一个文件时各用各的临时文件，
+    读取方只会看到某一个完整的版本；写入出错时删除临时文件，目标文件保持不变。
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with open(fd, mode, **({} if "b" in mode else {"encoding": "utf-8"})) as f:
+            yield f
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+
+
+def get_adk_version() -> str:
+    """获取当前环境中安装的 google-adk 版本号"""
+    try:
+        from importlib.metadata import version
+        return version("google-adk")
+    except Exception:
+        pass
+    try:
+        from google.adk import version as adk_version
+        return adk_version.__version__
+    except Exception:
+        return "unknown"
+
+
+def get_index_dir(root: Path, version: str) -> Path:
+    """获取某个 ADK 版本对应的索引目录"""
+    if version == "unknown":
+        # 无法确定版本时按源码路径区分，避免不同环境互相覆盖
+        version = "unknown-" + hashlib.sha1(str(root).encode("utf-8")).hexdigest()[:12]
+    return get_cache_dir() / f"adk-{version}"
+
+
+def iter_source_files(root: Path, suffixes: Tuple[str, ...] = (".py",)):
+    """按稳定顺序遍历源码目录下指定后缀（默认 .py）的文件，返回 (相对路径, 绝对路径)"""
+    for path in sorted(path for suffix in suffixes for path in root.rglob(f"*{suffix}")):
+        if "__pycache__" in path.parts:
+            continue
+        yield path.relative_to(root).as_posix(), path
+
+
+def fingerprint(path: Path, data: Optional[bytes] = None) -> dict:
+    """生成单个文件的清单条目"""
+    stat = path.stat()
+    if data is None:
+        data = path.read_bytes()
+    return {
+        "mtime": stat.st_mtime,
+        "size": stat.st_size,
+        "sha256": hashlib.sha256(data).hexdigest(),
+    }
+
+
+def read_source(path: Path) -> Tuple[str, dict]:
+    """读取源码文件，同时返回其清单条目（只读一次磁盘）"""
+    data = path.read_bytes()
+    return data.decode("utf-8"), fingerprint(path, data)
+
+
+def diff_manifest(
+    root: Path,
+    old_manifest: Dict[str, dict],
+    trust_mtime: bool = True
+) -> Tuple[Dict[str, dict], List[str], List[str], dict]:
+    """
+    对比磁盘上的源码与旧清单
+
+    mtime 和大小都未变的文件直接沿用旧条目；否则计算哈希，只有内容真正变化才算作变更。
+    旧清单来自另一棵源码树时（trust_mtime=False），mtime 可能恰好相同（例如 wheel 中的时间戳），一律比较哈希。
+
+    Returns:
+        (新清单, 需要重新索引的文件, 已删除的文件, 统计信息)
+    """
+    new_manifest: Dict[str, dict] = {}
+    changed: List[str] = []
+    stats = {"added": 0, "modified": 0, "removed": 0, "unchanged": 0, "rehashed": 0}
+    for rel_path, path in iter_source_files(root):
+        old = old_manifest.get(rel_path)
+        try:
+            stat = path.stat()
+            if trust_mtime and old and old["mtime"] == stat.st_mtime and old["size"] == stat.st_size:
+                new_manifest[rel_path] = old
+                stats["unchanged"] += 1
+                continue
+            entry = fingerprint(path)
+        except OSError:
+            continue
+        new_manifest[rel_path] = entry
+        if old and old["sha256"] == entry["sha256"]:
+            # 仅 mtime 变化（例如重新安装同一版本），内容未变
+            stats["rehashed"] += 1
+            stats["unchanged"] += 1
+            continue
+        changed.append(rel_path)
+        stats["modified" if old else "added"] += 1
+    removed = [rel_path for rel_path in old_manifest if rel_path not in new_manifest]
+    stats["removed"] = len(removed)
+    return new_manifest, changed, removed, stats
+
+
+def find_seed(file_name: str, exclude: Path, loader: Callable[[Path], object]):
+    """在其他版本的索引目录中找到最近更新、且格式兼容的索引，作为增量更新的起点"""
+    candidates = [path for path in get_cache_dir().glob(f"adk-*/{file_name}") if path != exclude]
+    for path in sorted(candidates, key=lambda p: p.stat().st_mtime, reverse=True):
+        seed = loader(path)
+        if seed is not None:
+            return seed
+    return None
+
+
+def load_incremental(root: Path, version: str, file_name: str, loader, builder, label: str):
+    """
+    加载并增量刷新某类 ADK 索引
+
+    loader(path) 返回已持久化的索引或 None；builder() 全量构建索引。
+    索引对象需提供 version、manifest、update(changed, removed, manifest) 和 save(path)。
+    优先使用当前版本的索引；没有时以其他版本的索引为起点（原地升级场景），最后才全量构建。
+    """
+    index_path = get_index_dir(root, version) / file_name
+    start = time.perf_counter()
+    index = loader(index_path) if index_path.exists() else None
+    seeded = False
+    if index is None:
+        index = find_seed(file_name, index_path, loader)
+        seeded = index is not None
+
+    if index is None:
+        index = builder()
+        index.refresh_stats = {"mode": "full", "files": len(index.manifest),
+                               "seconds": round(time.perf_counter() - start, 3)}
+        print(f"[{label}] 已为 google-adk {version} 全量构建索引: "
+              f"{len(index.manifest)} 个文件, 耗时 {index.refresh_stats['seconds']:.2f}s")
+    else:
+        manifest, changed, removed, stats = diff_manifest(root, index.manifest, trust_mtime=not seeded)
+        if changed or removed:
+            index.update(changed, removed, manifest)
+        else:
+            index.manifest = manifest
+        index.version = version
+        stats.update({"mode": "incremental", "seeded_from_other_version": seeded,
+                      "seconds": round(time.perf_counter() - start, 3)})
+        index.refresh_stats = stats
+        if not (changed or removed or seeded or stats["rehashed"]):
+            return index
+        print(f"[{label}] 增量更新 google-adk {version} 索引: 新增 {stats['added']}, 修改 {stats['modified']}, "
+              f"删除 {stats['removed']}, 未变 {stats['unchanged']}, 耗时 {stats['seconds']:.2f}s")
+
+    try:
+        index.save(index_path)
+    except OSError as e:
+        print(f"[{label}] 索引写入失败，仅在内存中使用: {e}")
+    return index
@@ -0,0 +1,479 @@
+"""
+ADK 知识包（knowledge pack）
+把倒排索引、trigram 索引、符号表和交叉引用序列化为紧凑的二进制文件（有序字符串表 + 偏移数组），
+运行时用 mmap 打开：查询时对有序键二分查找，只解码命中的条目，
+多个 uvicorn worker 共享同一份只读页，启动时不需要把 JSON 反序列化成 Python 字典。
+
+构建：
+    python -m adk_companion.adk_pack [--root /path/to/google/adk] [--output /path/to/knowledge.pack]
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from bisect import bisect_right
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .adk_api_diff import read_tree_version
+from .adk_index import AdkIndex, load_or_build_index
+from .adk_manifest import atomic_write, diff_manifest, get_adk_version, get_index_dir
+from .adk_symbols import SymbolTable, load_or_build_symbol_table
+
+PACK_MAGIC = b"ADKPACK\0"
+PACK_FORMAT_VERSION = 1
+PACK_FILE_NAME = "knowledge.pack"
+
+# 文件头：魔数、格式版本、段数；段表：段名、偏移、长度
+HEADER = struct.Struct("<8sII")
+SECTION = struct.Struct("<8sQQ")
+U32 = struct.Struct("<I")
+U64 = struct.Struct("<Q")
+
+BIG_ENDIAN = sys.byteorder == "big"
+
+
+def _u32_bytes(values) -> bytes:
+    data = array("I", values)
+    if BIG_ENDIAN:
+        data.byteswap()
+    return data.tobytes()
+
+
+def _u32_array(data: bytes) -> array:
+    values = array("I", data)
+    if BIG_ENDIAN:
+        values.byteswap()
+    return values
+
+
+def _pad4(data: bytearray):
+    data.extend(b"\0" * (-len(data) % 4))
+
+
+def encode_keyed_lists(items: Dict[str, List[int]]) -> bytes:
+    """
+    编码“有序键 → u32 列表”
+
+    布局：键数 n、键偏移 u32[n+1]、值偏移 u64[n+1]（以 u32 为单位）、键数据、值数据 u32[]
+    """
+    keys = sorted(key.encode("utf-8") for key in items)
+    key_offsets = [0]
+    value_offsets = [0]
+    values: List[int] = []
+    for key in keys:
+        key_offsets.append(key_offsets[-1] + len(key))
+        values.extend(items[key.decode("utf-8")])
+        value_offsets.append(len(values))
+
+    data = bytearray(U32.pack(len(keys)))
+    data += _u32_bytes(key_offsets)
+    data += b"".join(U64.pack(offset) for offset in value_offsets)
+    data += b"".join(keys)
+    _pad4(data)
+    data += _u32_bytes(values)
+    return bytes(data)
+
+
+def encode_strings(strings: List[str]) -> bytes:
+    """编码按编号访问的字符串表：条数 n、偏移 u64[n+1]、数据"""
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = [0]
+    for item in encoded:
+        offsets.append(offsets[-1] + len(item))
+    return U32.pack(len(encoded)) + b"".join(U64.pack(o) for o in offsets) + b"".join(encoded)
+
+
+class KeyedLists:
+    """mmap 上的“有序键 → u32 列表”，按键二分查找"""
+
+    def __init__(self, buf, offset: int):
+        self.buf = buf
+        self.count = U32.unpack_from(buf, offset)[0]
+        self.key_offsets = offset + 4
+        self.value_offsets = self.key_offsets + 4 * (self.count + 1)
+        self.keys_start = self.value_offsets + 8 * (self.count + 1)
+        keys_length = U32.unpack_from(buf, self.key_offsets + 4 * self.count)[0]
+        self.values_start = self.keys_start + keys_length + (-keys_length % 4)
+
+    def key_at(self, i: int) -> bytes:
+        start, end = struct.unpack_from("<II", self.buf, self.key_offsets + 4 * i)
+        return self.buf[self.keys_start + start:self.keys_start + end]
+
+    def find(self, key: str) -> int:
+        """返回键的位置，不存在时返回 -1"""
+        target = key.encode("utf-8")
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.key_at(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < self.count and self.key_at(lo) == target else -1
+
+    def values_at(self, i: int) -> array:
+        start, end = struct.unpack_from("<QQ", self.buf, self.value_offsets + 8 * i)
+        return _u32_array(self.buf[self.values_start + 4 * start:self.values_start + 4 * end])
+
+    def get(self, key: str) -> Optional[array]:
+        i = self.find(key)
+        return None if i < 0 else self.values_at(i)
+
+    def keys(self):
+        for i in range(self.count):
+            yield self.key_at(i).decode("utf-8")
+
+    def keys_containing(self, needle: str) -> List[str]:
+        """在键数据中直接查找子串，只解码包含它的键"""
+        target = needle.encode("utf-8")
+        if not target:
+            return list(self.keys())
+        blob_end = self.keys_start + U32.unpack_from(self.buf, self.key_offsets + 4 * self.count)[0]
+        offsets = _u32_array(self.buf[self.key_offsets:self.key_offsets + 4 * (self.count + 1)])
+        found = []
+        position = self.buf.find(target, self.keys_start, blob_end)
+        while position >= 0:
+            i = bisect_right(offsets, position - self.keys_start) - 1
+            # 跨越两个键边界的匹配不算
+            if position + len(target) - self.keys_start <= offsets[i + 1]:
+                found.append(i)
+            position = self.buf.find(target, self.keys_start + offsets[i + 1], blob_end)
+        return [self.key_at(i).decode("utf-8") for i in dict.fromkeys(found)]
+
+
+class Strings(Sequence):
+    """mmap 上按编号访问的字符串表"""
+
+    def __init__(self, buf, offset: int):
+        self.buf = buf
+        self.count = U32.unpack_from(buf, offset)[0]
+        self.offsets = offset + 4
+        self.data_start = self.offsets + 8 * (self.count + 1)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self.count))]
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        start, end = struct.unpack_from("<QQ", self.buf, self.offsets + 8 * i)
+        return self.buf[self.data_start + start:self.data_start + end].decode("utf-8")
+
+
+class _PackedMapping(Mapping):
+    """KeyedLists 之上的只读字典视图，由子类决定如何解码值"""
+
+    def __init__(self, lists: KeyedLists):
+        self.lists = lists
+
+    def _decode(self, values: array):
+        raise NotImplementedError
+
+    def __getitem__(self, key):
+        values = self.lists.get(key)
+        if values is None:
+            raise KeyError(key)
+        return self._decode(values)
+
+    def __contains__(self, key):
+        return self.lists.find(key) >= 0
+
+    def __iter__(self):
+        return self.lists.keys()
+
+    def __len__(self):
+        return self.lists.count
+
+    def keys_containing(self, needle: str) -> List[str]:
+        return self.lists.keys_containing(needle)
+
+
+class PackedPostings(_PackedMapping):
+    """token → {文件编号: 行号列表}，值编码为 [文件编号, 行数, 行号...]*"""
+
+    def _decode(self, values):
+        entries = {}
+        i = 0
+        while i < len(values):
+            count = values[i + 1]
+            entries[values[i]] = values[i + 2:i + 2 + count].tolist()
+            i += 2 + count
+        return entries
+
+
+class PackedTrigrams(_PackedMapping):
+    """trigram → 文件编号集合"""
+
+    def _decode(self, values):
+        return frozenset(values)
+
+
+class PackedRecords(_PackedMapping):
+    """键 → 记录列表，值为记录表中的编号，记录以 JSON 存储"""
+
+    def __init__(self, lists: KeyedLists, records: Strings, prefix: str = "", decoder=json.loads):
+        super().__init__(lists)
+        self.records = records
+        self.prefix = prefix
+        self.decoder = decoder
+
+    def _decode(self, values):
+        return [self.decoder(self.records[i]) for i in values]
+
+    def __getitem__(self, key):
+        return super().__getitem__(self.prefix + key)
+
+    def __contains__(self, key):
+        return self.lists.find(self.prefix + key) >= 0
+
+    def __iter__(self):
+        return (key[len(self.prefix):] for key in self.lists.keys() if key.startswith(self.prefix))
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def keys_containing(self, needle: str) -> List[str]:
+        return [key[len(self.prefix):] for key in self.lists.keys_containing(needle) if key.startswith(self.prefix)]
+
+
+class _SymbolSequence(Sequence):
+    def __init__(self, records: Strings):
+        self.records = records
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return json.loads(self.records[i])
+
+
+class _QualnameMapping(PackedRecords):
+    """限定名 → 单个符号"""
+
+    def _decode(self, values):
+        return json.loads(self.records[values[0]])
+
+
+class _ReferenceMapping(PackedRecords):
+    """(引用类型, 小写名称) → 引用列表"""
+
+    def __getitem__(self, key):
+        return super().__getitem__("\0".join(key))
+
+    def __contains__(self, key):
+        return super().__contains__("\0".join(key))
+
+    def __iter__(self):
+        return (tuple(key.split("\0", 1)) for key in self.lists.keys())
+
+
+def _decode_reference(record: str) -> dict:
+    file, line, scope, target = json.loads(record)
+    return {"file": file, "line": line, "scope": scope, "target": target}
+
+
+def write_pack(path: Path, index: AdkIndex, table: SymbolTable):
+    """把索引和符号表写入知识包（原子替换）"""
+    meta = {
+        "version": index.version,
+        "package": table.package,
+        "files": index.files,
+        "doc_lengths": index.doc_lengths,
+        # 两份清单相同时只存一份
+        "manifest": index.manifest,
+        "symbols_manifest": None if table.manifest == index.manifest else table.manifest,
+    }
+
+    postings = {}
+    for token, entries in index.postings.items():
+        values = []
+        for file_id in sorted(entries):
+            values += [file_id, len(entries[file_id])] + list(entries[file_id])
+        postings[token] = values
+    trigrams = {trigram: sorted(ids) for trigram, ids in index.trigrams.items()}
+
+    symbols = list(table.symbols)
+    symbol_ids = {id(symbol): symbol_id for symbol_id, symbol in enumerate(symbols)}
+    symbol_keys: Dict[str, List[int]] = {}
+    for qualname, symbol in table.by_qualname.items():
+        symbol_keys["q\0" + qualname] = [symbol_ids[id(symbol)]]
+    for key, matches in table.by_name.items():
+        symbol_keys["n\0" + key] = [symbol_ids[id(symbol)] for symbol in matches]
+
+    references = []
+    reference_keys: Dict[str, List[int]] = {}
+    for (kind, name), refs in table.refs_by_key.items():
+        ids = reference_keys.setdefault(f"{kind}\0{name}", [])
+        for ref in refs:
+            ids.append(len(references))
+            references.append(json.dumps([ref["file"], ref["line"], ref["scope"], ref["target"]], ensure_ascii=False))
+
+    sections = [
+        (b"meta", json.dumps(meta, ensure_ascii=False).encode("utf-8")),
+        (b"postings", encode_keyed_lists(postings)),
+        (b"trigrams", encode_keyed_lists(trigrams)),
+        (b"symbols", encode_strings([json.dumps(s, ensure_ascii=False) for s in symbols])),
+        (b"symkeys", encode_keyed_lists(symbol_keys)),
+        (b"refs", encode_strings(references)),
+        (b"refkeys", encode_keyed_lists(reference_keys)),
+    ]
+
+    with atomic_write(path, "wb") as f:
+        f.write(HEADER.pack(PACK_MAGIC, PACK_FORMAT_VERSION, len(sections)))
+        offset = HEADER.size + SECTION.size * len(sections)
+        table_entries = []
+        for name, data in sections:
+            offset += -offset % 8
+            table_entries.append(SECTION.pack(name, offset, len(data)))
+            offset += len(data)
+        f.write(b"".join(table_entries))
+        for name, data in sections:
+            f.write(b"\0" * (-f.tell() % 8))
+            f.write(data)
+
+
+class KnowledgePack:
+    """以 mmap 打开的只读知识包"""
+
+    def __init__(self, path: Path, root: Path):
+        self.path = Path(path)
+        self.root = Path(root)
+        with open(path, "rb") as f:
+            self.buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, pack_format, count = HEADER.unpack_from(self.buf, 0)
+        if magic != PACK_MAGIC or pack_format != PACK_FORMAT_VERSION:
+            self.buf.close()
+            raise ValueError(f"不兼容的知识包: {path}")
+        self.sections = {}
+        for i in range(count):
+            name, offset, length = SECTION.unpack_from(self.buf, HEADER.size + SECTION.size * i)
+            self.sections[name.rstrip(b"\0").decode("ascii")] = (offset, length)
+        offset, length = self.sections["meta"]
+        self.meta = json.loads(self.buf[offset:offset + length])
+        self.version = self.meta["version"]
+        self.manifest = self.meta["manifest"]
+
+    def _offset(self, name: str) -> int:
+        return self.sections[name][0]
+
+    def is_fresh(self) -> bool:
+        """磁盘上的源码与打包时的清单一致时才可直接使用"""
+        _, changed, removed, _ = diff_manifest(self.root, self.manifest)
+        return not (changed or removed)
+
+    def index(self) -> AdkIndex:
+        """返回以 mmap 视图为后端的倒排索引"""
+        index = AdkIndex(
+            self.root,
+            self.version,
+            self.meta["files"],
+            PackedPostings(KeyedLists(self.buf, self._offset("postings"))),
+            PackedTrigrams(KeyedLists(self.buf, self._offset("trigrams"))),
+            self.manifest,
+            self.meta["doc_lengths"],
+        )
+        index.refresh_stats = {"mode": "pack", "path": str(self.path)}
+        return index
+
+    def symbol_table(self) -> SymbolTable:
+        """返回以 mmap 视图为后端的符号表和交叉引用"""
+        records = Strings(self.buf, self._offset("symbols"))
+        symbol_keys = KeyedLists(self.buf, self._offset("symkeys"))
+        reference_keys = KeyedLists(self.buf, self._offset("refkeys"))
+        references = Strings(self.buf, self._offset("refs"))
+        table = SymbolTable(
+            self.root,
+            self.version,
+            _SymbolSequence(records),
+            self.meta["symbols_manifest"] or self.manifest,
+            {},
+            self.meta["package"],
+            lookup=(
+                _QualnameMapping(symbol_keys, records, prefix="q\0"),
+                PackedRecords(symbol_keys, records, prefix="n\0"),
+                _ReferenceMapping(reference_keys, references, decoder=_decode_reference),
+            ),
+        )
+        table.refresh_stats = {"mode": "pack", "path": str(self.path)}
+        return table
+
+
+def get_pack_path(root: Path, version: Optional[str] = None) -> Path:
+    """知识包路径：ADK_KNOWLEDGE_PACK 环境变量，否则为版本索引目录下的 knowledge.pack"""
+    path = os.getenv("ADK_KNOWLEDGE_PACK")
+    if path:
+        return Path(path)
+    return get_index_dir(Path(root), version or get_adk_version()) / PACK_FILE_NAME
+
+
+def open_pack(root: Path, path: Optional[Path] = None) -> Optional[KnowledgePack]:
+    """打开知识包，不存在、格式不兼容或与磁盘上的源码不一致时返回 None"""
+    path = Path(path) if path else get_pack_path(root)
+    if not path.exists():
+        return None
+    try:
+        pack = KnowledgePack(path, root)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"[adk_pack] 无法打开知识包 {path}: {e}")
+        return None
+    if not pack.is_fresh():
+        print(f"[adk_pack] 知识包 {path} 与已安装的 ADK 源码不一致，改用 JSON 索引")
+        return None
+    return pack
+
+
+_pack_lock = threading.Lock()
+_packs: Dict[Path, Optional[KnowledgePack]] = {}
+
+
+def get_knowledge_pack(root: Path) -> Optional[KnowledgePack]:
+    """获取进程内共享的知识包（索引与符号表共用同一个 mmap）"""
+    root = Path(root)
+    with _pack_lock:
+        if root not in _packs:
+            _packs[root] = open_pack(root)
+        return _packs[root]
+
+
+def build_pack(root: Path, output: Optional[Path] = None) -> Path:
+    """加载（必要时构建）JSON 索引和符号表，再写出知识包；版本号取自 root 源码树本身的 version.py"""
+    version = read_tree_version(Path(root))
+    index = load_or_build_index(root, version)
+    table = load_or_build_symbol_table(root, version)
+    output = Path(output) if output else get_pack_path(root, version)
+    write_pack(output, index, table)
+    return output
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="构建 ADK 知识包")
+    parser.add_argument("--root", type=Path, help="ADK 源码目录（默认使用已安装的 google.adk）")
+    parser.add_argument("--output", type=Path, help="输出路径（默认写入当前版本的索引目录）")
+    args = parser.parse_args(argv)
+
+    root = args.root
+    if root is None:
+        try:
+            import google.adk
+            root = Path(google.adk.__file__).parent
+        except ImportError:
+            print("ADK 未安装在当前环境中，请使用 --root 指定源码目录")
+            return 1
+    output = build_pack(root, args.output)
+    print(f"[adk_pack] 已写入知识包: {output} ({output.stat().st_size / 1024:.0f} KiB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
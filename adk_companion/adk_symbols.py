@@ -0,0 +1,388 @@
+"""
+ADK 符号表与交叉引用
+基于 ast 解析 ADK 源码，记录类/函数的限定名、签名、文档字符串、基类与行号范围，
+以及调用点、属性访问、子类关系和导入构成的引用图，按 google-adk 版本缓存到磁盘，
+供 lookup_adk_symbol 回答“X 定义在哪里”、find_adk_references 回答“谁调用/继承/重写了 X”。
+"""
+
+import ast
+import json
+import multiprocessing
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .adk_builder import analyze_files
+from .adk_manifest import atomic_write, get_adk_version, iter_source_files, load_incremental
+
+SYMBOLS_FORMAT_VERSION = 3
+SYMBOLS_FILE_NAME = "symbols.json"
+DEFAULT_PACKAGE = "google.adk"
+MAX_DOCSTRING_LENGTH = 1000
+MAX_TARGET_LENGTH = 120
+
+# 引用类型：调用点、属性访问、子类关系、导入
+REFERENCE_KINDS = ("call", "attribute", "subclass", "import")
+
+
+def module_name_for(rel_path: str, package: str = DEFAULT_PACKAGE) -> str:
+    """将相对路径转换为模块名，例如 agents/llm_agent.py → google.adk.agents.llm_agent"""
+    parts = rel_path[:-len(".py")].split("/")
+    if parts[-1] == "__init__":
+        parts = parts[:-1]
+    return ".".join([package] + parts) if parts else package
+
+
+def format_signature(node) -> str:
+    """根据函数节点生成签名字符串"""
+    prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+    signature = f"{prefix} {node.name}({ast.unparse(node.args)})"
+    if node.returns is not None:
+        signature += f" -> {ast.unparse(node.returns)}"
+    return signature
+
+
+def _docstring(node) -> Optional[str]:
+    doc = ast.get_docstring(node)
+    if doc and len(doc) > MAX_DOCSTRING_LENGTH:
+        doc = doc[:MAX_DOCSTRING_LENGTH] + "..."
+    return doc
+
+
+def _tail_name(node) -> Optional[str]:
+    """取表达式最后一段名称，例如 self.tool.run → run，Generic[T] → Generic"""
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    if isinstance(node, ast.Subscript):
+        return _tail_name(node.value)
+    return None
+
+
+def _short_unparse(node) -> str:
+    text = ast.unparse(node)
+    return text if len(text) <= MAX_TARGET_LENGTH else text[:MAX_TARGET_LENGTH] + "..."
+
+
+class _ReferenceCollector(ast.NodeVisitor):
+    """收集模块中的引用，每条记录为 [类型, 名称, 行号, 所在作用域, 目标表达式]"""
+
+    def __init__(self, module: str, is_package: bool):
+        self.module = module
+        self.package = module if is_package else module.rpartition(".")[0]
+        self.scope: List[str] = []
+        self.references: List[list] = []
+        self._call_funcs = set()
+
+    def _scope_name(self) -> str:
+        return ".".join([self.module] + self.scope)
+
+    def _add(self, kind: str, name: str, line: int, target: str):
+        self.references.append([kind, name, line, self._scope_name(), target])
+
+    def visit_ClassDef(self, node):
+        qualname = ".".join([self.module] + self.scope + [node.name])
+        for base in node.bases:
+            name = _tail_name(base)
+            if name:
+                self._add("subclass", name, node.lineno, qualname)
+        for expr in node.decorator_list + node.bases + node.keywords:
+            self.visit(expr)
+        self.scope.append(node.name)
+        for stmt in node.body:
+            self.visit(stmt)
+        self.scope.pop()
+
+    def visit_FunctionDef(self, node):
+        for expr in node.decorator_list:
+            self.visit(expr)
+        self.visit(node.args)
+        if node.returns is not None:
+            self.visit(node.returns)
+        self.scope.append(node.name)
+        for stmt in node.body:
+            self.visit(stmt)
+        self.scope.pop()
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_Call(self, node):
+        name = _tail_name(node.func)
+        if name:
+            self._add("call", name, node.lineno, _short_unparse(node.func))
+            self._call_funcs.add(id(node.func))
+        self.generic_visit(node)
+
+    def visit_Attribute(self, node):
+        if id(node) not in self._call_funcs:
+            self._add("attribute", node.attr, node.lineno, _short_unparse(node))
+        self.generic_visit(node)
+
+    def visit_Import(self, node):
+        for alias in node.names:
+            self._add("import", alias.name.rsplit(".", 1)[-1], node.lineno, alias.name)
+
+    def visit_ImportFrom(self, node):
+        module = node.module or ""
+        if node.level:
+            # 将相对导入解析为绝对模块名
+            base = self.package.split(".")
+            base = base[:len(base) - (node.level - 1)] if node.level > 1 else base
+            module = ".".join(base + ([module] if module else []))
+        for alias in node.names:
+            self._add("import", alias.name, node.lineno, f"{module}.{alias.name}" if module else alias.name)
+
+
+def extract_references(tree, module: str, rel_path: str) -> List[list]:
+    """收集模块中的调用点、属性访问、子类关系和导入"""
+    collector = _ReferenceCollector(module, rel_path.endswith("__init__.py"))
+    collector.visit(tree)
+    return collector.references
+
+
+def extract_module(source: str, module: str, rel_path: str) -> Tuple[List[dict], List[list]]:
+    """只解析一次源码，同时返回符号和引用"""
+    tree = ast.parse(source)
+    return extract_symbols(tree, module, rel_path), extract_references(tree, module, rel_path)
+
+
+def extract_symbols(source, module: str, rel_path: str) -> List[dict]:
+    """解析单个模块（源码或已解析的 ast），返回其中定义的类、函数和方法"""
+    tree = ast.parse(source) if isinstance(source, str) else source
+    symbols = []
+
+    def visit(body, scope: List[str]):
+        for node in body:
+            if isinstance(node, ast.ClassDef):
+                qualname = ".".join(scope + [node.name])
+                fields = [
+                    f"{ast.unparse(stmt.target)}: {ast.unparse(stmt.annotation)}"
+                    + (f" = {ast.unparse(stmt.value)}" if stmt.value is not None else "")
+                    for stmt in node.body
+                    if isinstance(stmt, ast.AnnAssign) and isinstance(stmt.target, ast.Name)
+                ]
+                bases = [ast.unparse(base) for base in node.bases]
+                symbols.append({
+                    "qualname": f"{module}.{qualname}",
+                    "name": node.name,
+                    "kind": "class",
+                    "file": rel_path,
+                    "line_start": node.lineno,
+                    "line_end": node.end_lineno,
+                    "signature": f"class {node.name}({', '.join(bases)})" if bases else f"class {node.name}",
+                    "bases": bases,
+                    "decorators": [ast.unparse(d) for d in node.decorator_list],
+                    "fields": fields,
+                    "docstring": _docstring(node),
+                })
+                visit(node.body, scope + [node.name])
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                qualname = ".".join(scope + [node.name])
+                symbols.append({
+                    "qualname": f"{module}.{qualname}",
+                    "name": node.name,
+                    "kind": "method" if scope else "function",
+                    "file": rel_path,
+                    "line_start": node.lineno,
+                    "line_end": node.end_lineno,
+                    "signature": format_signature(node),
+                    "bases": [],
+                    "decorators": [ast.unparse(d) for d in node.decorator_list],
+                    "fields": [],
+                    "docstring": _docstring(node),
+                })
+
+    visit(tree.body, [])
+    return symbols
+
+
+class SymbolTable:
+    """ADK 符号表：按限定名、短名称和“类.成员”名称建立查找字典"""
+
+    def __init__(
+        self,
+        root: Path,
+        version: str,
+        symbols: List[dict],
+        manifest: Dict[str, dict],
+        references: Dict[str, List[list]],
+        package: str = DEFAULT_PACKAGE,
+        lookup: Optional[tuple] = None
+    ):
+        self.root = Path(root)
+        self.version = version
+        self.package = package
+        self.symbols = symbols
+        self.manifest = manifest
+        # 文件 → 引用列表，按文件分组便于增量更新
+        self.references = references
+        self.refresh_stats: dict = {}
+        if lookup is not None:
+            # 知识包提供的只读映射视图：(by_qualname, by_name, refs_by_key)
+            self.by_qualname, self.by_name, self.refs_by_key = lookup
+        else:
+            self._build_lookup()
+
+    def _build_lookup(self):
+        self.by_qualname: Dict[str, dict] = {}
+        self.by_name: Dict[str, List[dict]] = {}
+        for symbol in self.symbols:
+            self.by_qualname[symbol["qualname"]] = symbol
+            local_name = symbol["qualname"][len(module_name_for(symbol["file"], self.package)) + 1:]
+            keys = {symbol["name"].lower(), local_name.lower()}
+            for key in keys:
+                self.by_name.setdefault(key, []).append(symbol)
+
+        self.refs_by_key: Dict[Tuple[str, str], List[dict]] = {}
+        for rel_path, references in sorted(self.references.items()):
+            for kind, name, line, scope, target in references:
+                self.refs_by_key.setdefault((kind, name.lower()), []).append(
+                    {"file": rel_path, "line": line, "scope": scope, "target": target}
+                )
+
+    @classmethod
+    def build(
+        cls,
+        root: Path,
+        version: str,
+        package: str = DEFAULT_PACKAGE,
+        workers: Optional[int] = None
+    ) -> "SymbolTable":
+        """解析源码目录下所有模块构建符号表，文件较多时分片到多个进程并行解析"""
+        symbols = []
+        manifest = {}
+        references = {}
+        rel_paths = [rel_path for rel_path, _ in iter_source_files(root)]
+        for result in analyze_files(root, rel_paths, "symbols", package, workers):
+            if result is None:
+                continue
+            rel_path, manifest[rel_path], file_symbols, references[rel_path] = result
+            symbols.extend(file_symbols)
+        return cls(root, version, symbols, manifest, references, package)
+
+    def update(self, changed: List[str], removed: List[str], manifest: Dict[str, dict]):
+        """只重新解析变化的模块，并移除已删除模块的符号"""
+        stale = set(changed) | set(removed)
+        symbols = [symbol for symbol in self.symbols if symbol["file"] not in stale]
+        for rel_path in stale:
+            self.references.pop(rel_path, None)
+        for rel_path, result in zip(changed, analyze_files(self.root, list(changed), "symbols", self.package)):
+            if result is None:
+                manifest.pop(rel_path, None)
+                continue
+            _, manifest[rel_path], file_symbols, self.references[rel_path] = result
+            symbols.extend(file_symbols)
+        self.symbols = symbols
+        self.manifest = manifest
+        self._build_lookup()
+
+    @classmethod
+    def load(cls, path: Path, root: Path) -> Optional["SymbolTable"]:
+        """从磁盘加载符号表，格式不兼容时返回 None"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception:
+            return None
+        if data.get("format") != SYMBOLS_FORMAT_VERSION:
+            return None
+        return cls(root, data["version"], data["symbols"], data["manifest"], data["references"],
+                   data.get("package", DEFAULT_PACKAGE))
+
+    def save(self, path: Path):
+        """原子地写入符号表文件"""
+        data = {
+            "format": SYMBOLS_FORMAT_VERSION,
+            "version": self.version,
+            "package": self.package,
+            "symbols": self.symbols,
+            "manifest": self.manifest,
+            "references": self.references,
+        }
+        with atomic_write(path) as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+
+    def lookup(self, name: str) -> List[dict]:
+        """按限定名或（大小写不敏感的）短名称查找符号"""
+        name = name.strip()
+        if name in self.by_qualname:
+            return [self.by_qualname[name]]
+        return list(self.by_name.get(name.lower(), []))
+
+    def suggest(self, name: str, limit: int = 10) -> List[str]:
+        """未命中时给出名称相近的候选"""
+        needle = name.strip().lower().rsplit(".", 1)[-1]
+        return sorted(key for key in self.by_name if needle in key)[:limit]
+
+    def find_references(self, name: str, kind: str) -> List[dict]:
+        """查找某类引用，name 取最后一段（BaseTool.process_llm_request → process_llm_request）"""
+        return list(self.refs_by_key.get((kind, name.rsplit(".", 1)[-1].lower()), []))
+
+    def subclasses(self, name: str, transitive: bool = True) -> List[dict]:
+        """查找继承了 name 的类，transitive=True 时包含间接子类"""
+        results = []
+        seen = set()
+        queue = [name.rsplit(".", 1)[-1]]
+        while queue:
+            base = queue.pop(0)
+            for ref in self.find_references(base, "subclass"):
+                if ref["target"] in seen:
+                    continue
+                seen.add(ref["target"])
+                results.append(dict(ref, base=base))
+                if transitive:
+                    queue.append(ref["target"].rsplit(".", 1)[-1])
+        return results
+
+    def overrides(self, name: str) -> List[dict]:
+        """
+        查找定义了某个方法的类
+
+        name 为 "类.方法" 时，只保留该类本身及其（间接）子类中的定义。
+        """
+        owner, _, method = name.rpartition(".")
+        definitions = [s for s in self.by_name.get(method.lower(), []) if s["kind"] == "method"]
+        if not owner:
+            return definitions
+        owner = owner.rsplit(".", 1)[-1]
+        classes = {ref["target"] for ref in self.subclasses(owner)}
+        classes.update(s["qualname"] for s in self.by_name.get(owner.lower(), []) if s["kind"] == "class")
+        return [s for s in definitions if s["qualname"].rsplit(".", 1)[0] in classes]
+
+
+_symbols_lock = threading.Lock()
+_symbol_table: Optional[SymbolTable] = None
+
+
+def load_or_build_symbol_table(root: Path, version: Optional[str] = None) -> SymbolTable:
+    """加载当前版本的符号表并按清单增量刷新，没有可用符号表时全量构建"""
+    version = version or get_adk_version()
+    return load_incremental(
+        root,
+        version,
+        SYMBOLS_FILE_NAME,
+        loader=lambda path: SymbolTable.load(path, root),
+        builder=lambda: SymbolTable.build(root, version),
+        label="adk_symbols",
+    )
+
+
+def get_symbol_table(root: Path) -> SymbolTable:
+    """获取进程内共享的 ADK 符号表（优先使用知识包，否则首次调用时加载或构建）"""
+    global _symbol_table
+    with _symbols_lock:
+        if _symbol_table is None or _symbol_table.root != Path(root):
+            from .adk_pack import get_knowledge_pack
+            pack = get_knowledge_pack(Path(root))
+            _symbol_table = pack.symbol_table() if pack else load_or_build_symbol_table(Path(root))
+        return _symbol_table
+
+
+def preload_symbol_table(root: Optional[Path]):
+    """在后台线程中预加载符号表"""
+    if not root or multiprocessing.parent_process() is not None:
+        return None
+    thread = threading.Thread(target=get_symbol_table, args=(root,), name="adk-symbols-preload", daemon=True)
+    thread.start()
+    return thread
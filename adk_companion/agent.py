@@ -1,11 +1,19 @@
+import os
+
 from google.adk.agents.llm_agent import Agent
 
 from .config import model_config
 from .review_agent import review_agent
 from .gitlab_agent import gitlab_agent
 from .algorithms import quick_sort
+from .adk_index import preload_adk_index
+from .adk_symbols import preload_symbol_table
 from .tools import (
+    find_adk_site_packages,
     read_adk_codebase,
+    lookup_adk_symbol,
+    find_adk_references,
+    diff_adk_api,
     check_upstream_release,
     generate_pr,
     generate_evolution_pr,
@@ -15,7 +23,8 @@ from .tools import (
     list_prs,
     check_pr_author,
     request_pr_review,
-    smart_review_pr
+    smart_review_pr,
+    get_github_api_stats
 )
 from .gitlab_tools import (
     get_mr_info,
@@ -33,6 +42,14 @@ from .gitlab_tools import (
     list_branches
 )
 
+# GITHUB_ASYNC_TOOLS=1 时改用 asyncio 版本的 GitHub 工具（共享 HTTP/2 连接，适合 ADK Web 多会话并发）
+if os.getenv("GITHUB_ASYNC_TOOLS", "0").lower() in ("1", "true", "yes", "on"):
+    from .async_tools import list_prs, merge_pr, read_github_repo, review_pr  # noqa: F811
+
+# 启动时在后台加载（或首次构建）ADK 源码索引和符号表
+preload_adk_index(find_adk_site_packages())
+preload_symbol_table(find_adk_site_packages())
+
 SYSTEM_PROMPT = '''你是 ADK 伴随智能体，具备双重身份：
 
 1. **领域专家 (The Expert)**：通过读取自身源码和文档，为开发者提供 ADK 框架的使用指导和代码解析。
@@ -62,19 +79,28 @@ SYSTEM_PROMPT = '''你是 ADK 伴随智能体，具备双重身份：
 - **专业分工**：我负责协调和总体任务，子智能体负责专业的代码审查决策
 
 **代码分析工具：**
-- read_adk_codebase(keyword, max_results): 在 ADK 源码中搜索关键词，返回匹配的文件内容片段
-  - keyword: 搜索关键词
+- read_adk_codebase(keyword, max_results, regex, context_lines, file_types, timeout_seconds): 在 ADK 包的源码（.py）及文档/资源文件（.md、.json）中搜索关键词，按 BM25 相关度返回文件及命中行附近带行号的代码片段；超出时间预算时返回部分结果并在最后一项注明
+  - keyword: 搜索关键词，regex=True 时为正则表达式
   - max_results: 最大结果数（可选，默认10）
+  - regex: 是否按正则匹配（可选，默认 False），例如 keyword="class \\w+Agent\\(" 查找所有 Agent 子类定义
+  - context_lines: 每处命中前后保留的代码行数（可选，默认2），需要更多上下文时调大
+- lookup_adk_symbol(name, max_results): 在 ADK 符号表中查找类/函数/方法的定义，返回限定名、签名、文档字符串、基类和行号范围
+- find_adk_references(name, kind, max_results): 在 ADK 交叉引用图中查找调用点（calls）、子类（subclasses）、重写了某方法的类（overrides）、导入（imports）和属性访问（attributes）
+  - name: 符号名称，可以是短名称（LlmAgent）、类成员（BaseTool.process_llm_request）或完整限定名
+  - max_results: 最大结果数（可选，默认5）
 
 **版本管理工具：**
-- check_upstream_release(): 检查上游 ADK 仓库的最新发布版本，返回版本信息
+- diff_adk_api(new_adk_path, base_adk_path, max_items): 对比两个 ADK 源码目录（默认基准为已安装版本）的公开 API，返回新增、删除、移动和签名变化的符号
+- check_upstream_release(): 检查上游 ADK 仓库的最新发布版本，返回版本信息（已计算过 API 差异时附带统计）
 
 **项目结构工具：**
-- read_github_repo(repo_path, file_path, branch, max_files): 读取 GitHub 仓库的项目结构或指定文件内容
+- read_github_repo(repo_path, file_path, branch, max_files, path_prefix, pattern, max_depth): 读取 GitHub 仓库的项目结构或指定文件内容
   - repo_path: 仓库路径，格式为 "owner/repo"，默认使用当前项目仓库
   - file_path: 指定文件路径（相对于仓库根目录），如果为空则返回目录结构
   - branch: 分支名（默认为 main）
   - max_files: 最大文件数量限制（仅在读取目录结构时生效，默认50）
+  - path_prefix / pattern / max_depth: 目录结构按目录前缀、glob（如 "*.py"）和深度过滤，一次请求取回整棵树，
+    大仓库请用这些参数缩小范围，而不是逐级读取目录
 
 **PR 生成工具：**
 - generate_pr(title, description, files_to_modify, files_to_create, base_branch, branch_prefix, target_repo): 通用 PR 生成器
@@ -86,11 +112,12 @@ SYSTEM_PROMPT = '''你是 ADK 伴随智能体，具备双重身份：
   - branch_prefix: 分支前缀（可选，默认 feature）
   - target_repo: 目标仓库，格式为 "owner/repo"（必需）
 
-- generate_evolution_pr(target_version, sample_code, dependency_changes, target_repo): ADK 升级专用 PR 生成器
+- generate_evolution_pr(target_version, sample_code, dependency_changes, target_repo, new_adk_path): ADK 升级专用 PR 生成器，提供 new_adk_path 时在描述中附上 API 差异
   - target_version: 目标版本号
   - sample_code: 示例代码内容
   - dependency_changes: 依赖变更说明
   - target_repo: 目标仓库，格式为 "owner/repo"（可选）
+  - new_adk_path: 目标版本 ADK 源码目录（可选）
 
 **PR 管理工具：**
 - review_pr(repo_path, pr_number, approve, review_comment): 审查 PR 并可选择批准或添加评论
@@ -130,6 +157,8 @@ SYSTEM_PROMPT = '''你是 ADK 伴随智能体，具备双重身份：
   - auto_merge: 是否在审查通过后自动合并（可选，默认 True）
   - merge_method: 合并方法，可选 "merge", "squash", "rebase"（默认 "merge"）
 
+- get_github_api_stats(): 查看 GitHub API 调用统计（条件请求缓存命中率、缓存大小等）
+
 **算法工具：**
 - quick_sort(arr): 对输入的列表进行快速排序
   - arr: 需要排序的数字列表
@@ -154,7 +183,10 @@ SYSTEM_PROMPT = '''你是 ADK 伴随智能体，具备双重身份：
 
 **使用指南：**
 - 当用户询问 ADK 技术问题时，使用 read_adk_codebase 搜索相关源码
+- 当用户询问某个类/函数定义在哪里、签名是什么时，优先使用 lookup_adk_symbol
+- 当用户询问“谁调用了 X”、“哪些类继承/重写了 X”时，使用 find_adk_references，而不是用关键词搜索再人工筛选
 - 当需要检查更新时，使用 check_upstream_release
+- 当需要了解两个 ADK 版本之间 API 的变化时，使用 diff_adk_api，而不是逐个文件阅读源码
 - 当需要读取 GitHub 仓库结构或文件时，使用 read_github_repo
 - 当需要创建 PR 时，优先使用通用 generate_pr，ADK 升级场景使用 generate_evolution_pr
 - 当需要审查 PR 时，可以：
@@ -172,7 +204,7 @@ SYSTEM_PROMPT = '''你是 ADK 伴随智能体，具备双重身份：
   - 对于复杂的 PR 审查任务，可以委托给 pr_reviewer 子智能体
   - 子智能体使用独立的 REVIEW_GITHUB_TOKEN，确保审查客观性
   - 子智能体会自动执行完整的审查流程：分析→决策→执行
-- 使用 generate_pr 时必须指定 target_repo 参数（格式：'''owner/repo'''）
+- 使用 generate_pr 时必须指定 target_repo 参数（格式：'owner/repo'）
 - 所有文件路径使用相对路径，基于项目根目录
 - 确保提供完整的参数信息，特别是文件内容要包含必要的代码和注释
 
@@ -192,6 +224,9 @@ root_agent = Agent(
     instruction=SYSTEM_PROMPT,
     tools=[
         read_adk_codebase,
+        lookup_adk_symbol,
+        find_adk_references,
+        diff_adk_api,
         check_upstream_release,
         generate_pr,
         generate_evolution_pr,
@@ -202,6 +237,7 @@ root_agent = Agent(
         check_pr_author,
         request_pr_review,
         smart_review_pr,
+        get_github_api_stats,
         get_mr_info,
         get_mr_change_files,
         get_file_content,
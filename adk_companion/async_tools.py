@@ -0,0 +1,431 @@
+"""
+ADK Companion - 异步 GitHub 工具
+review_pr、list_prs、merge_pr、read_github_repo 的 asyncio 版本，参数和返回格式与 tools 中的同名工具一致，
+底层使用 github_async 的共享 HTTP/2 客户端。设置 GITHUB_ASYNC_TOOLS=1 时智能体注册这些版本。
+"""
+
+import asyncio
+import base64
+import os
+from pathlib import Path
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from .github_async import GitHubAPIError, get_async_github_client
+from .github_checks import get_head_checks_async
+from .github_client import get_github_client
+from .github_blobs import read_file_async, remember_tree
+from .github_gitdata import filter_tree
+from .github_graphql import normalize_timestamp, fetch_pull_requests_async, supports_pr_query
+from .github_mirror import is_mirror_enabled, is_valid_repo_path, mirror_read, pull_diff
+from .github_prstore import list_stored_prs, supports_store_query
+from .github_ratelimit import BULK, request_priority, token_key
+
+load_dotenv()
+
+PATCH_PREVIEW_LENGTH = 1000
+
+
+def _default_repo_path() -> Optional[str]:
+    """从当前项目的 git remote 推断 owner/repo"""
+    import git
+    repo = git.Repo(Path(__file__).parent.parent.parent)
+    remote_url = repo.remotes.origin.url
+    if 'github.com' not in remote_url:
+        return None
+    return remote_url.split('github.com/')[1].replace('.git', '')
+
+
+def _pr_summary(pull: dict) -> dict:
+    """REST PR 对象中与同步工具输出一致的公共字段"""
+    return {
+        "number": pull["number"],
+        "title": pull["title"],
+        "body": pull["body"],
+        "state": pull["state"],
+        "head_branch": pull["head"]["ref"],
+        "base_branch": pull["base"]["ref"],
+        "author": pull["user"]["login"],
+        "created_at": normalize_timestamp(pull["created_at"]),
+        "updated_at": normalize_timestamp(pull["updated_at"]),
+        "mergeable": pull.get("mergeable"),
+        "mergeable_state": pull.get("mergeable_state"),
+    }
+
+
+async def read_github_repo(
+    repo_path: str = None,
+    file_path: str = None,
+    branch: str = "main",
+    max_files: int = 50,
+    path_prefix: str = None,
+    pattern: str = None,
+    max_depth: int = None
+) -> dict:
+    """
+    读取 GitHub 仓库的项目结构或指定文件内容（异步版本）
+
+    Args:
+        repo_path: 仓库路径，格式为 "owner/repo"，默认使用当前项目仓库
+        file_path: 指定文件路径（相对于仓库根目录），如果为空则返回目录结构
+        branch: 分支名，默认为 main
+        max_files: 最大返回条目数（仅在读取目录结构时生效）
+        path_prefix: 只列出该目录下的内容，例如 "src/agents"（仅目录结构）
+        pattern: glob 过滤，例如 "*.py" 或 "src/*/test_*.py"，指定后只返回文件（仅目录结构）
+        max_depth: 相对 path_prefix 的最大深度，0 表示只列出直接子项，默认不限（仅目录结构）
+
+    Returns:
+        dict: 包含文件结构或文件内容的字典；目录结构中的 total_files / total_dirs 为过滤后的总数，
+              仓库过大导致 GitHub 截断 tree 时带有 truncated 标记
+    """
+    try:
+        client = get_async_github_client("GITHUB_TOKEN")
+
+        if not repo_path:
+            try:
+                repo_path = _default_repo_path()
+            except Exception:
+                return {"error": "无法自动获取仓库信息，请手动指定 repo_path 参数"}
+            if not repo_path:
+                return {"error": "无法确定仓库路径，请手动指定 repo_path 参数"}
+
+        if not is_valid_repo_path(repo_path):
+            return {"error": f"无效的仓库路径: {repo_path}，应为 owner/name 形式"}
+
+        # 本地裸镜像模式：git 操作是阻塞调用，放到线程中执行
+        if is_mirror_enabled():
+            try:
+                return await asyncio.to_thread(mirror_read, repo_path, file_path, branch, max_files,
+                                               path_prefix, pattern, max_depth)
+            except Exception as e:
+                print(f"[github_mirror] 镜像读取失败，改用 GitHub API: {e}")
+
+        contents_url = f"/repos/{repo_path}/contents"
+        if file_path:
+            try:
+                blob = await read_file_async(client, repo_path, file_path, branch)
+                if blob is not None:
+                    if blob["type"] == "missing":
+                        return {"error": f"读取文件 '{file_path}' 失败: 文件不存在"}
+                    if blob["type"] != "blob":
+                        return {"error": f"'{file_path}' 是一个目录，不是文件"}
+                    return {
+                        "file_path": file_path,
+                        "content": blob["content"].decode('utf-8'),
+                        "size": blob["size"],
+                        "sha": blob["sha"]
+                    }
+
+                # tree 被 GitHub 截断时退回 Contents API
+                content = await client.get_json(f"{contents_url}/{file_path.lstrip('/')}", {"ref": branch})
+                if isinstance(content, dict) and content.get("type") == "file":
+                    return {
+                        "file_path": file_path,
+                        "content": base64.b64decode(content["content"]).decode('utf-8'),
+                        "size": content["size"],
+                        "sha": content["sha"]
+                    }
+                return {"error": f"'{file_path}' 是一个目录，不是文件"}
+            except Exception as e:
+                return {"error": f"读取文件 '{file_path}' 失败: {str(e)}"}
+
+        try:
+            tree = await client.get_json(f"/repos/{repo_path}/git/trees/{branch}", {"recursive": "1"})
+            remember_tree(token_key(client.headers.get("Authorization")), repo_path, tree)
+            file_tree = filter_tree(tree["tree"], path_prefix, pattern, max_depth)
+
+            result = {
+                "repo": repo_path,
+                "branch": branch,
+                "total_files": len([f for f in file_tree if f["type"] == "file"]),
+                "total_dirs": len([f for f in file_tree if f["type"] == "dir"]),
+                "file_tree": file_tree[:max_files]
+            }
+            if tree.get("truncated"):
+                result["truncated"] = True
+            return result
+        except Exception as e:
+            return {"error": f"获取目录结构失败: {str(e)}"}
+
+    except Exception as e:
+        return {"error": f"GitHub API 调用失败: {str(e)}"}
+
+
+async def review_pr(
+    repo_path: str,
+    pr_number: int,
+    approve: bool = False,
+    review_comment: str = None,
+    token_env: str = "GITHUB_TOKEN"
+) -> dict:
+    """
+    审查 PR 并可选择批准或添加评论（异步版本）
+
+    Args:
+        repo_path: 仓库路径，格式为 "owner/repo"
+        pr_number: PR 编号
+        approve: 是否批准 PR（默认 False）
+        review_comment: 审查评论（可选）
+        token_env: GitHub Token 环境变量名（默认 "GITHUB_TOKEN"）
+
+    Returns:
+        dict: 包含审查结果或错误信息
+    """
+    try:
+        if not os.getenv(token_env):
+            return {"error": f"需要设置 {token_env} 环境变量"}
+
+        client = get_async_github_client(token_env)
+        pull_url = f"/repos/{repo_path}/pulls/{pr_number}"
+        pull, current_login = await asyncio.gather(client.get_json(pull_url), client.get_login())
+
+        if pull["user"]["login"] == current_login and approve:
+            return {
+                "error": "无法批准自己的PR",
+                "pr_author": pull["user"]["login"],
+                "current_user": current_login,
+                "token_used": token_env,
+                "suggestion": "您可以：1) 使用 request_pr_review 请求其他用户审查，2) 只添加评论而不批准",
+                "can_comment": True
+            }
+
+        files_changed = None
+        if is_mirror_enabled():
+            # 本地镜像计算完整的 base...head diff，不占用 API 分页，只受整个 PR 的字节预算限制
+            try:
+                files_changed = await asyncio.to_thread(pull_diff, repo_path, pr_number, pull["base"]["sha"],
+                                                        pull["head"]["sha"], token_env)
+            except Exception as e:
+                print(f"[github_pr] 本地 diff 计算失败，改用 GitHub 文件列表: {e}")
+        if files_changed is None:
+            files_changed = []
+            for file in await client.paginate(f"{pull_url}/files"):
+                # 二进制文件和超大 diff 没有 patch 字段
+                patch = file.get("patch") or ""
+                files_changed.append({
+                    "filename": file["filename"],
+                    "status": file["status"],
+                    "additions": file["additions"],
+                    "deletions": file["deletions"],
+                    "changes": file["changes"],
+                    "patch": patch[:PATCH_PREVIEW_LENGTH] + "..." if len(patch) > PATCH_PREVIEW_LENGTH else patch
+                })
+
+        pr_details = _pr_summary(pull)
+        pr_details.update({
+            "files_changed": files_changed,
+            "commits": pull["commits"],
+            "additions": pull["additions"],
+            "deletions": pull["deletions"],
+            "changed_files": pull["changed_files"]
+        })
+
+        if approve or review_comment:
+            try:
+                if approve:
+                    await client.request("POST", f"{pull_url}/reviews", json={
+                        "body": review_comment or "LGTM! Approved by ADK Companion.",
+                        "event": "APPROVE"
+                    })
+                    pr_details["review_action"] = "approved"
+                else:
+                    await client.request("POST", f"{pull_url}/reviews", json={
+                        "body": review_comment,
+                        "event": "COMMENT"
+                    })
+                    pr_details["review_action"] = "commented"
+            except Exception as e:
+                return {"error": f"创建审查失败: {str(e)}"}
+
+        return {
+            "status": "success",
+            "pr_details": pr_details,
+            "token_used": token_env,
+            "message": f"Successfully reviewed PR #{pr_number}"
+        }
+
+    except Exception as e:
+        return {"error": f"审查 PR 失败: {str(e)}"}
+
+
+async def merge_pr(
+    repo_path: str,
+    pr_number: int,
+    merge_method: str = "merge",
+    commit_title: str = None,
+    commit_message: str = None,
+    token_env: str = "GITHUB_TOKEN"
+) -> dict:
+    """
+    合并 PR（异步版本）
+
+    Args:
+        repo_path: 仓库路径，格式为 "owner/repo"
+        pr_number: PR 编号
+        merge_method: 合并方法，可选 "merge", "squash", "rebase"（默认 "merge"）
+        commit_title: 合并提交标题（可选）
+        commit_message: 合并提交消息（可选）
+        token_env: GitHub Token 环境变量名（默认 "GITHUB_TOKEN"）
+
+    Returns:
+        dict: 包含合并结果或错误信息
+    """
+    try:
+        if not os.getenv(token_env):
+            return {"error": f"需要设置 {token_env} 环境变量"}
+
+        client = get_async_github_client(token_env)
+        pull_url = f"/repos/{repo_path}/pulls/{pr_number}"
+        pull = await client.get_json(pull_url)
+
+        if not pull.get("mergeable"):
+            return {
+                "error": "PR 不可合并",
+                "mergeable_state": pull.get("mergeable_state"),
+                "status": pull.get('status', 'unknown')
+            }
+
+        if pull.get("mergeable_state") == "dirty":
+            return {"error": "PR 有合并冲突，无法自动合并"}
+
+        if pull.get("mergeable_state") == "blocked":
+            # 只查询头提交的提交状态和 check run（一次请求，短时缓存）
+            blocked = {
+                "error": "PR 被阻止合并，可能需要 CI 检查通过或审查批准",
+                "status_checks": [],
+                "head_sha": pull["head"]["sha"]
+            }
+            try:
+                checks = await get_head_checks_async(client, repo_path, pull["head"]["sha"])
+                blocked["status_checks"] = checks["checks"]
+                blocked["combined_state"] = checks["state"]
+            except Exception:
+                pass
+
+            return blocked
+
+        payload = {"merge_method": merge_method}
+        if commit_title:
+            payload["commit_title"] = commit_title
+        if commit_message:
+            payload["commit_message"] = commit_message
+        try:
+            result = (await client.request("PUT", f"{pull_url}/merge", json=payload)).json()
+        except GitHubAPIError as e:
+            error_msg = e.message or str(e)
+            if "Required status check" in error_msg:
+                return {"error": "合并失败：必需的状态检查未通过"}
+            elif "Review required" in error_msg:
+                return {"error": "合并失败：需要代码审查"}
+            elif "not authorized" in error_msg.lower():
+                return {"error": "合并失败：没有权限合并此 PR"}
+            elif "merge conflict" in error_msg.lower():
+                return {"error": "合并失败：存在合并冲突"}
+            return {"error": f"合并失败: {error_msg} (类型: {type(e).__name__})"}
+
+        merged_at = None
+        if result.get("merged"):
+            try:
+                merged_at = normalize_timestamp((await client.get_json(pull_url)).get("merged_at"))
+            except Exception:
+                pass
+
+        return {
+            "status": "success",
+            "merged": result.get("merged"),
+            "sha": result.get("sha"),
+            "message": result.get("message"),
+            "pr_number": pr_number,
+            "merge_method": merge_method,
+            "merged_at": merged_at,
+            "token_used": token_env
+        }
+
+    except Exception as e:
+        return {"error": f"合并 PR 失败: {str(e)}"}
+
+
+async def list_prs(
+    repo_path: str,
+    state: str = "open",
+    sort: str = "created",
+    direction: str = "desc",
+    limit: int = 20,
+    token_env: str = "GITHUB_TOKEN"
+) -> dict:
+    """
+    列出仓库的 PR（异步版本）
+
+    Args:
+        repo_path: 仓库路径，格式为 "owner/repo"
+        state: PR 状态，可选 "open", "closed", "all"（默认 "open"）
+        sort: 排序方式，可选 "created", "updated", "popularity"（默认 "created"）
+        direction: 排序方向，可选 "asc", "desc"（默认 "desc"）
+        limit: 最大返回数量（默认 20）
+        token_env: GitHub Token 环境变量名（默认 "GITHUB_TOKEN"）
+
+    Returns:
+        dict: 包含 PR 列表或错误信息
+    """
+    try:
+        client = get_async_github_client(token_env)
+        result = {"status": "success", "repo": repo_path, "state": state}
+
+        # 本地 PR 存储（SQLite 与同步的 GraphQL 查询都是阻塞调用，放到线程中执行）
+        if client.token and supports_store_query(state, sort, direction):
+            try:
+                stored = await asyncio.to_thread(list_stored_prs, get_github_client(token_env), repo_path, state,
+                                                 sort, direction, limit)
+            except Exception as e:
+                print(f"[github_prstore] 读取 PR 存储失败，直接查询 GitHub: {e}")
+                stored = None
+            if stored is not None:
+                result.update(total_prs=len(stored["prs"]), prs=stored["prs"], token_used=token_env, api="store",
+                              age_seconds=stored["age"])
+                return result
+
+        if client.token and supports_pr_query(state, sort, direction):
+            try:
+                pr_list = await fetch_pull_requests_async(client, repo_path, state, sort, direction, limit)
+                result.update(total_prs=len(pr_list), prs=pr_list, token_used=token_env, api="graphql")
+                return result
+            except Exception as e:
+                print(f"[list_prs] GraphQL 查询失败，回退到 REST: {e}")
+
+        pulls = await client.paginate(f"/repos/{repo_path}/pulls",
+                                      {"state": state, "sort": sort, "direction": direction}, limit)
+
+        async def enrich(pull: dict) -> dict:
+            pull_url = f"/repos/{repo_path}/pulls/{pull['number']}"
+            detail = await client.get_json(pull_url)
+            body = detail["body"]
+            pr_info = _pr_summary(detail)
+            pr_info.update({
+                "body": body[:200] + "..." if body and len(body) > 200 else body,
+                "commits": detail["commits"],
+                "additions": detail["additions"],
+                "deletions": detail["deletions"],
+                "changed_files": detail["changed_files"],
+                "url": detail["html_url"]
+            })
+            try:
+                reviews = await client.paginate(f"{pull_url}/reviews")
+                pr_info["review_status"] = {
+                    "approvals": sum(1 for review in reviews if review["state"] == "APPROVED"),
+                    "changes_requested": sum(1 for review in reviews if review["state"] == "CHANGES_REQUESTED"),
+                    "total_reviews": len(reviews)
+                }
+            except Exception:
+                pr_info["review_status"] = {"approvals": 0, "changes_requested": 0, "total_reviews": 0}
+            return pr_info
+
+        # 逐个 PR 补充详情属于批量请求，并发发出，额度紧张时给交互式请求让行
+        with request_priority(BULK):
+            pr_list = list(await asyncio.gather(*(enrich(pull) for pull in pulls)))
+
+        result.update(total_prs=len(pr_list), prs=pr_list, token_used=token_env, api="rest")
+        return result
+
+    except Exception as e:
+        return {"error": f"获取 PR 列表失败: {str(e)}"}
@@ -0,0 +1,210 @@
+"""
+GitHub 异步客户端
+基于 httpx 的 asyncio 原生 REST / GraphQL 客户端，同一个事件循环内按 Token 共享一个 HTTP/2 连接池，
+ADK Web 服务中的多个会话通过少量多路复用的连接并发请求，不再各自占用线程和 TCP 连接。
+GET 请求与同步客户端共用 github_cache 的条件请求缓存（SQLite 读写放到线程中执行，不阻塞事件循环），
+所有请求共用 github_ratelimit 的按 Token 调度，相同的并发 GET 请求经 singleflight 合并为一次。
+API 地址可通过 GITHUB_API_URL 环境变量或 base_url 参数指定（GitHub Enterprise 或本地测试桩）。
+"""
+
+import asyncio
+import importlib.util
+import os
+import weakref
+from typing import Dict, List, Optional
+
+import httpx
+from requests.structures import CaseInsensitiveDict
+
+from .github_cache import cache_key, get_response_cache
+from .github_client import get_api_url, get_client_ttl
+from .github_ratelimit import MAX_RATE_LIMIT_RETRIES, get_scheduler, token_key
+from .singleflight import get_flight
+
+API_VERSION = "2022-11-28"
+USER_AGENT = "adk-companion"
+# 每个客户端的最大连接数；HTTP/2 下一个连接即可承载多个并发请求
+DEFAULT_MAX_CONNECTIONS = 10
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_PER_PAGE = 100
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+class GitHubAPIError(Exception):
+    """GitHub 返回错误状态码"""
+
+    def __init__(self, status: int, message: str, data=None):
+        super().__init__(f"{status} {message}")
+        self.status = status
+        self.message = message
+        self.data = data
+
+
+class AsyncGitHubClient:
+    """单个 Token 对应的异步客户端"""
+
+    def __init__(self, token: Optional[str], base_url: Optional[str] = None, http2: bool = True,
+                 ttl: Optional[float] = None):
+        self.token = token
+        self.base_url = (base_url or get_api_url()).rstrip("/")
+        # GitHub Enterprise 的 REST 地址为 https://host/api/v3，GraphQL 地址为 https://host/api/graphql
+        if self.base_url.endswith("/api/v3"):
+            self.graphql_url = self.base_url[: -len("/v3")] + "/graphql"
+        else:
+            self.graphql_url = self.base_url + "/graphql"
+        self.ttl = get_client_ttl() if ttl is None else ttl
+        headers = {
+            "Accept": "application/vnd.github+json",
+            "X-GitHub-Api-Version": API_VERSION,
+            "User-Agent": USER_AGENT,
+        }
+        if token:
+            headers["Authorization"] = f"token {token}"
+        self.headers = headers
+        if http2 and not _http2_available():
+            print("[github_async] 未安装 h2，退回 HTTP/1.1（pip install 'httpx[http2]'）")
+            http2 = False
+        self._http = httpx.AsyncClient(
+            headers=headers,
+            http2=http2,
+            timeout=DEFAULT_TIMEOUT,
+            limits=httpx.Limits(max_connections=DEFAULT_MAX_CONNECTIONS),
+        )
+        self._login: Optional[tuple] = None
+
+    def _url(self, path: str) -> str:
+        if path.startswith(("http://", "https://")):
+            return path
+        return self.base_url + path
+
+    async def request(self, method: str, path: str, params: Optional[dict] = None, json=None) -> httpx.Response:
+        """
+        发出请求：先经过速率限制调度，遇到速率限制时在等待上限内重试；
+        相同的并发 GET 请求只发出一次（singleflight），共享同一个响应（或异常）
+
+        Raises:
+            GitHubAPIError: 响应状态码 >= 400
+            RateLimitExceeded: 速率限制需要等待的时间超过上限
+        """
+        url = self._url(path)
+        if method != "GET":
+            return await self._request(method, url, params, json)
+        key = cache_key(str(httpx.URL(url, params=params)), self.headers)
+        return await get_flight("github").do_async(key, lambda: self._request(method, url, params, json))
+
+    async def _request(self, method: str, url: str, params: Optional[dict], json) -> httpx.Response:
+        scheduler = get_scheduler()
+        key = token_key(self.headers.get("Authorization"), "graphql" if url == self.graphql_url else None)
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            await scheduler.acquire_async(key)
+            response = await self._send(method, url, params, json)
+            body = response.text if response.status_code in (403, 429) else ""
+            wait = scheduler.observe(key, response.status_code, response.headers, body)
+            if wait is None or wait > scheduler.max_wait or attempt == MAX_RATE_LIMIT_RETRIES:
+                break
+            scheduler.record_retry(key)
+        if response.status_code >= 400:
+            try:
+                data = response.json()
+            except ValueError:
+                data = response.text
+            message = data.get("message", "") if isinstance(data, dict) else str(data)[:200]
+            raise GitHubAPIError(response.status_code, message, data)
+        return response
+
+    async def _send(self, method: str, url: str, params: Optional[dict], json) -> httpx.Response:
+        cache = get_response_cache()
+        if cache is None or method != "GET":
+            return await self._http.request(method, url, params=params, json=json)
+
+        request = self._http.build_request(method, url, params=params)
+        key = cache_key(str(request.url), self.headers)
+        entry = await asyncio.to_thread(cache.get, key)
+        if entry:
+            if entry["etag"]:
+                request.headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                request.headers["If-Modified-Since"] = entry["last_modified"]
+        response = await self._http.send(request)
+
+        if response.status_code == 304 and entry:
+            cache.record("hits")
+            await asyncio.to_thread(cache.touch, key)
+            merged = CaseInsensitiveDict(entry["headers"])
+            merged.update(response.headers)
+            # 缓存的内容已解压，去掉原始的编码与长度头
+            for name in ("Content-Encoding", "Content-Length", "Transfer-Encoding"):
+                merged.pop(name, None)
+            return httpx.Response(entry["status"], headers=list(merged.items()), text=entry["body"],
+                                  request=request)
+
+        cache.record("misses")
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if response.status_code == 200 and (etag or last_modified):
+            await asyncio.to_thread(cache.put, key, etag, last_modified, response.status_code,
+                                    dict(response.headers), response.text or "")
+        return response
+
+    async def get_json(self, path: str, params: Optional[dict] = None):
+        return (await self.request("GET", path, params=params)).json()
+
+    async def paginate(self, path: str, params: Optional[dict] = None, limit: Optional[int] = None) -> List[dict]:
+        """按 Link 头逐页读取列表接口，最多返回 limit 项"""
+        params = dict(params or {})
+        params.setdefault("per_page", DEFAULT_PER_PAGE if limit is None else min(DEFAULT_PER_PAGE, limit))
+        items = []
+        url: Optional[str] = path
+        while url and (limit is None or len(items) < limit):
+            response = await self.request("GET", url, params=params)
+            items.extend(response.json())
+            url = response.links.get("next", {}).get("url")
+            # 下一页链接已包含查询参数
+            params = None
+        return items if limit is None else items[:limit]
+
+    async def graphql(self, query: str, variables: dict) -> dict:
+        """执行 GraphQL 查询，返回完整的响应 JSON；查询出错时抛出 GitHubAPIError"""
+        data = (await self.request("POST", self.graphql_url, json={"query": query, "variables": variables})).json()
+        if data.get("errors"):
+            raise GitHubAPIError(400, "; ".join(error.get("message", "") for error in data["errors"]), data)
+        return data
+
+    async def get_login(self) -> str:
+        """当前 Token 对应用户的 login（按 TTL 缓存）"""
+        loop = asyncio.get_running_loop()
+        if self._login is not None and loop.time() - self._login[0] < self.ttl:
+            return self._login[1]
+        login = (await self.get_json("/user"))["login"]
+        self._login = (loop.time(), login)
+        return login
+
+    async def aclose(self):
+        await self._http.aclose()
+
+
+# 事件循环 → {(Token, base_url): 客户端}；httpx 的连接池绑定在创建它的事件循环上
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[tuple, AsyncGitHubClient]]" = \
+    weakref.WeakKeyDictionary()
+
+
+def get_async_github_client(token_env: str = "GITHUB_TOKEN", base_url: Optional[str] = None) -> AsyncGitHubClient:
+    """获取当前事件循环内 token_env 对应的共享异步客户端"""
+    token = os.getenv(token_env) or None
+    base_url = (base_url or get_api_url()).rstrip("/")
+    clients = _clients.setdefault(asyncio.get_running_loop(), {})
+    client = clients.get((token, base_url))
+    if client is None:
+        client = clients[(token, base_url)] = AsyncGitHubClient(token, base_url)
+        get_scheduler().label(token_key(client.headers.get("Authorization")), token_env)
+    return client
+
+
+async def close_async_github_clients():
+    """关闭当前事件循环内的所有异步客户端"""
+    clients = _clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.aclose()
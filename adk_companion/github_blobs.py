@@ -0,0 +1,295 @@
+"""
+GitHub blob 内容寻址缓存
+Git 的 blob SHA 由内容唯一决定，同一 SHA 的内容永远不变。读取仓库文件时先由 分支 → tree → blob SHA
+解析出文件的 SHA，命中本地存储时直接读盘，只有新 SHA 才下载 blob。
+每次读取都重新请求分支的根 tree（经过 ETag 缓存，未变化时 GitHub 返回 304，不消耗额度），推送后立即可见；
+再沿路径逐级下降，子目录的 tree 按 SHA 寻址、内容不变，在进程内按 (Token, 仓库, tree SHA) 缓存，
+冷缓存下读取单个文件也只请求路径上的几个目录，不下载整棵递归 tree。存储按 SHA 分目录落盘，写入时校验 SHA，总大小有上限，超出时按最近访问时间（LRU）淘汰。
+read_github_repo（同步与异步）读取文件、generate_pr 上传文件都经过这里，同一仓库的重复审查基本不再下载文件内容。
+"""
+
+import base64
+import hashlib
+import os
+import threading
+from collections import OrderedDict, defaultdict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from .adk_manifest import atomic_write, get_cache_dir
+from .github_ratelimit import token_key
+
+DEFAULT_BLOB_CACHE_MAX_MB = 500
+# 淘汰时降到上限的这个比例，避免每次写入都触发淘汰
+EVICT_TARGET_RATIO = 0.9
+# 进程内缓存的 tree 数上限，超出时淘汰最久未使用的；tree 按 SHA 寻址，不需要过期时间
+MAX_CACHED_TREES = 4096
+
+
+def get_blob_cache_dir() -> Path:
+    """blob 存储目录（可通过 GITHUB_BLOB_CACHE_DIR 环境变量覆盖）"""
+    cache_dir = os.getenv("GITHUB_BLOB_CACHE_DIR")
+    return Path(cache_dir) if cache_dir else get_cache_dir() / "github" / "blobs"
+
+
+def get_blob_cache_max_bytes() -> int:
+    try:
+        return int(float(os.getenv("GITHUB_BLOB_CACHE_MAX_MB", DEFAULT_BLOB_CACHE_MAX_MB)) * 1024 * 1024)
+    except ValueError:
+        return DEFAULT_BLOB_CACHE_MAX_MB * 1024 * 1024
+
+
+def is_blob_cache_enabled() -> bool:
+    return os.getenv("GITHUB_BLOB_CACHE", "1").lower() not in ("0", "false", "no", "off")
+
+
+def git_blob_sha(data: bytes) -> str:
+    """按 Git 的规则计算内容的 blob SHA"""
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+class BlobStore:
+    """按 blob SHA 存放文件内容的磁盘存储，带大小上限和 LRU 淘汰"""
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._sizes: Dict[str, int] = {}
+        for path in self.root.glob("*/*"):
+            # 跳过写入中断时残留的临时文件
+            if path.is_file() and not path.name.endswith(".tmp"):
+                self._sizes[path.parent.name + path.name] = path.stat().st_size
+        self._total = sum(self._sizes.values())
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def _path(self, sha: str) -> Path:
+        return self.root / sha[:2] / sha[2:]
+
+    def get(self, sha: str) -> Optional[bytes]:
+        path = self._path(sha)
+        try:
+            data = path.read_bytes()
+            # 用修改时间记录最近访问，供 LRU 淘汰
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.stats["misses"] += 1
+            return None
+        with self._lock:
+            self.stats["hits"] += 1
+        return data
+
+    def put(self, sha: str, data: bytes) -> bool:
+        """写入内容；SHA 与内容不符或超过上限时不写入"""
+        if len(data) > self.max_bytes or git_blob_sha(data) != sha:
+            return False
+        path = self._path(sha)
+        with self._lock:
+            if sha in self._sizes:
+                return True
+            # 多个进程可能同时写入同一个 SHA，各自使用唯一命名的临时文件
+            with atomic_write(path, "wb") as f:
+                f.write(data)
+            self._sizes[sha] = len(data)
+            self._total += len(data)
+            self.stats["stores"] += 1
+            self._evict()
+        return True
+
+    def _evict(self):
+        if self._total <= self.max_bytes:
+            return
+        target = self.max_bytes * EVICT_TARGET_RATIO
+        entries = []
+        for sha in self._sizes:
+            try:
+                entries.append((self._path(sha).stat().st_mtime, sha))
+            except OSError:
+                entries.append((0.0, sha))
+        for _, sha in sorted(entries):
+            if self._total <= target:
+                break
+            try:
+                self._path(sha).unlink()
+            except OSError:
+                pass
+            self._total -= self._sizes.pop(sha)
+            self.stats["evictions"] += 1
+
+    def summary(self) -> dict:
+        with self._lock:
+            requests_seen = self.stats["hits"] + self.stats["misses"]
+            return dict(
+                self.stats,
+                entries=len(self._sizes),
+                size_bytes=self._total,
+                max_bytes=self.max_bytes,
+                hit_rate=round(self.stats["hits"] / requests_seen, 3) if requests_seen else 0.0,
+                path=str(self.root),
+            )
+
+
+_store: Optional[BlobStore] = None
+_store_lock = threading.Lock()
+# (Token 摘要, 仓库, tree SHA) → (是否被截断, 条目名 → (类型, SHA, 大小))
+_trees: "OrderedDict[Tuple[str, str, str], tuple]" = OrderedDict()
+_tree_lock = threading.Lock()
+
+
+def get_blob_store() -> Optional[BlobStore]:
+    """获取进程内共享的 blob 存储，未启用或无法创建时返回 None"""
+    global _store
+    if not is_blob_cache_enabled():
+        return None
+    with _store_lock:
+        if _store is None:
+            try:
+                _store = BlobStore(get_blob_cache_dir(), get_blob_cache_max_bytes())
+            except OSError as e:
+                print(f"[github_blobs] 无法创建 blob 缓存，直接下载文件内容: {e}")
+                return None
+        return _store
+
+
+def remember(data: bytes) -> str:
+    """把已知内容写入存储（例如 generate_pr 上传的文件），返回其 blob SHA"""
+    store = get_blob_store()
+    sha = git_blob_sha(data)
+    if store is not None:
+        store.put(sha, data)
+    return sha
+
+
+def _put_tree(scope: str, repo_path: str, sha: str, tree: tuple):
+    key = (scope, repo_path, sha)
+    with _tree_lock:
+        _trees[key] = tree
+        _trees.move_to_end(key)
+        while len(_trees) > MAX_CACHED_TREES:
+            _trees.popitem(last=False)
+
+
+def _get_tree(scope: str, repo_path: str, sha: str) -> Optional[tuple]:
+    key = (scope, repo_path, sha)
+    with _tree_lock:
+        tree = _trees.get(key)
+        if tree is not None:
+            _trees.move_to_end(key)
+        return tree
+
+
+def _index_tree(scope: str, repo_path: str, tree: dict) -> tuple:
+    """缓存一层（非递归）tree 的 JSON，返回 (是否被截断, 条目名 → (类型, SHA, 大小))"""
+    entries = {entry["path"]: (entry["type"], entry["sha"], entry.get("size")) for entry in tree["tree"]}
+    index = (bool(tree.get("truncated")), entries)
+    _put_tree(scope, repo_path, tree["sha"], index)
+    return index
+
+
+def remember_tree(scope: str, repo_path: str, tree: dict):
+    """
+    登记已取回的递归 tree（Git Trees API 的 JSON），把其中每个目录的直接子项按 tree SHA 缓存，
+    随后按路径读取文件时不再逐级请求；被截断的 tree 缺少部分子项，不登记
+    """
+    if tree.get("truncated"):
+        return
+    children = defaultdict(dict)
+    dirs = {"": tree["sha"]}
+    for entry in tree["tree"]:
+        parent, _, name = entry["path"].rpartition("/")
+        children[parent][name] = (entry["type"], entry["sha"], entry.get("size"))
+        if entry["type"] == "tree":
+            dirs[entry["path"]] = entry["sha"]
+    for dir_path, sha in dirs.items():
+        _put_tree(scope, repo_path, sha, (False, children[dir_path]))
+
+
+def _lookup(tree: tuple, name: str) -> Optional[tuple]:
+    """在一层 tree 中查找条目，tree 被截断且未找到时返回 None 让调用方退回 Contents API"""
+    truncated, entries = tree
+    entry = entries.get(name)
+    if entry is None and truncated:
+        return None
+    return entry or ("missing", None, None)
+
+
+def read_file(repo, path: str, ref: str, scope: str) -> Optional[dict]:
+    """
+    通过 分支 → tree → blob SHA 读取文件，blob 内容优先取自本地存储
+
+    Args:
+        repo: PyGithub Repository
+        scope: 调用方 Token 的摘要（github_ratelimit.token_key），tree 缓存按 Token 隔离
+
+    Returns:
+        {"type", "sha", "size", "content"(bytes), "cached"}；type 为 missing / tree 时没有内容；
+        tree 被截断而无法解析时返回 None
+    """
+    # 每次都重新验证分支：根 tree 未变化时 GitHub 返回 304
+    root = repo.get_git_tree(ref).raw_data
+    tree = _index_tree(scope, repo.full_name, root)
+    entry = ("tree", root["sha"], None)
+    for name in [part for part in path.split("/") if part]:
+        if entry[0] != "tree":
+            return {"type": "missing", "sha": None, "size": None}
+        if tree is None:
+            tree = _get_tree(scope, repo.full_name, entry[1]) or \
+                _index_tree(scope, repo.full_name, repo.get_git_tree(entry[1]).raw_data)
+        entry = _lookup(tree, name)
+        if entry is None:
+            return None
+        tree = None
+    kind, sha, size = entry
+    if kind != "blob":
+        return {"type": kind, "sha": sha, "size": size}
+
+    store = get_blob_store()
+    data = store.get(sha) if store is not None else None
+    cached = data is not None
+    if data is None:
+        blob = repo.get_git_blob(sha)
+        data = base64.b64decode(blob.content) if blob.encoding == "base64" else blob.content.encode("utf-8")
+        if store is not None:
+            store.put(sha, data)
+    return {"type": "blob", "sha": sha, "size": size, "content": data, "cached": cached}
+
+
+async def read_file_async(client, repo_path: str, path: str, ref: str) -> Optional[dict]:
+    """read_file 的异步版本，client 为 github_async.AsyncGitHubClient"""
+    scope = token_key(client.headers.get("Authorization"))
+    root = await client.get_json(f"/repos/{repo_path}/git/trees/{ref}")
+    tree = _index_tree(scope, repo_path, root)
+    entry = ("tree", root["sha"], None)
+    for name in [part for part in path.split("/") if part]:
+        if entry[0] != "tree":
+            return {"type": "missing", "sha": None, "size": None}
+        if tree is None:
+            tree = _get_tree(scope, repo_path, entry[1]) or \
+                _index_tree(scope, repo_path, await client.get_json(f"/repos/{repo_path}/git/trees/{entry[1]}"))
+        entry = _lookup(tree, name)
+        if entry is None:
+            return None
+        tree = None
+    kind, sha, size = entry
+    if kind != "blob":
+        return {"type": kind, "sha": sha, "size": size}
+
+    store = get_blob_store()
+    data = store.get(sha) if store is not None else None
+    cached = data is not None
+    if data is None:
+        blob = await client.get_json(f"/repos/{repo_path}/git/blobs/{sha}")
+        data = base64.b64decode(blob["content"]) if blob["encoding"] == "base64" else blob["content"].encode("utf-8")
+        if store is not None:
+            store.put(sha, data)
+    return {"type": "blob", "sha": sha, "size": size, "content": data, "cached": cached}
+
+
+def get_blob_cache_stats() -> dict:
+    """blob 存储的命中/未命中/写入/淘汰计数和当前大小"""
+    store = get_blob_store()
+    if store is None:
+        return {"enabled": False}
+    return dict(store.summary(), enabled=True)
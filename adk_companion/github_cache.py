@@ -0,0 +1,297 @@
+"""
+GitHub 条件请求缓存
+在 PyGithub 的连接层之下为 GET 请求保存 ETag / Last-Modified 和响应内容（SQLite 落盘），
+再次请求时带上 If-None-Match / If-Modified-Since，GitHub 返回 304 时直接使用缓存内容，
+304 响应不计入速率限制。缓存总大小有上限，超出时按最近访问时间（LRU）淘汰。
+每个请求在发出前后都经过 github_ratelimit 的调度器（按 Token 的额度节流与退避），
+相同的并发 GET 请求经 singleflight 合并为一次。
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from github.Requester import (
+    HTTPRequestsConnectionClass,
+    HTTPSRequestsConnectionClass,
+    Requester,
+    RequestsResponse,
+)
+
+from .adk_manifest import get_cache_dir
+from .github_ratelimit import MAX_RATE_LIMIT_RETRIES, get_scheduler, token_key
+from .singleflight import get_flight
+
+DEFAULT_CACHE_MAX_MB = 200
+CACHE_FILE_NAME = "http_cache.sqlite3"
+# 淘汰时降到上限的这个比例，避免每次写入都触发淘汰
+EVICT_TARGET_RATIO = 0.9
+
+
+def get_cache_path() -> Path:
+    """缓存文件路径（可通过 GITHUB_CACHE_DIR 环境变量覆盖目录）"""
+    cache_dir = os.getenv("GITHUB_CACHE_DIR")
+    return (Path(cache_dir) if cache_dir else get_cache_dir() / "github") / CACHE_FILE_NAME
+
+
+def get_cache_max_bytes() -> int:
+    try:
+        return int(float(os.getenv("GITHUB_CACHE_MAX_MB", DEFAULT_CACHE_MAX_MB)) * 1024 * 1024)
+    except ValueError:
+        return DEFAULT_CACHE_MAX_MB * 1024 * 1024
+
+
+def is_cache_enabled() -> bool:
+    return os.getenv("GITHUB_HTTP_CACHE", "1").lower() not in ("0", "false", "no", "off")
+
+
+class ResponseCache:
+    """按请求键保存 GET 响应的 SQLite 缓存，带大小上限和 LRU 淘汰"""
+
+    def __init__(self, path: Path, max_bytes: int):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, status INTEGER, "
+            "headers TEXT, body TEXT, size INTEGER, accessed REAL)"
+        )
+        self._conn.commit()
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, status, headers, body FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, status, headers, body = row
+        return {"etag": etag, "last_modified": last_modified, "status": status,
+                "headers": json.loads(headers), "body": body}
+
+    def record(self, counter: str):
+        with self._lock:
+            self.stats[counter] += 1
+
+    def touch(self, key: str):
+        with self._lock:
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+
+    def put(self, key: str, etag: Optional[str], last_modified: Optional[str], status: int,
+            headers: Dict[str, str], body: str):
+        size = len(body.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, etag, last_modified, status, json.dumps(headers), body, size, time.time()),
+            )
+            self.stats["stores"] += 1
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = self.max_bytes * EVICT_TARGET_RATIO
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall():
+            if total <= target:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            self.stats["evictions"] += 1
+
+    def summary(self) -> dict:
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        requests_seen = self.stats["hits"] + self.stats["misses"]
+        return dict(
+            self.stats,
+            entries=entries,
+            size_bytes=total,
+            max_bytes=self.max_bytes,
+            hit_rate=round(self.stats["hits"] / requests_seen, 3) if requests_seen else 0.0,
+            path=str(self.path),
+        )
+
+
+class CachedResponse:
+    """模拟 PyGithub 使用的 httplib 响应对象，内容来自缓存"""
+
+    def __init__(self, status: int, headers, body: str):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def getheaders(self):
+        return self.headers.items()
+
+    def read(self) -> str:
+        return self.body
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+_sessions: Dict[tuple, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """获取进程内共享的响应缓存，未启用或无法创建时返回 None"""
+    global _cache
+    if not is_cache_enabled():
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = ResponseCache(get_cache_path(), get_cache_max_bytes())
+            except (OSError, sqlite3.Error) as e:
+                print(f"[github_cache] 无法创建响应缓存，直接请求 GitHub: {e}")
+                return None
+        return _cache
+
+
+def _shared_session(protocol: str, host: str, port: int, retry, pool_size) -> requests.Session:
+    """
+    按 (协议, 主机, 端口) 共享的 requests 会话
+
+    注入连接类后 PyGithub 会为每个请求创建新的连接对象，会话放在这里才能继续复用连接池。
+    """
+    key = (protocol, host, port)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            session.auth = Requester.noopAuth
+            pool_size = pool_size or requests.adapters.DEFAULT_POOLSIZE
+            adapter = requests.adapters.HTTPAdapter(
+                max_retries=requests.adapters.DEFAULT_RETRIES if retry is None else retry,
+                pool_connections=pool_size,
+                pool_maxsize=pool_size,
+            )
+            session.mount(f"{protocol}://", adapter)
+            _sessions[key] = session
+        return session
+
+
+def cache_key(url: str, headers: Dict[str, str]) -> str:
+    """缓存键包含认证信息的摘要，不同 Token 看到的内容互不混用"""
+    parts = [url, headers.get("Accept", ""), headers.get("Authorization", "")]
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+class _CachingConnectionMixin:
+    protocol = "https"
+    default_port = 443
+
+    def __init__(self, host, port=None, strict=False, timeout=None, retry=None, pool_size=None, **kwargs):
+        self.host = host
+        self.port = port if port else self.default_port
+        self.timeout = timeout
+        self.verify = kwargs.get("verify", True)
+        self.retry = retry
+        self.pool_size = pool_size
+        self.session = _shared_session(self.protocol, host, self.port, retry, pool_size)
+
+    def getresponse(self):
+        """相同的并发 GET 请求只发出一次（singleflight），其余调用共享同一个响应对象"""
+        if self.verb != "GET" or self.stream:
+            return self._send()
+        url = f"{self.protocol}://{self.host}:{self.port}{self.url}"
+        return get_flight("github").do(cache_key(url, self.headers), self._send)
+
+    def _send(self):
+        """发出请求前由调度器节流，遇到速率限制时等待后重试（等待时间在上限内）"""
+        scheduler = get_scheduler()
+        resource = "graphql" if self.url.split("?", 1)[0].endswith("/graphql") else None
+        key = token_key(self.headers.get("Authorization"), resource)
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            scheduler.acquire(key)
+            response = self._fetch()
+            body = response.read() if response.status in (403, 429) else ""
+            wait = scheduler.observe(key, response.status, response.headers, body)
+            if wait is None or wait > scheduler.max_wait or attempt == MAX_RATE_LIMIT_RETRIES:
+                return response
+            # 下一次 acquire 会等到该 Token 解除限制
+            scheduler.record_retry(key)
+        return response
+
+    def _fetch(self):
+        cache = get_response_cache()
+        if cache is None or self.verb != "GET" or self.stream:
+            return super().getresponse()
+
+        url = f"{self.protocol}://{self.host}:{self.port}{self.url}"
+        key = cache_key(url, self.headers)
+        entry = cache.get(key)
+        headers = dict(self.headers)
+        if entry:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        r = self.session.get(url, headers=headers, timeout=self.timeout, verify=self.verify, allow_redirects=False)
+
+        if r.status_code == 304 and entry:
+            cache.record("hits")
+            cache.touch(key)
+            # 沿用缓存的响应头，但以 304 响应中的速率限制等最新头部为准
+            merged = CaseInsensitiveDict(entry["headers"])
+            merged.update(r.headers)
+            return CachedResponse(entry["status"], merged, entry["body"])
+
+        cache.record("misses")
+        etag = r.headers.get("ETag")
+        last_modified = r.headers.get("Last-Modified")
+        if r.status_code == 200 and (etag or last_modified):
+            cache.put(key, etag, last_modified, r.status_code, dict(r.headers), r.text or "")
+        return RequestsResponse(r)
+
+    def close(self):
+        # 会话是共享的，不随单个连接对象关闭
+        pass
+
+
+class CachingHTTPSConnection(_CachingConnectionMixin, HTTPSRequestsConnectionClass):
+    pass
+
+
+class CachingHTTPConnection(_CachingConnectionMixin, HTTPRequestsConnectionClass):
+    protocol = "http"
+    default_port = 80
+
+
+_installed = False
+
+
+def install_github_transport():
+    """把带条件请求缓存和速率限制调度的连接类注入 PyGithub（进程内只需一次）"""
+    global _installed
+    if _installed:
+        return
+    Requester.injectConnectionClasses(CachingHTTPConnection, CachingHTTPSConnection)
+    _installed = True
+
+
+def get_cache_stats() -> dict:
+    """响应缓存的命中/未命中/写入/淘汰计数和当前大小"""
+    cache = get_response_cache()
+    if cache is None:
+        return {"enabled": False}
+    return dict(cache.summary(), enabled=True)
@@ -0,0 +1,213 @@
+"""
+GitHub 提交检查状态
+PR 被阻止合并时，原先对 PR 的每个提交调用一次 get_status()，请求数随提交数增长，且看不到 GitHub Checks（check run）。
+这里只查询 PR 头提交：一次 GraphQL 查询取回 statusCheckRollup 中的提交状态（status）和 check run，
+GraphQL 不可用时退回 REST 的组合状态 + check-runs 两个请求。结果按 (Token, 仓库, SHA) 短时缓存，
+同一头提交的重复查询（例如 smart_review_pr 之后紧接着 merge_pr）不再发请求。
+"""
+
+import asyncio
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from .github_ratelimit import token_key
+
+# 检查结果的缓存时间（秒），可通过 GITHUB_CHECKS_TTL 环境变量覆盖；检查仍在运行时结果会变化，不宜过长
+DEFAULT_CHECKS_TTL = 15
+MAX_CONTEXTS = 100
+# 缓存条目数上限，TTL 设得很长时也不会无限增长
+MAX_CACHED_CHECKS = 1024
+
+HEAD_CHECKS_QUERY = """
+query($owner: String!, $name: String!, $oid: GitObjectID!, $first: Int!) {
+  repository(owner: $owner, name: $name) {
+    object(oid: $oid) {
+      ... on Commit {
+        statusCheckRollup {
+          state
+          contexts(first: $first) {
+            totalCount
+            nodes {
+              __typename
+              ... on StatusContext { context state description targetUrl }
+              ... on CheckRun { name status conclusion title detailsUrl }
+            }
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+_cache: Dict[tuple, tuple] = {}
+_cache_lock = threading.Lock()
+
+
+def get_checks_ttl() -> float:
+    try:
+        return float(os.getenv("GITHUB_CHECKS_TTL", DEFAULT_CHECKS_TTL))
+    except ValueError:
+        return DEFAULT_CHECKS_TTL
+
+
+def _check_run(name: str, status: str, conclusion: Optional[str], title: Optional[str], url: Optional[str]) -> dict:
+    """check run 转为与提交状态相同的字段；已完成的取结论，否则取运行状态（queued / in_progress）"""
+    return {
+        "type": "check_run",
+        "context": name,
+        "state": (conclusion or status or "").lower(),
+        "description": title,
+        "target_url": url,
+    }
+
+
+def _status(context: str, state: str, description: Optional[str], url: Optional[str]) -> dict:
+    return {
+        "type": "status",
+        "context": context,
+        "state": state.lower(),
+        "description": description,
+        "target_url": url,
+    }
+
+
+def parse_rollup(data: dict) -> dict:
+    """解析 HEAD_CHECKS_QUERY 的结果"""
+    commit = (data["data"]["repository"] or {}).get("object") or {}
+    rollup = commit.get("statusCheckRollup")
+    if not rollup:
+        return {"state": None, "checks": [], "total": 0}
+    checks = []
+    for node in rollup["contexts"]["nodes"]:
+        if node["__typename"] == "StatusContext":
+            checks.append(_status(node["context"], node["state"], node.get("description"), node.get("targetUrl")))
+        elif node["__typename"] == "CheckRun":
+            checks.append(_check_run(node["name"], node["status"], node.get("conclusion"), node.get("title"),
+                                     node.get("detailsUrl")))
+    return {"state": rollup["state"].lower(), "checks": checks, "total": rollup["contexts"]["totalCount"]}
+
+
+def _combine(statuses: list, check_runs: list, combined_state: Optional[str]) -> dict:
+    """REST 路径：组合状态与 check run 合并为与 GraphQL 相同的结构"""
+    checks = statuses + check_runs
+    states = {check["state"] for check in check_runs}
+    state = combined_state if statuses else None
+    if states & {"failure", "timed_out", "cancelled", "action_required", "startup_failure"}:
+        state = "failure"
+    elif states - {"success", "neutral", "skipped"}:
+        state = state if state in ("failure", "error") else "pending"
+    elif check_runs and state is None:
+        state = "success"
+    return {"state": state, "checks": checks, "total": len(checks)}
+
+
+def _combine_json(combined: dict, runs: dict) -> dict:
+    """REST 组合状态和 check-runs 接口的 JSON 转为与 GraphQL 相同的结构"""
+    statuses = [_status(s["context"], s["state"], s.get("description"), s.get("target_url"))
+                for s in combined["statuses"]]
+    check_runs = [
+        _check_run(run["name"], run["status"], run.get("conclusion"), (run.get("output") or {}).get("title"),
+                   run.get("details_url"))
+        for run in runs["check_runs"]
+    ]
+    return _combine(statuses, check_runs, combined["state"])
+
+
+def rollup_state(checks: list) -> Optional[str]:
+    """
+    由单个检查（_status / _check_run 的结果）汇总状态，与 REST 路径的规则相同
+
+    提交状态按 GitHub 组合状态的规则合并：任一 error / failure 为 failure，任一 pending 为 pending，否则为 success。
+    """
+    statuses = [check for check in checks if check["type"] == "status"]
+    states = {check["state"] for check in statuses}
+    if states & {"error", "failure"}:
+        combined = "failure"
+    elif states - {"success"}:
+        combined = "pending"
+    else:
+        combined = "success"
+    return _combine(statuses, [check for check in checks if check["type"] == "check_run"], combined)["state"]
+
+
+def _cached(key: tuple) -> Optional[dict]:
+    with _cache_lock:
+        cached = _cache.get(key)
+    if cached and time.monotonic() - cached[0] < get_checks_ttl():
+        return dict(cached[1], cached=True)
+    return None
+
+
+def _store(key: tuple, result: dict) -> dict:
+    now = time.monotonic()
+    ttl = get_checks_ttl()
+    with _cache_lock:
+        _cache.pop(key, None)
+        _cache[key] = (now, result)
+        # 字典按写入顺序排列，最早写入的在前：依次淘汰已过期的条目，再淘汰超出上限的条目
+        while _cache:
+            oldest = next(iter(_cache))
+            if now - _cache[oldest][0] < ttl and len(_cache) <= MAX_CACHED_CHECKS:
+                break
+            del _cache[oldest]
+    return dict(result, cached=False)
+
+
+def get_head_checks(client, repo_path: str, head_sha: str) -> dict:
+    """
+    查询头提交的提交状态和 check run（带短时缓存）
+
+    Args:
+        client: github_client.GitHubClient
+
+    Returns:
+        {"state": 汇总状态（success / failure / pending / error，无检查时为 None），
+         "checks": [{"type", "context", "state", "description", "target_url"}], "total", "cached"}
+    """
+    key = (token_key(client.token), repo_path, head_sha)
+    cached = _cached(key)
+    if cached is not None:
+        return cached
+
+    if client.token:
+        owner, name = repo_path.split("/", 1)
+        try:
+            data = client.graphql(HEAD_CHECKS_QUERY, {"owner": owner, "name": name, "oid": head_sha,
+                                                      "first": MAX_CONTEXTS})
+            return _store(key, parse_rollup(data))
+        except Exception as e:
+            print(f"[github_checks] GraphQL 查询失败，回退到 REST: {e}")
+
+    # 直接请求两个子资源，get_commit 会先取回完整的提交（含 diff）
+    requester = client.github.requester
+    commit_url = f"{client.get_repo(repo_path).url}/commits/{head_sha}"
+    _, combined = requester.requestJsonAndCheck("GET", f"{commit_url}/status")
+    _, runs = requester.requestJsonAndCheck("GET", f"{commit_url}/check-runs", parameters={"per_page": MAX_CONTEXTS})
+    return _store(key, _combine_json(combined, runs))
+
+
+async def get_head_checks_async(client, repo_path: str, head_sha: str) -> dict:
+    """get_head_checks 的异步版本，client 为 github_async.AsyncGitHubClient"""
+    key = (token_key(client.token), repo_path, head_sha)
+    cached = _cached(key)
+    if cached is not None:
+        return cached
+
+    if client.token:
+        owner, name = repo_path.split("/", 1)
+        try:
+            data = await client.graphql(HEAD_CHECKS_QUERY, {"owner": owner, "name": name, "oid": head_sha,
+                                                            "first": MAX_CONTEXTS})
+            return _store(key, parse_rollup(data))
+        except Exception as e:
+            print(f"[github_checks] GraphQL 查询失败，回退到 REST: {e}")
+
+    commit_url = f"/repos/{repo_path}/commits/{head_sha}"
+    combined, runs = await asyncio.gather(
+        client.get_json(f"{commit_url}/status"),
+        client.get_json(f"{commit_url}/check-runs", {"per_page": MAX_CONTEXTS}),
+    )
+    return _store(key, _combine_json(combined, runs))
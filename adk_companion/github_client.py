@@ -0,0 +1,132 @@
+"""
+GitHub 客户端注册表
+进程内按 token_env 共享 Github 客户端：同一个 Token 只建立一个带连接池的 HTTP 会话，
+当前用户的 login 和仓库对象按 TTL 缓存，主 Token（GITHUB_TOKEN）和审查 Token
+（REVIEW_GITHUB_TOKEN）都通过这里获取客户端，避免每次调用工具都重新握手、重新查询身份。
+GET 请求经过 github_cache 的条件请求缓存（ETag / Last-Modified），所有请求按 Token 做速率限制调度。
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from github import Auth, Github
+
+from .github_cache import install_github_transport
+from .github_ratelimit import get_scheduler, token_key
+
+# 仓库对象和用户身份的缓存时间（秒），可通过 GITHUB_CLIENT_TTL 环境变量覆盖
+DEFAULT_CLIENT_TTL = 300
+# 每个客户端 HTTP 连接池的大小
+DEFAULT_POOL_SIZE = 10
+DEFAULT_API_URL = "https://api.github.com"
+
+
+def get_api_url() -> str:
+    """GitHub API 地址（可通过 GITHUB_API_URL 环境变量指定 GitHub Enterprise 或本地测试桩）"""
+    return os.getenv("GITHUB_API_URL", DEFAULT_API_URL).rstrip("/")
+
+
+def get_client_ttl() -> float:
+    try:
+        return float(os.getenv("GITHUB_CLIENT_TTL", DEFAULT_CLIENT_TTL))
+    except ValueError:
+        return DEFAULT_CLIENT_TTL
+
+
+class GitHubClient:
+    """单个 Token 对应的共享客户端，缓存当前用户 login 和仓库对象"""
+
+    def __init__(self, token: Optional[str], ttl: Optional[float] = None):
+        self.token = token
+        self.ttl = get_client_ttl() if ttl is None else ttl
+        # 请求节奏由 github_ratelimit 按额度调度，关闭 PyGithub 固定的请求间隔（读 0.25 秒、写 1 秒），
+        # 否则并发上传 blob 等批量写操作仍会被逐个拉开
+        options = dict(base_url=get_api_url(), pool_size=DEFAULT_POOL_SIZE,
+                       seconds_between_requests=None, seconds_between_writes=None)
+        if token:
+            self.github = Github(auth=Auth.Token(token), **options)
+        else:
+            # 未设置 Token 时匿名访问（仅适用于公开仓库的只读操作）
+            self.github = Github(**options)
+        self._lock = threading.Lock()
+        self._login: Optional[tuple] = None
+        self._repos: Dict[str, tuple] = {}
+
+    def _fresh(self, cached: Optional[tuple]) -> bool:
+        return cached is not None and time.monotonic() - cached[0] < self.ttl
+
+    def get_login(self) -> str:
+        """当前 Token 对应用户的 login（按 TTL 缓存）"""
+        with self._lock:
+            if self._fresh(self._login):
+                return self._login[1]
+        login = self.github.get_user().login
+        with self._lock:
+            self._login = (time.monotonic(), login)
+        return login
+
+    def get_repo(self, repo_path: str):
+        """获取仓库对象（按 TTL 缓存，PR、文件等子资源仍实时查询）"""
+        with self._lock:
+            cached = self._repos.get(repo_path)
+            if self._fresh(cached):
+                return cached[1]
+        repo = self.github.get_repo(repo_path)
+        with self._lock:
+            self._repos[repo_path] = (time.monotonic(), repo)
+        return repo
+
+    def graphql(self, query: str, variables: dict) -> dict:
+        """执行 GraphQL 查询，返回完整的响应 JSON（data 字段）；出错时抛出 GithubException"""
+        _, data = self.github.requester.graphql_query(query, variables)
+        return data
+
+    def invalidate(self, repo_path: Optional[str] = None):
+        """清除缓存的仓库对象（不指定 repo_path 时同时清除身份缓存）"""
+        with self._lock:
+            if repo_path:
+                self._repos.pop(repo_path, None)
+            else:
+                self._repos.clear()
+                self._login = None
+
+    def close(self):
+        self.github.close()
+
+
+_registry_lock = threading.Lock()
+# token_env → 客户端；不同环境变量配置了同一个 Token 时共享同一个客户端
+_clients_by_env: Dict[str, GitHubClient] = {}
+_clients_by_token: Dict[Optional[str], GitHubClient] = {}
+
+
+def get_github_client(token_env: str = "GITHUB_TOKEN") -> GitHubClient:
+    """
+    获取 token_env 对应的共享客户端
+
+    环境变量中的 Token 发生变化（例如轮换）时自动换用新 Token 的客户端。
+    """
+    token = os.getenv(token_env) or None
+    install_github_transport()
+    with _registry_lock:
+        client = _clients_by_env.get(token_env)
+        if client is not None and client.token == token:
+            return client
+        client = _clients_by_token.get(token)
+        if client is None:
+            client = GitHubClient(token)
+            _clients_by_token[token] = client
+        _clients_by_env[token_env] = client
+    get_scheduler().label(token_key(token), token_env)
+    return client
+
+
+def clear_github_clients():
+    """关闭并清空所有共享客户端"""
+    with _registry_lock:
+        for client in _clients_by_token.values():
+            client.close()
+        _clients_by_env.clear()
+        _clients_by_token.clear()
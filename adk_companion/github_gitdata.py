@@ -0,0 +1,148 @@
+"""
+GitHub Git Data API 提交
+generate_pr 原先对每个文件调用一次 get_contents 和一次 create_file/update_file，请求数和提交数都随文件数线性增长；
+这里并发创建所有 blob，再基于基础提交的 tree 一次性生成新 tree、一个提交，最后只移动一次分支引用，
+请求耗时取决于并发度而不是文件数，PR 历史中也只有一个提交。
+仓库结构同样通过 Git Trees API 的 recursive=1 一次取回，再按路径前缀、glob 和深度过滤。
+"""
+
+import fnmatch
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+from github import GithubException, InputGitTreeElement
+
+from .github_blobs import git_blob_sha, remember
+
+# 并发上传 blob 的线程数，可通过 GITHUB_UPLOAD_WORKERS 环境变量覆盖（不超过连接池大小时效果最好）
+DEFAULT_UPLOAD_WORKERS = 8
+FILE_MODE = "100644"
+
+
+def get_upload_workers() -> int:
+    try:
+        return max(1, int(os.getenv("GITHUB_UPLOAD_WORKERS", DEFAULT_UPLOAD_WORKERS)))
+    except ValueError:
+        return DEFAULT_UPLOAD_WORKERS
+
+
+def create_blobs(repo, files: Dict[str, str], max_workers: Optional[int] = None) -> Dict[str, str]:
+    """
+    并发创建 blob，上传的内容同时写入本地 blob 存储（之后读取该分支的文件时直接命中）
+
+    Returns:
+        文件路径 → blob SHA
+    """
+    if not files:
+        return {}
+    workers = min(max_workers or get_upload_workers(), len(files))
+    paths = list(files)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="github-blob") as executor:
+        blobs = list(executor.map(lambda path: repo.create_git_blob(files[path], "utf-8"), paths))
+    for path in paths:
+        remember(files[path].encode("utf-8"))
+    return {path: blob.sha for path, blob in zip(paths, blobs)}
+
+
+def _existing_entries(repo, tree_sha: str, paths: List[str]) -> Dict[str, tuple]:
+    """读取基础 tree 中已有文件的 (模式, blob SHA)（例如可执行脚本的 100755），读取失败时返回空"""
+    try:
+        tree = repo.get_git_tree(tree_sha, recursive=True)
+    except GithubException:
+        return {}
+    wanted = set(paths)
+    return {element.path: (element.mode, element.sha) for element in tree.tree if element.path in wanted}
+
+
+def commit_files(repo, base_sha: str, files: Dict[str, str], message: str,
+                 keep_modes: bool = True, max_workers: Optional[int] = None) -> str:
+    """
+    在 base_sha 之上用一个提交写入 files（路径 → 文本内容），已存在的文件被覆盖
+
+    Args:
+        repo: PyGithub Repository
+        keep_modes: 是否对照基础 tree 中的已有文件（需要额外读取一次递归 tree）：
+                    保留文件模式，内容未变化的文件不重复上传
+
+    Returns:
+        新提交的 SHA（尚未移动任何分支引用）
+    """
+    base_commit = repo.get_git_commit(base_sha)
+    existing = _existing_entries(repo, base_commit.tree.sha, list(files)) if keep_modes else {}
+    # 本地按 Git 规则计算 SHA，与基础 tree 中相同的文件无需上传
+    blob_shas = {}
+    for path, content in files.items():
+        sha = git_blob_sha(content.encode("utf-8"))
+        if path in existing and existing[path][1] == sha:
+            blob_shas[path] = sha
+    blob_shas.update(create_blobs(repo, {p: c for p, c in files.items() if p not in blob_shas}, max_workers))
+    elements = [
+        InputGitTreeElement(path, existing.get(path, (FILE_MODE,))[0], "blob", sha=blob_shas[path])
+        for path in files
+    ]
+    tree = repo.create_git_tree(elements, base_commit.tree)
+    return repo.create_git_commit(message, tree, [base_commit]).sha
+
+
+def point_branch(repo, branch_name: str, sha: str):
+    """让分支指向 sha：不存在时创建，已存在时强制移动（只发出一次写请求）"""
+    try:
+        repo.create_git_ref(ref=f"refs/heads/{branch_name}", sha=sha)
+    except GithubException as e:
+        if e.status != 422:
+            raise
+        repo.get_git_ref(f"heads/{branch_name}").edit(sha, force=True)
+
+
+def tree_entries_from_git_tree(tree) -> List[dict]:
+    """PyGithub GitTree 的条目转为与 REST JSON 相同的字典（path / type / size / sha）"""
+    return [
+        {"path": element.path, "type": element.type, "size": element.size, "sha": element.sha}
+        for element in tree.tree
+    ]
+
+
+def match_path(path: str, pattern: str) -> bool:
+    """glob 匹配：不含 "/" 的模式匹配文件名；路径模式中 * 不跨越目录，** 可以匹配任意层级"""
+    if "/" not in pattern:
+        return fnmatch.fnmatchcase(path.rsplit("/", 1)[-1], pattern)
+    if "**" in pattern:
+        return fnmatch.fnmatchcase(path, pattern)
+    parts = path.split("/")
+    pattern_parts = pattern.split("/")
+    return len(parts) == len(pattern_parts) and all(
+        fnmatch.fnmatchcase(part, pattern_part) for part, pattern_part in zip(parts, pattern_parts)
+    )
+
+
+def filter_tree(entries: Iterable[dict], path_prefix: Optional[str] = None, pattern: Optional[str] = None,
+                max_depth: Optional[int] = None) -> List[dict]:
+    """
+    过滤递归 tree 的条目，转换为 read_github_repo 的 file_tree 格式
+
+    Args:
+        entries: Git Trees API 返回的条目（path / type / size / sha）
+        path_prefix: 只保留该目录下的条目（例如 "src/agents"）
+        pattern: glob 模式；不含 "/" 时匹配文件名（如 "*.py"），否则匹配完整路径（如 "src/*/test_*.py"、
+                 "docs/**.md"），指定后只返回文件
+        max_depth: 相对 path_prefix 的最大深度，0 表示只列出直接子项，默认不限
+    """
+    prefix = (path_prefix or "").strip("/")
+    prefix = f"{prefix}/" if prefix else ""
+    result = []
+    for entry in entries:
+        path = entry["path"]
+        if not path.startswith(prefix) or path == prefix.rstrip("/"):
+            continue
+        if max_depth is not None and path[len(prefix):].count("/") > max_depth:
+            continue
+        # 子模块（commit）按目录展示
+        is_dir = entry["type"] != "blob"
+        if pattern and (is_dir or not match_path(path, pattern)):
+            continue
+        if is_dir:
+            result.append({"type": "dir", "path": f"{path}/", "size": 0})
+        else:
+            result.append({"type": "file", "path": path, "size": entry.get("size") or 0, "sha": entry["sha"]})
+    return result
@@ -0,0 +1,168 @@
+"""
+GitHub GraphQL 查询
+list_prs 通过 REST 逐个 PR 补充 mergeable、提交数、增删行数和审查状态，每个 PR 要额外请求两次以上；
+这里用一次 GraphQL 查询取回整页 PR 的元数据、可合并状态和审查计数（超过 100 个时按游标分页），
+输出与 REST 路径相同的字段（同步与 github_async 的异步客户端共用）。GraphQL 需要 Token，
+匿名访问或查询失败时由调用方回退到 REST。
+"""
+
+from typing import List, Optional
+
+# GraphQL 单页最多返回的节点数
+MAX_PAGE_SIZE = 100
+BODY_PREVIEW_LENGTH = 200
+
+# pr_info_from_node 需要的 PullRequest 字段（github_prstore 的同步查询也使用）
+PULL_REQUEST_FIELDS = """
+        number
+        title
+        body
+        state
+        headRefName
+        baseRefName
+        author { login }
+        createdAt
+        updatedAt
+        mergeable
+        mergeStateStatus
+        commits { totalCount }
+        additions
+        deletions
+        changedFiles
+        url
+        approvals: reviews(states: APPROVED) { totalCount }
+        changesRequested: reviews(states: CHANGES_REQUESTED) { totalCount }
+        allReviews: reviews { totalCount }
+"""
+
+PULL_REQUESTS_QUERY = """
+query($owner: String!, $name: String!, $first: Int!, $after: String,
+      $states: [PullRequestState!], $field: IssueOrderField!, $direction: OrderDirection!) {
+  repository(owner: $owner, name: $name) {
+    pullRequests(first: $first, after: $after, states: $states,
+                 orderBy: {field: $field, direction: $direction}) {
+      pageInfo { hasNextPage endCursor }
+      nodes {%s      }
+    }
+  }
+}
+""" % PULL_REQUEST_FIELDS
+
+# REST 的 state 参数 → GraphQL PullRequestState（REST 的 closed 包含已合并的 PR）
+STATE_FILTERS = {
+    "open": ["OPEN"],
+    "closed": ["CLOSED", "MERGED"],
+    "all": None,
+}
+# REST 的 sort 参数 → GraphQL IssueOrderField；popularity 没有对应字段，由调用方走 REST
+SORT_FIELDS = {
+    "created": "CREATED_AT",
+    "updated": "UPDATED_AT",
+}
+MERGEABLE_VALUES = {"MERGEABLE": True, "CONFLICTING": False}
+
+
+def supports_pr_query(state: str, sort: str, direction: str) -> bool:
+    """参数组合能否用 GraphQL 查询表达"""
+    return state in STATE_FILTERS and sort in SORT_FIELDS and direction in ("asc", "desc")
+
+
+def normalize_timestamp(value: Optional[str]) -> Optional[str]:
+    """GraphQL 的 2024-01-01T00:00:00Z 转为与 REST 路径 datetime.isoformat() 相同的格式"""
+    if value and value.endswith("Z"):
+        return value[:-1] + "+00:00"
+    return value
+
+
+def pr_info_from_node(node: dict) -> dict:
+    """把 GraphQL 的 PullRequest 节点转换为 list_prs 的输出格式"""
+    body = node.get("body") or None
+    if body and len(body) > BODY_PREVIEW_LENGTH:
+        body = body[:BODY_PREVIEW_LENGTH] + "..."
+    merge_state = node.get("mergeStateStatus")
+    return {
+        "number": node["number"],
+        "title": node["title"],
+        "body": body,
+        # REST 只有 open / closed，已合并的 PR 也是 closed
+        "state": "open" if node["state"] == "OPEN" else "closed",
+        "head_branch": node["headRefName"],
+        "base_branch": node["baseRefName"],
+        # 作者账号被删除时 GraphQL 返回 null，REST 显示为 ghost
+        "author": (node.get("author") or {}).get("login", "ghost"),
+        "created_at": normalize_timestamp(node["createdAt"]),
+        "updated_at": normalize_timestamp(node["updatedAt"]),
+        "mergeable": MERGEABLE_VALUES.get(node.get("mergeable")),
+        "mergeable_state": merge_state.lower() if merge_state else "unknown",
+        "commits": node["commits"]["totalCount"],
+        "additions": node["additions"],
+        "deletions": node["deletions"],
+        "changed_files": node["changedFiles"],
+        "url": node["url"],
+        "review_status": {
+            "approvals": node["approvals"]["totalCount"],
+            "changes_requested": node["changesRequested"]["totalCount"],
+            "total_reviews": node["allReviews"]["totalCount"],
+        },
+    }
+
+
+def _query_variables(repo_path: str, state: str, sort: str, direction: str) -> dict:
+    if not supports_pr_query(state, sort, direction):
+        raise ValueError(f"GraphQL 不支持的参数组合: state={state}, sort={sort}, direction={direction}")
+    owner, name = repo_path.split("/", 1)
+    return {
+        "owner": owner,
+        "name": name,
+        "states": STATE_FILTERS[state],
+        "field": SORT_FIELDS[sort],
+        "direction": direction.upper(),
+        "after": None,
+    }
+
+
+def _read_page(data: dict, repo_path: str, prs: List[dict], variables: dict) -> bool:
+    """把一页结果追加到 prs，还有下一页时更新游标并返回 True"""
+    repository = data["data"]["repository"]
+    if repository is None:
+        raise ValueError(f"仓库不存在或无权访问: {repo_path}")
+    connection = repository["pullRequests"]
+    prs.extend(pr_info_from_node(node) for node in connection["nodes"] if node)
+    if not connection["pageInfo"]["hasNextPage"]:
+        return False
+    variables["after"] = connection["pageInfo"]["endCursor"]
+    return True
+
+
+def fetch_pull_requests(client, repo_path: str, state: str = "open", sort: str = "created",
+                        direction: str = "desc", limit: int = 20) -> List[dict]:
+    """
+    用 GraphQL 查询仓库的 PR 列表（每页一次请求）
+
+    Args:
+        client: github_client.GitHubClient
+        repo_path: 仓库路径，格式为 "owner/repo"
+
+    Raises:
+        ValueError: 参数无法用 GraphQL 表达
+        GithubException: 查询失败（例如 Token 没有 GraphQL 权限）
+    """
+    variables = _query_variables(repo_path, state, sort, direction)
+    prs = []
+    while len(prs) < limit:
+        variables["first"] = min(MAX_PAGE_SIZE, limit - len(prs))
+        if not _read_page(client.graphql(PULL_REQUESTS_QUERY, variables), repo_path, prs, variables):
+            break
+    return prs[:limit]
+
+
+async def fetch_pull_requests_async(client, repo_path: str, state: str = "open", sort: str = "created",
+                                    direction: str = "desc", limit: int = 20) -> List[dict]:
+    """fetch_pull_requests 的异步版本，client 为 github_async.AsyncGitHubClient"""
+    variables = _query_variables(repo_path, state, sort, direction)
+    prs = []
+    while len(prs) < limit:
+        variables["first"] = min(MAX_PAGE_SIZE, limit - len(prs))
+        if not _read_page(await client.graphql(PULL_REQUESTS_QUERY, variables), repo_path, prs, variables):
+            break
+    return prs[:limit]
@@ -0,0 +1,409 @@
+"""
+GitHub 仓库本地裸镜像
+设置 GITHUB_MIRROR=1 后，read_github_repo 为每个目标仓库维护一个裸镜像（只同步分支和标签），
+距上次同步超过 GITHUB_MIRROR_TTL 秒时执行一次 git fetch，文件内容和目录结构都从本地 git 对象读取，
+重复读取只是本地磁盘读取，不消耗 API 速率限制额度。
+审查 PR 时也从镜像计算 base...head 的 diff（见 iter_diff），不受 GitHub 的文件分页限制，
+单个文件的 patch 不截断，只受整个 PR 的字节预算限制（见 pull_diff）。
+远端地址由 GITHUB_MIRROR_REMOTE 模板生成（默认 https://github.com/{repo}.git），也可以指向本地的 file:// 远端用于测试。
+"""
+
+import base64
+import codecs
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import git
+
+from .adk_manifest import get_cache_dir
+from .github_gitdata import filter_tree
+
+# 两次 git fetch 之间的最短间隔（秒），可通过 GITHUB_MIRROR_TTL 环境变量覆盖
+DEFAULT_MIRROR_TTL = 60
+DEFAULT_REMOTE_TEMPLATE = "https://github.com/{repo}.git"
+# pull_diff 中所有 patch 合计的字节上限，可通过 GITHUB_MIRROR_DIFF_BUDGET 环境变量覆盖
+DEFAULT_DIFF_BUDGET = 100_000
+FETCH_REFSPECS = ("+refs/heads/*:refs/heads/*", "+refs/tags/*:refs/tags/*")
+# git diff --name-status 的状态 → GitHub PR 文件列表的 status
+DIFF_STATUSES = {"A": "added", "M": "modified", "D": "removed", "T": "changed"}
+# owner/name；repo_path 来自工具参数，会拼进镜像目录的路径
+REPO_PATH_PATTERN = re.compile(r"^[\w.-]+/[\w.-]+$", re.ASCII)
+
+
+def is_mirror_enabled() -> bool:
+    return os.getenv("GITHUB_MIRROR", "0").lower() in ("1", "true", "yes", "on")
+
+
+def get_mirror_dir() -> Path:
+    """镜像目录（可通过 GITHUB_MIRROR_DIR 环境变量覆盖）"""
+    mirror_dir = os.getenv("GITHUB_MIRROR_DIR")
+    return Path(mirror_dir) if mirror_dir else get_cache_dir() / "github" / "mirrors"
+
+
+def get_mirror_ttl() -> float:
+    try:
+        return float(os.getenv("GITHUB_MIRROR_TTL", DEFAULT_MIRROR_TTL))
+    except ValueError:
+        return DEFAULT_MIRROR_TTL
+
+
+def is_valid_repo_path(repo_path: Optional[str]) -> bool:
+    """repo_path 是否为 owner/name 形式（不含 ..），不满足时不能用来拼接镜像路径"""
+    return bool(repo_path) and REPO_PATH_PATTERN.match(repo_path) is not None and ".." not in repo_path
+
+
+def get_remote_url(repo_path: str) -> str:
+    return os.getenv("GITHUB_MIRROR_REMOTE", DEFAULT_REMOTE_TEMPLATE).format(repo=repo_path)
+
+
+def _header_path(raw: bytes) -> str:
+    """
+    从 diff --git a/<路径> b/<路径> 头部取出路径（--no-renames 时两侧路径相同）
+
+    含引号、反斜杠或控制字符的路径（以及默认配置下的非 ASCII 路径）会被 git 用 C 风格引号包裹并转义。
+    """
+    rest = raw[len(b"diff --git "):].rstrip(b"\n")
+    if rest.startswith(b'"'):
+        end = 1
+        while rest[end:end + 1] != b'"':
+            end += 2 if rest[end:end + 1] == b"\\" else 1
+        path = codecs.escape_decode(rest[1:end])[0]
+    else:
+        path = rest[:(len(rest) - 1) // 2]
+    return path[2:].decode("utf-8", errors="replace")
+
+
+class BareMirror:
+    """单个仓库的裸镜像"""
+
+    def __init__(self, repo_path: str, root: Path, remote_url: str, token: Optional[str] = None):
+        if not is_valid_repo_path(repo_path):
+            raise ValueError(f"无效的仓库路径: {repo_path!r}")
+        root = Path(root).resolve()
+        self.repo_path = repo_path
+        self.path = (root / f"{repo_path}.git").resolve()
+        if not self.path.is_relative_to(root):
+            raise ValueError(f"仓库路径超出镜像目录: {repo_path!r}")
+        self.remote_url = remote_url
+        self.token = token
+        self._lock = threading.Lock()
+        self._repo: Optional[git.Repo] = None
+        self.stats = {"fetches": 0, "fetch_errors": 0, "reads": 0}
+
+    def _git_env(self) -> Dict[str, str]:
+        """HTTPS 远端通过临时配置传入 Token，不写入镜像的 config，也不出现在命令行参数中"""
+        env = {"GIT_TERMINAL_PROMPT": "0"}
+        if self.token and self.remote_url.startswith("https://"):
+            basic = base64.b64encode(f"x-access-token:{self.token}".encode("utf-8")).decode("ascii")
+            env.update(GIT_CONFIG_COUNT="1", GIT_CONFIG_KEY_0="http.extraHeader",
+                       GIT_CONFIG_VALUE_0=f"Authorization: Basic {basic}")
+        return env
+
+    def _open(self) -> git.Repo:
+        if self._repo is not None:
+            return self._repo
+        if (self.path / "HEAD").exists():
+            repo = git.Repo(self.path)
+            if repo.git.config("--get", "remote.origin.url") != self.remote_url:
+                repo.git.remote("set-url", "origin", self.remote_url)
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            repo = git.Repo.init(self.path, bare=True)
+            repo.git.remote("add", "origin", self.remote_url)
+            repo.git.config("--replace-all", "remote.origin.fetch", FETCH_REFSPECS[0])
+            for refspec in FETCH_REFSPECS[1:]:
+                repo.git.config("--add", "remote.origin.fetch", refspec)
+        self._repo = repo
+        return repo
+
+    def last_fetch(self) -> Optional[float]:
+        """上次 fetch 的时间（FETCH_HEAD 的修改时间，跨进程共享）"""
+        try:
+            return (self.path / "FETCH_HEAD").stat().st_mtime
+        except OSError:
+            return None
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        距上次 fetch 超过 TTL 时同步远端
+
+        已有镜像时 fetch 失败只打印警告并继续使用旧数据；首次同步失败时抛出异常。
+
+        Returns:
+            是否执行了 fetch
+        """
+        with self._lock:
+            repo = self._open()
+            fetched = self.last_fetch()
+            if not force and fetched is not None and time.time() - fetched < get_mirror_ttl():
+                return False
+            try:
+                with repo.git.custom_environment(**self._git_env()):
+                    repo.git.fetch("--prune", "--quiet", "origin")
+            except git.GitCommandError as e:
+                self.stats["fetch_errors"] += 1
+                if fetched is None:
+                    raise
+                print(f"[github_mirror] 同步 {self.repo_path} 失败，继续使用本地镜像: {e}")
+                return False
+            self.stats["fetches"] += 1
+            return True
+
+    def has_commit(self, sha: str) -> bool:
+        try:
+            self._open().git.cat_file("-e", f"{sha}^{{commit}}")
+            return True
+        except git.GitCommandError:
+            return False
+
+    def ensure_pull(self, pr_number: int, shas: Iterable[str]):
+        """
+        确保 PR 的基础提交和头提交都在本地：缺少时同步分支并取回 refs/pull/<编号>/head（覆盖来自 fork 的 PR）
+
+        Raises:
+            LookupError: 同步后仍缺少提交
+        """
+        self.refresh()
+        missing = [sha for sha in shas if not self.has_commit(sha)]
+        if not missing:
+            return
+        pull_ref = f"refs/pull/{int(pr_number)}/head"
+        with self._lock:
+            with self._repo.git.custom_environment(**self._git_env()):
+                self._repo.git.fetch("--quiet", "origin", *FETCH_REFSPECS[:1], f"+{pull_ref}:{pull_ref}")
+            self.stats["fetches"] += 1
+        missing = [sha for sha in missing if not self.has_commit(sha)]
+        if missing:
+            raise LookupError(f"镜像中缺少提交: {', '.join(missing)}")
+
+    def iter_diff(self, base: str, head: str, patch_limit: Optional[int] = None) -> Iterator[dict]:
+        """
+        逐个文件产出 base...head（合并基础到 head）的 diff，格式与 GitHub 的 PR 文件列表相同
+
+        patch 只包含从第一个 @@ 开始的 hunk（与 GitHub 一致），二进制文件为 None；
+        diff 输出按行流式读取，每个文件最多保留 patch_limit 字节，超出部分截断为 "..." 并带有 truncated 标记。
+        patch 按 diff --git 头部中的路径归属到文件（类型变化会输出两段 patch，合并到同一文件）。
+        """
+        self._check_ref(base)
+        self._check_ref(head)
+        repo = self._open()
+        spec = f"{base}...{head}"
+        names = repo.git.diff("-z", "--no-renames", "--name-status", spec).split("\0")
+        numstat = repo.git.diff("-z", "--no-renames", "--numstat", spec).split("\0")
+        files: Dict[str, dict] = {}
+        for status, path in zip(names[0::2], names[1::2]):
+            files[path] = {"filename": path, "status": DIFF_STATUSES.get(status[:1], "changed"),
+                           "additions": 0, "deletions": 0, "changes": 0, "patch": None}
+        for line in numstat:
+            if not line:
+                continue
+            additions, deletions, path = line.split("\t", 2)
+            file = files.get(path)
+            # 二进制文件的行数为 "-"
+            if file is not None and additions != "-":
+                file["additions"] += int(additions)
+                file["deletions"] += int(deletions)
+                file["changes"] = file["additions"] + file["deletions"]
+
+        process = repo.git.diff("--no-color", "--no-ext-diff", "--no-renames", spec, as_process=True,
+                                universal_newlines=False)
+        pending = list(files)
+        current: Optional[dict] = None
+        hunks: List[str] = []
+        size = 0
+        in_hunk = False
+        completed = False
+        try:
+            for raw in process.stdout:
+                if raw.startswith(b"diff --git "):
+                    path = _header_path(raw)
+                    if current is not None and current["filename"] != path:
+                        yield self._finish_file(current, hunks)
+                        current = None
+                    # 同一路径的第二段 patch（类型变化）继续累积到当前文件
+                    if current is None:
+                        current, hunks, size = files.get(path), [], 0
+                        if current is not None:
+                            pending.remove(path)
+                    in_hunk = False
+                    continue
+                if current is None or current.get("truncated"):
+                    continue
+                if not in_hunk:
+                    if not raw.startswith(b"@@"):
+                        continue
+                    in_hunk = True
+                if patch_limit is not None and size + len(raw) > patch_limit:
+                    hunks.append(raw[:patch_limit - size].decode("utf-8", errors="ignore") + "...")
+                    current["truncated"] = True
+                    continue
+                hunks.append(raw.decode("utf-8", errors="replace"))
+                size += len(raw)
+            if current is not None:
+                yield self._finish_file(current, hunks)
+            completed = True
+        finally:
+            process.stdout.close()
+            if completed:
+                process.wait()
+            else:
+                # 调用方提前停止迭代时结束 git 进程
+                process.proc.kill()
+                process.proc.wait()
+        # 没有 patch 的条目（理论上不会出现）仍然列出
+        for path in pending:
+            yield files[path]
+        with self._lock:
+            self.stats["reads"] += 1
+
+    @staticmethod
+    def _finish_file(file: dict, hunks: List[str]) -> dict:
+        if hunks:
+            file["patch"] = "".join(hunks).rstrip("\n")
+        return file
+
+    def _check_ref(self, ref: str):
+        if not ref or ref.startswith("-"):
+            raise ValueError(f"无效的分支名: {ref!r}")
+
+    def tree_entries(self, ref: str) -> List[dict]:
+        """递归列出 ref 的 tree，条目格式与 Git Trees API 相同（path / type / size / sha）"""
+        self._check_ref(ref)
+        output = self._open().git.ls_tree("-r", "-t", "-l", "-z", ref)
+        entries = []
+        for line in output.split("\0"):
+            if not line:
+                continue
+            meta, path = line.split("\t", 1)
+            _, kind, sha, size = meta.split()
+            entries.append({"path": path, "type": kind, "sha": sha, "size": None if size == "-" else int(size)})
+        with self._lock:
+            self.stats["reads"] += 1
+        return entries
+
+    def read_file(self, ref: str, path: str) -> dict:
+        """
+        读取 ref 中的文件
+
+        Returns:
+            {"type", "sha", "size", "content"(bytes)}；type 为 missing / tree / commit 时没有内容
+        """
+        self._check_ref(ref)
+        with self._lock:
+            self.stats["reads"] += 1
+        try:
+            obj = self._open().commit(ref).tree / path.strip("/")
+        except KeyError:
+            return {"type": "missing", "sha": None, "size": None}
+        if obj.type != "blob":
+            return {"type": obj.type, "sha": obj.hexsha, "size": None}
+        return {"type": "blob", "sha": obj.hexsha, "size": obj.size, "content": obj.data_stream.read()}
+
+    def summary(self) -> dict:
+        fetched = self.last_fetch()
+        return dict(self.stats, path=str(self.path),
+                    last_fetch_age=round(time.time() - fetched, 1) if fetched is not None else None)
+
+
+_mirrors: Dict[tuple, BareMirror] = {}
+_mirrors_lock = threading.Lock()
+
+
+def get_mirror(repo_path: str, token_env: str = "GITHUB_TOKEN") -> BareMirror:
+    """
+    获取 repo_path 对应的共享镜像对象（尚未同步）
+
+    Raises:
+        ValueError: repo_path 不是 owner/name 形式
+    """
+    if not is_valid_repo_path(repo_path):
+        raise ValueError(f"无效的仓库路径: {repo_path!r}")
+    remote_url = get_remote_url(repo_path)
+    token = os.getenv(token_env) or None
+    key = (repo_path, remote_url, token)
+    with _mirrors_lock:
+        mirror = _mirrors.get(key)
+        if mirror is None:
+            mirror = _mirrors[key] = BareMirror(repo_path, get_mirror_dir(), remote_url, token)
+        return mirror
+
+
+def get_diff_budget() -> int:
+    try:
+        return int(os.getenv("GITHUB_MIRROR_DIFF_BUDGET", DEFAULT_DIFF_BUDGET))
+    except ValueError:
+        return DEFAULT_DIFF_BUDGET
+
+
+def pull_diff(repo_path: str, pr_number: int, base_sha: str, head_sha: str, token_env: str = "GITHUB_TOKEN",
+              total_limit: Optional[int] = None) -> List[dict]:
+    """
+    在镜像中计算 PR 的 base...head diff（阻塞调用，异步代码中放到线程里执行）
+
+    单个文件的 patch 不截断，唯一的上限是所有 patch 合计最多 total_limit 字节（默认 GITHUB_MIRROR_DIFF_BUDGET）：
+    跨过预算的文件截断到剩余字节并以 "..." 结尾，之后的文件仍列出统计信息但 patch 为 None，两者都带有 truncated 标记。
+    """
+    mirror = get_mirror(repo_path, token_env)
+    mirror.ensure_pull(pr_number, (base_sha, head_sha))
+    remaining = get_diff_budget() if total_limit is None else total_limit
+    files = []
+    # 单个文件最多读取整个预算，避免超大文件整段读入内存
+    for file in mirror.iter_diff(base_sha, head_sha, max(remaining, 0)):
+        patch = file["patch"]
+        if patch is not None:
+            data = patch.encode("utf-8")
+            if remaining <= 0:
+                file["patch"] = None
+                file["truncated"] = True
+            elif len(data) > remaining:
+                file["patch"] = data[:remaining].decode("utf-8", errors="ignore") + "..."
+                file["truncated"] = True
+            remaining -= len(data)
+        files.append(file)
+    return files
+
+
+def mirror_read(repo_path: str, file_path: Optional[str] = None, branch: str = "main", max_files: int = 50,
+                path_prefix: Optional[str] = None, pattern: Optional[str] = None,
+                max_depth: Optional[int] = None) -> dict:
+    """按 read_github_repo 的参数和返回格式从本地镜像读取（阻塞调用，异步代码中放到线程里执行）"""
+    mirror = get_mirror(repo_path)
+    mirror.refresh()
+
+    if file_path:
+        blob = mirror.read_file(branch, file_path)
+        if blob["type"] == "missing":
+            return {"error": f"读取文件 '{file_path}' 失败: 文件不存在"}
+        if blob["type"] != "blob":
+            return {"error": f"'{file_path}' 是一个目录，不是文件"}
+        return {
+            "file_path": file_path,
+            "content": blob["content"].decode('utf-8'),
+            "size": blob["size"],
+            "sha": blob["sha"],
+            "source": "mirror"
+        }
+
+    file_tree = filter_tree(mirror.tree_entries(branch), path_prefix, pattern, max_depth)
+    return {
+        "repo": repo_path,
+        "branch": branch,
+        "total_files": len([f for f in file_tree if f["type"] == "file"]),
+        "total_dirs": len([f for f in file_tree if f["type"] == "dir"]),
+        "file_tree": file_tree[:max_files],
+        "source": "mirror"
+    }
+
+
+def get_mirror_stats() -> dict:
+    """各镜像的 fetch 次数、失败次数、读取次数和距上次同步的秒数"""
+    with _mirrors_lock:
+        mirrors = list(_mirrors.values())
+    return {
+        "enabled": is_mirror_enabled(),
+        "mirrors": {mirror.repo_path: mirror.summary() for mirror in mirrors}
+    }
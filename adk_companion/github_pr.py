@@ -0,0 +1,93 @@
+"""
+PR 上下文
+smart_review_pr 原先依次调用 check_pr_author、review_pr、merge_pr，每一步都重新获取仓库、PR、当前用户，
+review_pr 还会再取一遍文件列表。PRContext 在一次处理流程中只加载一次 PR 元数据、文件列表和当前身份，
+作者检查、智能审查、评论和合并都使用同一个对象，一次智能审查的请求数是与步骤数无关的小常数。
+启用本地镜像时文件变更改由镜像中的 base...head diff 计算，不占用 API 分页，patch 按字节预算截断。
+"""
+
+from typing import List, Optional
+
+from .github_client import get_github_client
+from .github_mirror import is_mirror_enabled, pull_diff
+
+
+class PRContext:
+    """一次 PR 处理流程共享的仓库、PR、文件列表和当前用户（按需加载，只加载一次）"""
+
+    def __init__(self, client, repo_path: str, pr_number: int, token_env: str = "GITHUB_TOKEN"):
+        self.client = client
+        self.repo_path = repo_path
+        self.pr_number = pr_number
+        self.token_env = token_env
+        self.repo = client.get_repo(repo_path)
+        self.pr = self.repo.get_pull(pr_number)
+        self._files: Optional[list] = None
+        self._login: Optional[str] = None
+        self._local_diff = None
+
+    @classmethod
+    def load(cls, repo_path: str, pr_number: int, token_env: str = "GITHUB_TOKEN") -> "PRContext":
+        return cls(get_github_client(token_env), repo_path, pr_number, token_env)
+
+    @property
+    def author(self) -> str:
+        return self.pr.user.login
+
+    @property
+    def current_login(self) -> str:
+        if self._login is None:
+            self._login = self.client.get_login()
+        return self._login
+
+    @property
+    def is_own_pr(self) -> bool:
+        return self.author == self.current_login
+
+    @property
+    def files(self) -> list:
+        """PR 的文件变更（PyGithub File 列表，所有分页只读取一次）"""
+        if self._files is None:
+            self._files = list(self.pr.get_files())
+        return self._files
+
+    def local_diff(self) -> Optional[List[dict]]:
+        """
+        启用本地镜像（GITHUB_MIRROR=1）时在镜像中计算 base...head 的 diff（只计算一次）
+
+        不使用 GitHub 的文件列表，不消耗 API 分页；每个文件的 patch 不截断，
+        只受整个 PR 的 GITHUB_MIRROR_DIFF_BUDGET 限制。未启用镜像或计算失败时返回 None。
+        """
+        if self._local_diff is None:
+            files = None
+            if is_mirror_enabled():
+                try:
+                    files = pull_diff(self.repo_path, self.pr_number, self.pr.base.sha, self.pr.head.sha,
+                                      self.token_env)
+                except Exception as e:
+                    print(f"[github_pr] 本地 diff 计算失败，改用 GitHub 文件列表: {e}")
+            self._local_diff = (files,)
+        return self._local_diff[0]
+
+    def file_summaries(self, patch_limit: int) -> List[dict]:
+        """
+        文件变更摘要；优先使用本地镜像的完整 diff，否则取 GitHub 的文件列表，
+        此时 patch 超过 patch_limit 个字符时截断为预览（GitHub 对大文件不返回 patch，此时为 None）
+        """
+        local = self.local_diff()
+        if local is not None:
+            return local
+        summaries = []
+        for file in self.files:
+            patch = file.patch
+            if patch is not None and len(patch) > patch_limit:
+                patch = patch[:patch_limit] + "..."
+            summaries.append({
+                "filename": file.filename,
+                "status": file.status,
+                "additions": file.additions,
+                "deletions": file.deletions,
+                "changes": file.changes,
+                "patch": patch
+            })
+        return summaries
@@ -0,0 +1,584 @@
+"""
+GitHub PR 元数据本地存储
+list_prs 和 check_pr_author 原先每次调用都实时扫描 API。这里按仓库把 PR 元数据、审查计数和头提交的检查状态
+保存在 SQLite（WAL 模式，多进程可同时读取）中，同步时用 GraphQL 按 updatedAt 倒序翻页，
+遇到早于上次同步高水位的 PR 即停止，通常一次请求就能完成增量同步。
+读取前若距上次同步超过 GITHUB_PR_STORE_MAX_AGE 秒才会同步，列出上百个 PR 只是一次本地查询。
+可合并状态和检查状态变化时 updatedAt 不变，每次同步还会单独刷新所有打开的 PR 的这几个字段（见 refresh_volatile）。
+首次读取某个仓库时在后台线程中按页回填全部 PR（BULK 优先级，每页保存游标，中断后续传），
+回填完成前调用方走原来的 API 路径，不会在一次工具调用里翻完整个仓库的历史。
+存储按 Token 分区（Token 摘要，见 github_ratelimit.token_key），一个 Token 同步到的 PR 不会提供给其他 Token；
+同步需要 Token（GraphQL），匿名访问时由调用方走原来的 API 路径。
+收到过 webhook 的仓库（见 github_webhook）的元数据由事件保持最新，只按 GITHUB_PR_STORE_WEBHOOK_MAX_AGE 做兜底同步，
+可合并状态等字段仍按 GITHUB_PR_STORE_MAX_AGE 刷新。
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Optional
+
+from .adk_manifest import get_cache_dir
+from .github_graphql import MAX_PAGE_SIZE, MERGEABLE_VALUES, PULL_REQUEST_FIELDS, pr_info_from_node
+from .github_ratelimit import BULK, request_priority, token_key
+from .singleflight import get_flight
+
+# 读取时允许的最大陈旧时间（秒），可通过 GITHUB_PR_STORE_MAX_AGE 环境变量覆盖，0 表示每次读取前都增量同步
+DEFAULT_MAX_AGE = 60
+# 由 webhook 保持最新的仓库的兜底同步间隔（秒），用于补上丢失的事件，可通过 GITHUB_PR_STORE_WEBHOOK_MAX_AGE 覆盖
+DEFAULT_WEBHOOK_MAX_AGE = 3600
+STORE_FILE_NAME = "pr_store.sqlite3"
+# 表结构变化时递增；存储只是缓存，版本不一致时直接重建
+SCHEMA_VERSION = 2
+
+# 变化时不更新 updatedAt 的字段：头提交的检查状态（可合并状态在 PULL_REQUEST_FIELDS 中）
+HEAD_FIELDS = """        headRefOid
+        lastCommit: commits(last: 1) { nodes { commit { statusCheckRollup { state } } } }
+"""
+
+SYNC_QUERY = """
+query($owner: String!, $name: String!, $first: Int!, $after: String) {
+  repository(owner: $owner, name: $name) {
+    pullRequests(first: $first, after: $after, orderBy: {field: UPDATED_AT, direction: DESC}) {
+      pageInfo { hasNextPage endCursor }
+      nodes {%s%s        comments { totalCount }
+      }
+    }
+  }
+}
+""" % (PULL_REQUEST_FIELDS, HEAD_FIELDS)
+
+# 只取打开的 PR 的可合并状态和检查状态
+VOLATILE_QUERY = """
+query($owner: String!, $name: String!, $first: Int!, $after: String) {
+  repository(owner: $owner, name: $name) {
+    pullRequests(first: $first, after: $after, states: OPEN) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        number
+        mergeable
+        mergeStateStatus
+%s      }
+    }
+  }
+}
+""" % HEAD_FIELDS
+
+# list_prs 的 sort 参数 → 排序列（popularity 按评论数）
+SORT_COLUMNS = {"created": "created_at", "updated": "updated_at", "popularity": "comments"}
+STATE_VALUES = {"open": ("open",), "closed": ("closed",), "all": ("open", "closed")}
+
+
+def get_store_path() -> Path:
+    """存储文件路径（可通过 GITHUB_PR_STORE_DIR 环境变量覆盖目录）"""
+    store_dir = os.getenv("GITHUB_PR_STORE_DIR")
+    return (Path(store_dir) if store_dir else get_cache_dir() / "github") / STORE_FILE_NAME
+
+
+def get_max_age() -> float:
+    try:
+        return float(os.getenv("GITHUB_PR_STORE_MAX_AGE", DEFAULT_MAX_AGE))
+    except ValueError:
+        return DEFAULT_MAX_AGE
+
+
+def get_webhook_max_age() -> float:
+    try:
+        return float(os.getenv("GITHUB_PR_STORE_WEBHOOK_MAX_AGE", DEFAULT_WEBHOOK_MAX_AGE))
+    except ValueError:
+        return DEFAULT_WEBHOOK_MAX_AGE
+
+
+def is_store_enabled() -> bool:
+    return os.getenv("GITHUB_PR_STORE", "0").lower() in ("1", "true", "yes", "on")
+
+
+def supports_store_query(state: str, sort: str, direction: str) -> bool:
+    return state in STATE_VALUES and sort in SORT_COLUMNS and direction in ("asc", "desc")
+
+
+def volatile_fields(node: dict) -> dict:
+    """节点中变化时不更新 updatedAt 的字段：可合并状态、头提交和它的检查状态"""
+    commits = node["lastCommit"]["nodes"]
+    rollup = (commits[0]["commit"].get("statusCheckRollup") if commits and commits[0] else None) or {}
+    merge_state = node.get("mergeStateStatus")
+    return {
+        "mergeable": MERGEABLE_VALUES.get(node.get("mergeable")),
+        "mergeable_state": merge_state.lower() if merge_state else "unknown",
+        "head_sha": node.get("headRefOid"),
+        "checks_state": rollup["state"].lower() if rollup.get("state") else None,
+    }
+
+
+def pr_record_from_node(node: dict) -> dict:
+    """同步查询的节点 → list_prs 的输出格式，另加评论数、头提交和它的检查状态"""
+    info = pr_info_from_node(node)
+    info.update(volatile_fields(node))
+    info["comments"] = node["comments"]["totalCount"]
+    return info
+
+
+class PRStore:
+    """
+    按 (Token 分区, 仓库) 保存 PR 元数据的 SQLite 存储
+
+    pulls / repos 按 scope（Token 摘要）分区；webhook 相关的表（hooks、checks、reviews、deliveries）
+    描述的是仓库本身的事件，按仓库保存，应用到已同步过该仓库的各个分区。
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._depth = 0
+        # 自动提交模式，事务由 transaction() 显式控制
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        with self.transaction() as conn:
+            if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                for table in ("pulls", "repos", "hooks", "checks", "reviews", "deliveries"):
+                    conn.execute(f"DROP TABLE IF EXISTS {table}")
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS pulls ("
+                "scope TEXT, repo TEXT, number INTEGER, state TEXT, author TEXT, created_at TEXT, updated_at TEXT, "
+                "comments INTEGER, head_sha TEXT, data TEXT, PRIMARY KEY (scope, repo, number))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS pulls_updated ON pulls (scope, repo, updated_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS pulls_created ON pulls (scope, repo, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS pulls_head ON pulls (repo, head_sha)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS repos ("
+                "scope TEXT, repo TEXT, synced_at REAL, high_water TEXT, volatile_at REAL, "
+                "backfill_started REAL, backfill_cursor TEXT, PRIMARY KEY (scope, repo))"
+            )
+            # webhook 事件的状态：最近的事件时间、各提交的检查、已计数的审查、已处理的投递 ID（重放时去重）
+            conn.execute("CREATE TABLE IF NOT EXISTS hooks (repo TEXT PRIMARY KEY, webhook_at REAL)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS checks ("
+                "repo TEXT, sha TEXT, type TEXT, context TEXT, state TEXT, PRIMARY KEY (repo, sha, type, context))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS reviews ("
+                "repo TEXT, number INTEGER, review_id INTEGER, state TEXT, PRIMARY KEY (repo, number, review_id))"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS deliveries (id TEXT PRIMARY KEY, event TEXT, received_at REAL)")
+        self.stats = {"syncs": 0, "sync_pages": 0, "synced_prs": 0, "volatile_refreshes": 0, "queries": 0,
+                      "events": 0}
+
+    @contextmanager
+    def transaction(self):
+        """
+        写事务：BEGIN IMMEDIATE 在开始时就取得写锁，读-改-写在多个线程和多个进程之间都是原子的；
+        出错时回滚。嵌套调用并入最外层事务
+        """
+        with self._lock:
+            if self._depth:
+                self._depth += 1
+                try:
+                    yield self._conn
+                finally:
+                    self._depth -= 1
+                return
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._depth = 1
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            else:
+                self._conn.execute("COMMIT")
+            finally:
+                self._depth = 0
+
+    def _one(self, sql: str, params: tuple) -> Optional[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()
+
+    def sync_state(self, scope: str, repo_path: str) -> tuple:
+        """(上次同步完成的时间, 已见过的最大 updated_at)，回填完成前同步时间为 None"""
+        row = self._one("SELECT synced_at, high_water FROM repos WHERE scope = ? AND repo = ?", (scope, repo_path))
+        return row if row else (None, None)
+
+    def scopes(self, repo_path: str) -> List[str]:
+        """已完成回填、可以接收该仓库 webhook 更新的分区"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT scope FROM repos WHERE repo = ? AND synced_at IS NOT NULL", (repo_path,)
+            ).fetchall()
+        return [scope for (scope,) in rows]
+
+    def upsert(self, scope: str, repo_path: str, prs: List[dict]):
+        rows = [
+            (scope, repo_path, pr["number"], pr["state"], pr["author"], pr["created_at"], pr["updated_at"],
+             pr.get("comments", 0), pr.get("head_sha"), json.dumps(pr, ensure_ascii=False))
+            for pr in prs
+        ]
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO pulls "
+                "(scope, repo, number, state, author, created_at, updated_at, comments, head_sha, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def mark_synced(self, scope: str, repo_path: str, synced_at: float, high_water: Optional[str]):
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT INTO repos (scope, repo, synced_at, high_water) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (scope, repo) DO UPDATE SET synced_at = excluded.synced_at, "
+                "high_water = excluded.high_water",
+                (scope, repo_path, synced_at, high_water),
+            )
+
+    def backfill_state(self, scope: str, repo_path: str, started: float) -> tuple:
+        """开始或继续回填，返回 (回填开始时间, 游标, 第一页的最新 updated_at)"""
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT INTO repos (scope, repo, backfill_started) VALUES (?, ?, ?) ON CONFLICT (scope, repo) "
+                "DO UPDATE SET backfill_started = COALESCE(backfill_started, excluded.backfill_started)",
+                (scope, repo_path, started),
+            )
+            return conn.execute(
+                "SELECT backfill_started, backfill_cursor, high_water FROM repos WHERE scope = ? AND repo = ?",
+                (scope, repo_path),
+            ).fetchone()
+
+    def save_backfill(self, scope: str, repo_path: str, cursor: Optional[str], high_water: Optional[str]):
+        with self.transaction() as conn:
+            conn.execute("UPDATE repos SET backfill_cursor = ?, high_water = ? WHERE scope = ? AND repo = ?",
+                         (cursor, high_water, scope, repo_path))
+
+    def volatile_at(self, scope: str, repo_path: str) -> Optional[float]:
+        """上次刷新可合并状态和检查状态的时间"""
+        row = self._one("SELECT volatile_at FROM repos WHERE scope = ? AND repo = ?", (scope, repo_path))
+        return row[0] if row else None
+
+    def update_volatile(self, scope: str, repo_path: str, fields: dict, refreshed_at: float):
+        """
+        用 {编号: volatile_fields(...)} 更新打开的 PR 的可合并状态和检查状态
+
+        读取和写回在同一个事务内完成，不覆盖期间其他字段的变化；存储中还没有的 PR 留给下次增量同步。
+        """
+        numbers = list(fields)
+        with self.transaction() as conn:
+            for start in range(0, len(numbers), 500):
+                chunk = numbers[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT number, data FROM pulls WHERE scope = ? AND repo = ? "
+                    f"AND number IN ({', '.join('?' * len(chunk))})",
+                    (scope, repo_path, *chunk),
+                ).fetchall()
+                updates = []
+                for number, data in rows:
+                    pr = json.loads(data)
+                    pr.update(fields[number])
+                    updates.append((pr["head_sha"], json.dumps(pr, ensure_ascii=False), scope, repo_path, number))
+                conn.executemany(
+                    "UPDATE pulls SET head_sha = ?, data = ? WHERE scope = ? AND repo = ? AND number = ?", updates
+                )
+            conn.execute("UPDATE repos SET volatile_at = ? WHERE scope = ? AND repo = ?",
+                         (refreshed_at, scope, repo_path))
+
+    def webhook_at(self, repo_path: str) -> Optional[float]:
+        """最近一次收到该仓库 webhook 事件的时间，从未收到时为 None"""
+        row = self._one("SELECT webhook_at FROM hooks WHERE repo = ?", (repo_path,))
+        return row[0] if row else None
+
+    def mark_webhook(self, repo_path: str, received_at: float):
+        with self.transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO hooks VALUES (?, ?)", (repo_path, received_at))
+
+    def invalidate(self, repo_path: str):
+        """所有分区下次读取时强制增量同步（事件不足以确定状态时使用）"""
+        with self.transaction() as conn:
+            conn.execute("UPDATE repos SET synced_at = 0 WHERE repo = ? AND synced_at IS NOT NULL", (repo_path,))
+
+    def has_delivery(self, delivery_id: str) -> bool:
+        """该 webhook 投递是否已处理过（重复投递或重放）"""
+        return self._one("SELECT 1 FROM deliveries WHERE id = ?", (delivery_id,)) is not None
+
+    def add_delivery(self, delivery_id: str, event: str):
+        """登记已处理的 webhook 投递；应与事件的更新放在同一个事务中，更新失败时一起回滚"""
+        with self.transaction() as conn:
+            conn.execute("INSERT OR IGNORE INTO deliveries VALUES (?, ?, ?)", (delivery_id, event, time.time()))
+
+    def set_check(self, repo_path: str, sha: str, check_type: str, context: str, state: str) -> List[dict]:
+        """记录提交上一个检查的最新状态，返回该提交已知的全部检查"""
+        with self.transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO checks VALUES (?, ?, ?, ?, ?)",
+                         (repo_path, sha, check_type, context, state))
+            return self.get_checks(repo_path, sha)
+
+    def get_checks(self, repo_path: str, sha: str) -> List[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT type, context, state FROM checks WHERE repo = ? AND sha = ?", (repo_path, sha)
+            ).fetchall()
+        return [{"type": check_type, "context": context, "state": state} for check_type, context, state in rows]
+
+    def find_by_head(self, scope: str, repo_path: str, sha: str) -> List[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM pulls WHERE scope = ? AND repo = ? AND head_sha = ?", (scope, repo_path, sha)
+            ).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def set_review(self, repo_path: str, number: int, review_id: int, state: str) -> Optional[str]:
+        """记录审查的状态，返回之前记录的状态（未记录过时为 None）"""
+        with self.transaction() as conn:
+            row = conn.execute(
+                "SELECT state FROM reviews WHERE repo = ? AND number = ? AND review_id = ?",
+                (repo_path, number, review_id),
+            ).fetchone()
+            conn.execute("INSERT OR REPLACE INTO reviews VALUES (?, ?, ?, ?)", (repo_path, number, review_id, state))
+        return row[0] if row else None
+
+    def query(self, scope: str, repo_path: str, state: str = "open", sort: str = "created",
+              direction: str = "desc", limit: int = 20) -> List[dict]:
+        states = STATE_VALUES[state]
+        order = "DESC" if direction == "desc" else "ASC"
+        sql = (
+            f"SELECT data FROM pulls WHERE scope = ? AND repo = ? AND state IN ({', '.join('?' * len(states))}) "
+            f"ORDER BY {SORT_COLUMNS[sort]} {order}, number {order} LIMIT ?"
+        )
+        with self._lock:
+            rows = self._conn.execute(sql, (scope, repo_path, *states, limit)).fetchall()
+            self.stats["queries"] += 1
+        return [json.loads(data) for (data,) in rows]
+
+    def get(self, scope: str, repo_path: str, number: int) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM pulls WHERE scope = ? AND repo = ? AND number = ?", (scope, repo_path, number)
+            ).fetchone()
+            self.stats["queries"] += 1
+        return json.loads(row[0]) if row else None
+
+    def summary(self) -> dict:
+        with self._lock:
+            repos, scopes, prs, hooked = self._conn.execute(
+                "SELECT (SELECT COUNT(DISTINCT repo) FROM repos), (SELECT COUNT(DISTINCT scope) FROM repos), "
+                "(SELECT COUNT(*) FROM pulls), (SELECT COUNT(*) FROM hooks)"
+            ).fetchone()
+            return dict(self.stats, repos=repos, scopes=scopes, prs=prs, webhook_repos=hooked, path=str(self.path))
+
+
+_store: Optional[PRStore] = None
+_store_lock = threading.Lock()
+
+
+def get_pr_store() -> Optional[PRStore]:
+    """获取进程内共享的 PR 存储，未启用或无法创建时返回 None"""
+    global _store
+    if not is_store_enabled():
+        return None
+    with _store_lock:
+        if _store is None:
+            try:
+                _store = PRStore(get_store_path())
+            except (OSError, sqlite3.Error) as e:
+                print(f"[github_prstore] 无法创建 PR 存储，直接查询 GitHub: {e}")
+                return None
+        return _store
+
+
+_backfills: set = set()
+_backfills_lock = threading.Lock()
+
+
+def _fetch_pages(store: PRStore, client, query: str, repo_path: str, after: Optional[str] = None):
+    """逐页执行按仓库分页的 PR 查询，产出 (节点列表, 下一页游标)；最后一页的游标为 None"""
+    owner, name = repo_path.split("/", 1)
+    variables = {"owner": owner, "name": name, "first": MAX_PAGE_SIZE, "after": after}
+    while True:
+        data = client.graphql(query, variables)
+        repository = data["data"]["repository"]
+        if repository is None:
+            raise ValueError(f"仓库不存在或无权访问: {repo_path}")
+        connection = repository["pullRequests"]
+        store.stats["sync_pages"] += 1
+        page_info = connection["pageInfo"]
+        cursor = page_info["endCursor"] if page_info["hasNextPage"] else None
+        yield [node for node in connection["nodes"] if node], cursor
+        if cursor is None:
+            return
+        variables["after"] = cursor
+
+
+def backfill_repo(store: PRStore, client, repo_path: str) -> int:
+    """
+    首次同步：按 updatedAt 倒序取回全部 PR，每页之后保存游标，中断（进程重启）后从游标继续
+
+    完成后以回填开始时间作为上次同步时间、第一页的最新 updatedAt 作为高水位，
+    回填期间更新的 PR 由下一次增量同步补上。
+
+    Returns:
+        本次写入的 PR 数
+    """
+    scope = token_key(client.token)
+    started, cursor, high_water = store.backfill_state(scope, repo_path, time.time())
+    synced = 0
+    for nodes, cursor in _fetch_pages(store, client, SYNC_QUERY, repo_path, cursor):
+        records = [pr_record_from_node(node) for node in nodes]
+        if high_water is None and records:
+            high_water = records[0]["updated_at"]
+        with store.transaction():
+            store.upsert(scope, repo_path, records)
+            store.save_backfill(scope, repo_path, cursor, high_water)
+            if cursor is None:
+                store.mark_synced(scope, repo_path, started, high_water)
+        synced += len(records)
+    store.stats["syncs"] += 1
+    store.stats["synced_prs"] += synced
+    return synced
+
+
+def start_backfill(store: PRStore, client, repo_path: str) -> bool:
+    """在后台线程中回填仓库（BULK 优先级），同一进程内已在回填时返回 False"""
+    key = (token_key(client.token), repo_path)
+    with _backfills_lock:
+        if key in _backfills:
+            return False
+        _backfills.add(key)
+
+    def run():
+        try:
+            with request_priority(BULK):
+                synced = backfill_repo(store, client, repo_path)
+            print(f"[github_prstore] 已回填 {repo_path}: {synced} 个 PR")
+        except Exception as e:
+            print(f"[github_prstore] 回填 {repo_path} 失败，下次读取时重试: {e}")
+        finally:
+            with _backfills_lock:
+                _backfills.discard(key)
+
+    threading.Thread(target=run, name=f"pr-backfill-{repo_path}", daemon=True).start()
+    return True
+
+
+def sync_repo(store: PRStore, client, repo_path: str) -> int:
+    """
+    增量同步：按 updatedAt 倒序翻页，遇到早于高水位的 PR 即停止（首次同步由 backfill_repo 完成），
+    随后刷新打开的 PR 的可合并状态和检查状态
+
+    Returns:
+        本次写入的 PR 数
+    """
+    scope = token_key(client.token)
+    started = time.time()
+    _, high_water = store.sync_state(scope, repo_path)
+    newest = high_water
+    synced = 0
+    for nodes, _ in _fetch_pages(store, client, SYNC_QUERY, repo_path):
+        records = [pr_record_from_node(node) for node in nodes]
+        # 与高水位相同的 PR 也重新写入，避免漏掉同一秒内更新的 PR
+        fresh = [pr for pr in records if high_water is None or pr["updated_at"] >= high_water]
+        store.upsert(scope, repo_path, fresh)
+        synced += len(fresh)
+        if fresh:
+            newest = max(newest or "", fresh[0]["updated_at"])
+        if len(fresh) < len(records):
+            break
+    store.mark_synced(scope, repo_path, started, newest)
+    store.stats["syncs"] += 1
+    store.stats["synced_prs"] += synced
+    refresh_volatile(store, client, repo_path)
+    return synced
+
+
+def refresh_volatile(store: PRStore, client, repo_path: str) -> int:
+    """
+    刷新所有打开的 PR 的可合并状态和检查状态（它们变化时 updatedAt 不变，增量同步取不到）
+
+    GitHub 在首次查询时才开始计算可合并状态，刚同步时常为 unknown，下次刷新即可得到结果。
+
+    Returns:
+        刷新的 PR 数
+    """
+    started = time.time()
+    fields = {}
+    for nodes, _ in _fetch_pages(store, client, VOLATILE_QUERY, repo_path):
+        for node in nodes:
+            fields[node["number"]] = volatile_fields(node)
+    store.update_volatile(token_key(client.token), repo_path, fields, started)
+    store.stats["volatile_refreshes"] += 1
+    return len(fields)
+
+
+def ensure_fresh(client, repo_path: str, backfill: bool = True) -> Optional[float]:
+    """
+    确保 client 的 Token 分区中该仓库的数据足够新，距上次同步超过 GITHUB_PR_STORE_MAX_AGE 时增量同步
+    （同一分区、同一仓库的并发同步合并为一次）；
+    收到过 webhook 的仓库的元数据改用 GITHUB_PR_STORE_WEBHOOK_MAX_AGE，但可合并状态和检查状态
+    仍按 GITHUB_PR_STORE_MAX_AGE 刷新（没有订阅的事件会通知这些变化）。
+    陈旧时间取元数据（最近一次同步或事件）和这些字段中较旧的一个
+
+    Args:
+        backfill: 仓库尚未回填时是否在后台开始回填；单个 PR 的读取不值得为此回填整个仓库
+
+    Returns:
+        数据的陈旧时间（秒）；存储未启用、没有 Token 或仓库尚未回填完成时返回 None
+    """
+    store = get_pr_store()
+    if store is None or not client.token:
+        return None
+    flight = get_flight("github_prstore")
+    scope = token_key(client.token)
+    synced_at, _ = store.sync_state(scope, repo_path)
+    if synced_at is None:
+        if backfill:
+            start_backfill(store, client, repo_path)
+        return None
+    webhook_at = store.webhook_at(repo_path)
+    max_age = get_max_age() if webhook_at is None else max(get_max_age(), get_webhook_max_age())
+    if time.time() - synced_at > max_age:
+        flight.do((scope, repo_path, "sync"), lambda: sync_repo(store, client, repo_path))
+        synced_at, _ = store.sync_state(scope, repo_path)
+    elif time.time() - (store.volatile_at(scope, repo_path) or 0) > get_max_age():
+        flight.do((scope, repo_path, "volatile"), lambda: refresh_volatile(store, client, repo_path))
+    metadata_at = max(synced_at, webhook_at or 0)
+    return max(0.0, time.time() - min(metadata_at, store.volatile_at(scope, repo_path) or metadata_at))
+
+
+def list_stored_prs(client, repo_path: str, state: str = "open", sort: str = "created",
+                    direction: str = "desc", limit: int = 20) -> Optional[dict]:
+    """
+    从存储中列出 PR（必要时先增量同步）
+
+    Returns:
+        {"prs", "age"}；存储不可用、尚未回填完成或参数不支持时返回 None
+    """
+    if not supports_store_query(state, sort, direction):
+        return None
+    age = ensure_fresh(client, repo_path)
+    if age is None:
+        return None
+    prs = get_pr_store().query(token_key(client.token), repo_path, state, sort, direction, limit)
+    return {"prs": prs, "age": round(age, 1)}
+
+
+def get_stored_pr(client, repo_path: str, pr_number: int) -> Optional[dict]:
+    """
+    从存储中读取单个 PR（必要时先增量同步）
+
+    仓库尚未回填时不开始回填，返回 None 由调用方直接查询 API；存储不可用或不存在该 PR 时同样返回 None
+    """
+    if ensure_fresh(client, repo_path, backfill=False) is None:
+        return None
+    return get_pr_store().get(token_key(client.token), repo_path, pr_number)
+
+
+def get_pr_store_stats() -> dict:
+    """同步次数、同步页数、写入的 PR 数、本地查询次数和存储大小"""
+    store = get_pr_store()
+    if store is None:
+        return {"enabled": False}
+    return dict(store.summary(), enabled=True, max_age=get_max_age())
@@ -0,0 +1,305 @@
+"""
+GitHub 速率限制调度
+按 Token 记录响应头中的 X-RateLimit-Limit / Remaining / Reset，用令牌桶把剩余额度均匀分摊到
+重置前的时间窗口内；遇到 403/429 的主/次级速率限制时按 Retry-After（或重置时间）暂停该 Token
+的所有请求（同步连接与 github_async 的异步客户端共用同一份额度）。请求分为交互式（默认，例如
+check_pr_author）和批量（例如 list_prs 的逐个 PR 补充信息），批量请求在有交互式请求排队时让行；
+剩余额度低于保留值后，批量请求只按分摊速率的一小部分放行，间隔超过等待上限时立即报错并给出额度重置时间。
+"""
+
+import asyncio
+import contextvars
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Optional
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+
+# 令牌桶容量：至少允许的突发请求数；额度充足时容量随剩余额度放大（剩余额度的 5%）
+DEFAULT_BURST = 10
+BURST_REMAINING_RATIO = 0.05
+# 单次等待的最长时间（秒），超过时直接报错而不是长时间阻塞工具调用
+DEFAULT_MAX_WAIT = 60
+# 剩余额度低于上限的这个比例时，批量请求降速，把额度留给交互式请求
+DEFAULT_BULK_RESERVE_RATIO = 0.1
+# 进入保留额度后，批量请求的速率为分摊速率的这个比例
+DEFAULT_BULK_RESERVE_RATE = 0.1
+# 遇到速率限制后，同一请求最多重试的次数
+MAX_RATE_LIMIT_RETRIES = 2
+# 次级速率限制未给出 Retry-After 时的等待时间（秒）
+SECONDARY_LIMIT_BACKOFF = 30
+
+_priority: contextvars.ContextVar = contextvars.ContextVar("github_request_priority", default=INTERACTIVE)
+
+
+class RateLimitExceeded(Exception):
+    """速率限制需要等待的时间超过上限"""
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+@contextmanager
+def request_priority(priority: str):
+    """在 with 块内发出的 GitHub 请求使用指定优先级（INTERACTIVE 或 BULK）"""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def token_key(authorization: Optional[str], resource: Optional[str] = None) -> str:
+    """
+    由 Authorization 头得到 Token 的摘要，用于区分额度（不保存 Token 本身）
+
+    GraphQL 与 REST 的额度分开计算，resource="graphql" 时得到独立的键。
+    """
+    if not authorization:
+        key = "anonymous"
+    else:
+        key = hashlib.sha256(authorization.split()[-1].encode("utf-8")).hexdigest()[:12]
+    return f"{key}:{resource}" if resource else key
+
+
+class _TokenState:
+    def __init__(self, burst: float):
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None
+        self.reset: Optional[float] = None
+        self.blocked_until = 0.0
+        self.tokens = burst
+        self.refilled = time.monotonic()
+        self.interactive_waiting = 0
+        self.bulk_last = 0.0
+        self.stats = {"requests": 0, "paced_waits": 0, "bulk_yields": 0, "rate_limited": 0, "retries": 0}
+
+
+class RateLimitScheduler:
+    """按 Token 调度 GitHub 请求"""
+
+    def __init__(self, burst: float = DEFAULT_BURST, max_wait: float = DEFAULT_MAX_WAIT,
+                 bulk_reserve_ratio: float = DEFAULT_BULK_RESERVE_RATIO,
+                 bulk_reserve_rate: float = DEFAULT_BULK_RESERVE_RATE):
+        self.burst = burst
+        self.max_wait = max_wait
+        self.bulk_reserve_ratio = bulk_reserve_ratio
+        self.bulk_reserve_rate = bulk_reserve_rate
+        self._cond = threading.Condition()
+        self._states: Dict[str, _TokenState] = {}
+        self._labels: Dict[str, str] = {}
+
+    def label(self, key: str, name: str):
+        """为 Token 摘要登记可读名称（token_env），用于统计输出"""
+        with self._cond:
+            self._labels[key] = name
+
+    def _name(self, key: str) -> str:
+        base, _, resource = key.partition(":")
+        name = self._labels.get(base, base)
+        return f"{name}:{resource}" if resource else name
+
+    def _state(self, key: str) -> _TokenState:
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = _TokenState(self.burst)
+        return state
+
+    def _capacity(self, state: _TokenState) -> float:
+        return max(self.burst, (state.remaining or 0) * BURST_REMAINING_RATIO)
+
+    def _refill(self, state: _TokenState, now: float):
+        elapsed = time.monotonic() - state.refilled
+        state.refilled = time.monotonic()
+        rate = self._rate(state, now)
+        capacity = self._capacity(state)
+        state.tokens = capacity if rate is None else min(capacity, state.tokens + elapsed * rate)
+
+    def _rate(self, state: _TokenState, now: float) -> Optional[float]:
+        """把剩余额度分摊到重置前的窗口内得到的每秒请求数，未知时不限速"""
+        if state.remaining is None or state.reset is None or state.reset <= now:
+            return None
+        return state.remaining / (state.reset - now)
+
+    def _in_reserve(self, state: _TokenState, now: float) -> bool:
+        """剩余额度是否已低于为交互式请求保留的部分"""
+        return bool(state.remaining is not None and state.limit and state.reset and state.reset > now
+                    and state.remaining <= state.limit * self.bulk_reserve_ratio)
+
+    def _wait_time(self, state: _TokenState, priority: str, now: float) -> float:
+        if state.blocked_until > now:
+            return state.blocked_until - now
+        if priority == BULK:
+            if state.interactive_waiting:
+                state.stats["bulk_yields"] += 1
+                return 0.05
+            if self._in_reserve(state, now):
+                # 批量请求不完全停下，按分摊速率的一小部分放行；额度耗尽时等到重置
+                rate = (self._rate(state, now) or 0.0) * self.bulk_reserve_rate
+                next_at = state.bulk_last + 1 / rate if rate > 0 else state.reset
+                if next_at > now:
+                    return next_at - now
+        self._refill(state, now)
+        if state.tokens >= 1:
+            return 0.0
+        rate = self._rate(state, now)
+        return (1 - state.tokens) / rate if rate else 0.0
+
+    def _poll(self, key: str, state: _TokenState, priority: str) -> float:
+        """在锁内检查一次：可以发出请求时扣除额度并返回 0，否则返回需要等待的秒数"""
+        now = time.time()
+        wait = self._wait_time(state, priority, now)
+        if wait > self.max_wait:
+            resume_at = datetime.fromtimestamp(now + wait).strftime("%H:%M:%S")
+            message = (f"GitHub 速率限制额度不足（{self._name(key)}），预计 {resume_at} 恢复，"
+                       f"需要等待 {wait:.0f} 秒，超过上限 {self.max_wait:.0f} 秒")
+            if priority == BULK and self._in_reserve(state, now):
+                reset_at = datetime.fromtimestamp(state.reset).strftime("%H:%M:%S")
+                message += (f"；剩余 {state.remaining} 次已进入为交互式请求保留的额度，批量请求降速放行，"
+                            f"额度将在 {reset_at} 重置")
+            raise RateLimitExceeded(message)
+        if wait <= 0:
+            if priority == BULK:
+                state.bulk_last = now
+            state.tokens -= 1
+            if state.remaining is not None:
+                state.remaining = max(0, state.remaining - 1)
+            state.stats["requests"] += 1
+        return wait
+
+    def _enter(self, key: str, priority: str) -> _TokenState:
+        state = self._state(key)
+        if priority == INTERACTIVE:
+            state.interactive_waiting += 1
+        return state
+
+    def _leave(self, state: _TokenState, priority: str):
+        if priority == INTERACTIVE:
+            state.interactive_waiting -= 1
+        self._cond.notify_all()
+
+    def acquire(self, key: str, priority: Optional[str] = None):
+        """在发出请求前调用，必要时等待；需要等待过久时抛出 RateLimitExceeded"""
+        priority = priority or _priority.get()
+        with self._cond:
+            state = self._enter(key, priority)
+            try:
+                waited = False
+                while True:
+                    wait = self._poll(key, state, priority)
+                    if wait <= 0:
+                        break
+                    if not waited:
+                        state.stats["paced_waits"] += 1
+                        waited = True
+                    self._cond.wait(min(wait, 1.0))
+            finally:
+                self._leave(state, priority)
+
+    async def acquire_async(self, key: str, priority: Optional[str] = None):
+        """acquire 的 asyncio 版本：等待时让出事件循环而不是阻塞线程"""
+        priority = priority or _priority.get()
+        with self._cond:
+            state = self._enter(key, priority)
+        try:
+            waited = False
+            while True:
+                with self._cond:
+                    wait = self._poll(key, state, priority)
+                    if wait > 0 and not waited:
+                        state.stats["paced_waits"] += 1
+                if wait <= 0:
+                    break
+                waited = True
+                await asyncio.sleep(min(wait, 1.0))
+        finally:
+            with self._cond:
+                self._leave(state, priority)
+
+    def observe(self, key: str, status: int, headers, body: str = "") -> Optional[float]:
+        """
+        根据响应头更新额度
+
+        Returns:
+            响应为速率限制错误时返回建议的重试等待秒数，否则返回 None
+        """
+        headers = {k.lower(): v for k, v in headers.items()}
+        now = time.time()
+        with self._cond:
+            state = self._state(key)
+            first_observation = state.limit is None
+            try:
+                if "x-ratelimit-limit" in headers:
+                    state.limit = int(headers["x-ratelimit-limit"])
+                if "x-ratelimit-remaining" in headers:
+                    state.remaining = int(headers["x-ratelimit-remaining"])
+                if "x-ratelimit-reset" in headers:
+                    state.reset = float(headers["x-ratelimit-reset"])
+            except ValueError:
+                pass
+            if first_observation and state.limit is not None:
+                # 第一次得知额度时按当前剩余额度装满令牌桶
+                state.tokens = self._capacity(state)
+
+            wait = None
+            if status in (403, 429):
+                if "retry-after" in headers:
+                    try:
+                        wait = float(headers["retry-after"])
+                    except ValueError:
+                        wait = SECONDARY_LIMIT_BACKOFF
+                elif state.remaining == 0 and state.reset:
+                    wait = max(0.0, state.reset - now) + 1
+                elif "rate limit" in (body or "").lower():
+                    wait = SECONDARY_LIMIT_BACKOFF
+            if wait is not None:
+                state.stats["rate_limited"] += 1
+                state.blocked_until = max(state.blocked_until, now + wait)
+            self._cond.notify_all()
+            return wait
+
+    def record_retry(self, key: str):
+        with self._cond:
+            self._state(key).stats["retries"] += 1
+
+    def snapshot(self) -> dict:
+        """每个 Token 的额度与调度统计"""
+        now = time.time()
+        with self._cond:
+            result = {}
+            for key, state in self._states.items():
+                result[self._name(key)] = dict(
+                    state.stats,
+                    limit=state.limit,
+                    remaining=state.remaining,
+                    reset_in_seconds=round(state.reset - now) if state.reset else None,
+                    blocked_for_seconds=round(max(0.0, state.blocked_until - now), 1),
+                )
+            return result
+
+
+_scheduler: Optional[RateLimitScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> RateLimitScheduler:
+    """获取进程内共享的调度器（参数可通过 GITHUB_RATE_LIMIT_* 环境变量调整）"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RateLimitScheduler(
+                burst=_env_float("GITHUB_RATE_LIMIT_BURST", DEFAULT_BURST),
+                max_wait=_env_float("GITHUB_RATE_LIMIT_MAX_WAIT", DEFAULT_MAX_WAIT),
+                bulk_reserve_ratio=_env_float("GITHUB_RATE_LIMIT_BULK_RESERVE", DEFAULT_BULK_RESERVE_RATIO),
+                bulk_reserve_rate=_env_float("GITHUB_RATE_LIMIT_BULK_RESERVE_RATE", DEFAULT_BULK_RESERVE_RATE),
+            )
+        return _scheduler
@@ -0,0 +1,272 @@
+"""
+GitHub webhook 接收
+PR 存储（github_prstore）原先只能靠读取时轮询同步，管理的仓库越多请求越多。这里提供一个 FastAPI 路由，
+接收 pull_request、pull_request_review、status、check_run 事件：用 GITHUB_WEBHOOK_SECRET 校验
+X-Hub-Signature-256 签名后直接更新本地 PR 存储，收到过事件的仓库的元数据不再按 GITHUB_PR_STORE_MAX_AGE 轮询。
+可合并状态没有对应的事件（例如基础分支的推送造成冲突），仍由 PR 存储按 GITHUB_PR_STORE_MAX_AGE 刷新，事件不修改它。
+按 X-GitHub-Delivery 去重，重复投递不会重复计数；设置 GITHUB_WEBHOOK_RECORD 后把收到的事件追加到 JSONL 文件，
+可用 `python -m adk_companion.github_webhook replay <文件>` 在本地重放。
+"""
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import sys
+import time
+import uuid
+from functools import partial
+from pathlib import Path
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Request
+
+from .github_checks import rollup_state
+from .github_graphql import BODY_PREVIEW_LENGTH, normalize_timestamp
+from .github_prstore import PRStore, get_pr_store
+
+SUPPORTED_EVENTS = ("pull_request", "pull_request_review", "status", "check_run")
+# 审查状态 → review_status 中的计数字段（commented 只计入总数）
+REVIEW_COUNTERS = {"approved": "approvals", "changes_requested": "changes_requested"}
+
+router = APIRouter()
+
+
+def get_webhook_secret() -> Optional[str]:
+    return os.getenv("GITHUB_WEBHOOK_SECRET") or None
+
+
+def verify_signature(body: bytes, signature: Optional[str], secret: str) -> bool:
+    """校验 X-Hub-Signature-256（sha256=<HMAC-SHA256 十六进制摘要>）"""
+    if not signature or not signature.startswith("sha256="):
+        return False
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(signature[len("sha256="):], expected)
+
+
+def pr_record_from_payload(pr: dict, previous: Optional[dict]) -> dict:
+    """
+    事件中的 pull_request 对象 → 存储中的 PR 记录（与 github_prstore.pr_record_from_node 的格式相同）
+
+    事件不包含审查计数；pull_request_review 事件中的 PR 对象也不含 additions 等统计字段，这些字段沿用已有记录。
+    可合并状态只在新 PR 上取自事件，已有记录沿用 github_prstore.refresh_volatile 的结果：
+    事件中的值在推送后通常为 null / unknown，也不会在之后的变化时更新。
+    """
+    previous = previous or {}
+    body = pr.get("body") or None
+    if body and len(body) > BODY_PREVIEW_LENGTH:
+        body = body[:BODY_PREVIEW_LENGTH] + "..."
+    head_sha = pr["head"]["sha"]
+    return {
+        "number": pr["number"],
+        "title": pr["title"],
+        "body": body,
+        "state": pr["state"],
+        "head_branch": pr["head"]["ref"],
+        "base_branch": pr["base"]["ref"],
+        "author": (pr.get("user") or {}).get("login", "ghost"),
+        "created_at": normalize_timestamp(pr["created_at"]),
+        "updated_at": normalize_timestamp(pr["updated_at"]),
+        "mergeable": previous["mergeable"] if previous else pr.get("mergeable"),
+        "mergeable_state": previous["mergeable_state"] if previous else pr.get("mergeable_state") or "unknown",
+        "commits": pr.get("commits", previous.get("commits")),
+        "additions": pr.get("additions", previous.get("additions")),
+        "deletions": pr.get("deletions", previous.get("deletions")),
+        "changed_files": pr.get("changed_files", previous.get("changed_files")),
+        "url": pr["html_url"],
+        "review_status": previous.get("review_status",
+                                      {"approvals": 0, "changes_requested": 0, "total_reviews": 0}),
+        "head_sha": head_sha,
+        "comments": pr.get("comments", previous.get("comments", 0)),
+        # 头提交变化（synchronize）后旧提交的检查状态不再适用
+        "checks_state": (previous.get("checks_state") if previous.get("head_sha") == head_sha
+                         else None),
+    }
+
+
+def _apply_pull_request(store: PRStore, repo_path: str, scope: str, payload: dict) -> str:
+    pr = payload["pull_request"]
+    previous = store.get(scope, repo_path, pr["number"])
+    record = pr_record_from_payload(pr, previous)
+    # 事件可能乱序到达，比已有记录旧的 PR 状态直接丢弃
+    if previous and previous["updated_at"] and record["updated_at"] < previous["updated_at"]:
+        return "stale"
+    if record["head_sha"] != (previous or {}).get("head_sha"):
+        checks = store.get_checks(repo_path, record["head_sha"])
+        record["checks_state"] = rollup_state(checks) if checks else None
+    store.upsert(scope, repo_path, [record])
+    return "applied"
+
+
+def _review_delta(store: PRStore, repo_path: str, payload: dict) -> Optional[dict]:
+    """审查事件对 review_status 各计数的增量；审查已计数过或无法确定时返回 None"""
+    review = payload["review"]
+    number = payload["pull_request"]["number"]
+    state = (review.get("state") or "").lower()
+    recorded = store.set_review(repo_path, number, review["id"], state)
+    if payload["action"] == "submitted":
+        if recorded is not None:
+            return None
+        delta = {"total_reviews": 1}
+        if state in REVIEW_COUNTERS:
+            delta[REVIEW_COUNTERS[state]] = 1
+        return delta
+    if recorded in REVIEW_COUNTERS:
+        return {REVIEW_COUNTERS[recorded]: -1}
+    if recorded is None:
+        # 撤销的是接收 webhook 之前提交的审查，不知道它原来的状态，交给下次读取时的增量同步
+        store.invalidate(repo_path)
+    return None
+
+
+def _apply_review(store: PRStore, repo_path: str, scope: str, payload: dict, delta: Optional[dict]) -> str:
+    previous = store.get(scope, repo_path, payload["pull_request"]["number"])
+    record = pr_record_from_payload(payload["pull_request"], previous)
+    counts = dict(record["review_status"])
+    for field, change in (delta or {}).items():
+        counts[field] = max(0, counts[field] + change)
+    record["review_status"] = counts
+    if previous and previous["updated_at"] and record["updated_at"] < previous["updated_at"]:
+        record["updated_at"] = previous["updated_at"]
+    store.upsert(scope, repo_path, [record])
+    return "applied"
+
+
+def _apply_check(store: PRStore, repo_path: str, scope: str, sha: str, checks: list) -> str:
+    prs = store.find_by_head(scope, repo_path, sha)
+    if not prs:
+        return "recorded"
+    checks_state = rollup_state(checks)
+    store.upsert(scope, repo_path, [dict(pr, checks_state=checks_state) for pr in prs])
+    return "applied"
+
+
+def apply_event(event: str, payload: dict, delivery_id: Optional[str] = None,
+                store: Optional[PRStore] = None) -> dict:
+    """
+    把一个 webhook 事件应用到 PR 存储
+
+    事件只应用到已经同步过该仓库的 Token 分区；没有这样的分区时只记录检查和审查状态（status 为 recorded）。
+    头提交的检查状态由该提交收到的 status / check_run 事件汇总，开始接收 webhook 之前已有的检查不计入。
+
+    Returns:
+        {"status": applied / recorded / stale / ignored / duplicate, "event", "repo"}
+    """
+    store = store or get_pr_store()
+    repo_path = (payload.get("repository") or {}).get("full_name")
+    result = {"event": event, "repo": repo_path}
+    if store is None:
+        return dict(result, status="ignored", reason="PR 存储未启用")
+    if event not in SUPPORTED_EVENTS or not repo_path:
+        return dict(result, status="ignored")
+    # 检查去重、读-改-写各分区的记录、登记投递 ID 都在同一个写事务中：
+    # 并发的事件（包括其他 worker 进程）依次执行，不会丢失计数；更新失败时投递 ID 一起回滚，GitHub 重新投递时仍会处理
+    with store.transaction():
+        if delivery_id and store.has_delivery(delivery_id):
+            return dict(result, status="duplicate")
+        status = _apply(store, event, repo_path, payload)
+        if delivery_id:
+            store.add_delivery(delivery_id, event)
+        if status != "ignored":
+            store.mark_webhook(repo_path, time.time())
+    store.stats["events"] += 1
+    return dict(result, status=status)
+
+
+def _apply(store: PRStore, event: str, repo_path: str, payload: dict) -> str:
+    # 事件只更新已经同步过该仓库的 Token 分区（它们已经证明可以读取这个仓库）
+    scopes = store.scopes(repo_path)
+    if event == "pull_request":
+        apply = partial(_apply_pull_request, store, repo_path, payload=payload)
+    elif event == "pull_request_review":
+        if payload["action"] not in ("submitted", "dismissed"):
+            return "ignored"
+        apply = partial(_apply_review, store, repo_path, payload=payload,
+                        delta=_review_delta(store, repo_path, payload))
+    else:
+        if event == "status":
+            sha, check_type, context, state = payload["sha"], "status", payload["context"], payload["state"]
+        else:
+            run = payload["check_run"]
+            sha, check_type, context = run["head_sha"], "check_run", run["name"]
+            state = run.get("conclusion") or run["status"]
+        checks = store.set_check(repo_path, sha, check_type, context, state.lower())
+        apply = partial(_apply_check, store, repo_path, sha=sha, checks=checks)
+    statuses = {apply(scope=scope) for scope in scopes}
+    return "applied" if "applied" in statuses else (statuses.pop() if statuses else "recorded")
+
+
+def record_delivery(path: Path, event: str, delivery_id: Optional[str], payload: dict):
+    """把收到的事件追加到 JSONL 文件，供 replay 使用"""
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"event": event, "delivery": delivery_id, "payload": payload}, ensure_ascii=False) + "\n")
+
+
+def replay(path: Path, store: Optional[PRStore] = None) -> dict:
+    """
+    按顺序重放 record_delivery 记录的事件（不校验签名，投递 ID 相同的事件同样去重）
+
+    Returns:
+        各处理结果的数量，例如 {"applied": 12, "duplicate": 3}
+    """
+    counts: dict = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            result = apply_event(entry["event"], entry["payload"], entry.get("delivery"), store)
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+    return counts
+
+
+@router.post("/webhooks/github")
+async def github_webhook(request: Request) -> dict:
+    """GitHub webhook 入口：校验签名后更新 PR 存储"""
+    secret = get_webhook_secret()
+    if not secret:
+        raise HTTPException(status_code=503, detail="未配置 GITHUB_WEBHOOK_SECRET")
+    body = await request.body()
+    if not verify_signature(body, request.headers.get("X-Hub-Signature-256"), secret):
+        raise HTTPException(status_code=401, detail="签名校验失败")
+
+    event = request.headers.get("X-GitHub-Event", "")
+    if event == "ping":
+        return {"status": "pong"}
+    delivery_id = request.headers.get("X-GitHub-Delivery") or str(uuid.uuid4())
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="请求体不是有效的 JSON")
+
+    record_path = os.getenv("GITHUB_WEBHOOK_RECORD")
+    try:
+        if record_path and event in SUPPORTED_EVENTS:
+            await asyncio.to_thread(record_delivery, Path(record_path), event, delivery_id, payload)
+        result = await asyncio.to_thread(apply_event, event, payload, delivery_id)
+    except (KeyError, TypeError, AttributeError) as e:
+        raise HTTPException(status_code=400, detail=f"事件内容不完整: {e}")
+    if result["status"] != "duplicate":
+        print(f"[github_webhook] {event} {result['repo']}: {result['status']}")
+    return dict(result, delivery=delivery_id)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="重放记录的 GitHub webhook 事件")
+    parser.add_argument("command", choices=["replay"])
+    parser.add_argument("path", type=Path, help="GITHUB_WEBHOOK_RECORD 写入的 JSONL 文件")
+    args = parser.parse_args(argv)
+
+    store = get_pr_store()
+    if store is None:
+        print("PR 存储未启用（GITHUB_PR_STORE=0）")
+        return 1
+    counts = replay(args.path, store)
+    print(f"[github_webhook] 已重放 {sum(counts.values())} 个事件: {counts}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,18 +8,36 @@
 
 import os
 import json
+import hashlib
 import gitlab
 from dotenv import load_dotenv
 
+from .singleflight import get_flight
+
 load_dotenv()
 
+class CoalescingGitlab(gitlab.Gitlab):
+    """相同的并发 GET 请求只发出一次，其余调用共享同一个响应（见 singleflight）"""
+
+    def http_request(self, verb, path, query_data=None, post_data=None, raw=False, streamed=False,
+                     files=None, **kwargs):
+        if verb.lower() != "get" or streamed:
+            return super().http_request(verb, path, query_data, post_data, raw, streamed, files, **kwargs)
+        token = hashlib.sha256(str(self.private_token or self.oauth_token or self.job_token).encode("utf-8"))
+        key = (self.url, token.hexdigest(), path,
+               json.dumps([query_data, kwargs], sort_keys=True, default=str))
+        return get_flight("gitlab").do(
+            key, lambda: super(CoalescingGitlab, self).http_request(verb, path, query_data, post_data, raw,
+                                                                    streamed, files, **kwargs)
+        )
+
 def get_gitlab_instance():
     """获取 GitLab 实例"""
     gitlab_url = os.getenv("GITLAB_URL")
     private_token = os.getenv("GITLAB_PRIVATE_TOKEN")
     if not gitlab_url or not private_token:
         raise ValueError("请在 .env 文件中设置 GITLAB_URL 和 GITLAB_PRIVATE_TOKEN")
-    return gitlab.Gitlab(gitlab_url, private_token=private_token)
+    return CoalescingGitlab(gitlab_url, private_token=private_token)
 
 def get_mr_info(project_id: int, mr_id: int) -> dict:
     """获取 GitLab MR 信息"""
@@ -0,0 +1,111 @@
+"""
+代码托管平台请求的单飞（single-flight）合并
+协调智能体和 pr_reviewer 处理同一个 PR、或多个会话同时展开时，相同的 GET 请求（同一 PR、同一页文件列表）
+会并发发出，每个都消耗速率限制额度。这里按请求键合并正在进行的相同请求：第一个调用真正发出请求，
+其余调用等待并共享它的结果（或异常），请求完成后立即移除，不做任何缓存。
+GitHub 的同步 / 异步客户端和 GitLab 客户端各用一个命名的 SingleFlight，计数可通过 get_singleflight_stats 查看。
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class _Call:
+    """一次正在进行的同步请求"""
+
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """按键合并并发的相同调用，线程和 asyncio 协程都适用"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        # (事件循环, 键) → 共享的 Task；Task 绑定在创建它的事件循环上
+        self._tasks: Dict[tuple, asyncio.Task] = {}
+        self.stats = {"calls": 0, "executions": 0, "coalesced": 0, "in_flight": 0}
+
+    def _count(self, leader: bool):
+        self.stats["calls"] += 1
+        self.stats["executions" if leader else "coalesced"] += 1
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """执行 fn()；同一键已有调用在进行时等待并返回它的结果，异常同样共享"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.stats["in_flight"] += 1
+            self._count(leader)
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                self.stats["in_flight"] -= 1
+            call.done.set()
+        return call.result
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """do 的异步版本：共享同一个 Task，某个等待方被取消不会中断其他等待方的请求"""
+        task_key = (asyncio.get_running_loop(), key)
+        with self._lock:
+            task = self._tasks.get(task_key)
+            leader = task is None
+            if leader:
+                task = self._tasks[task_key] = asyncio.ensure_future(fn())
+                self.stats["in_flight"] += 1
+                task.add_done_callback(lambda _: self._finish(task_key))
+            self._count(leader)
+        return await asyncio.shield(task)
+
+    def _finish(self, task_key: tuple):
+        with self._lock:
+            task = self._tasks.pop(task_key, None)
+            self.stats["in_flight"] -= 1
+        # 所有等待方都已取消时仍要取走异常，避免 "exception was never retrieved" 警告
+        if task is not None and not task.cancelled():
+            task.exception()
+
+    def summary(self) -> dict:
+        with self._lock:
+            calls = self.stats["calls"]
+            return dict(self.stats, coalesce_rate=round(self.stats["coalesced"] / calls, 3) if calls else 0.0)
+
+
+_flights: Dict[str, SingleFlight] = {}
+_flights_lock = threading.Lock()
+
+
+def get_flight(name: str) -> SingleFlight:
+    """获取进程内共享的命名 SingleFlight（例如 "github"、"gitlab"）"""
+    with _flights_lock:
+        flight = _flights.get(name)
+        if flight is None:
+            flight = _flights[name] = SingleFlight(name)
+        return flight
+
+
+def get_singleflight_stats() -> dict:
+    """各平台的调用数、实际执行数、被合并的调用数和合并率"""
+    with _flights_lock:
+        flights = list(_flights.values())
+    return {flight.name: flight.summary() for flight in flights}
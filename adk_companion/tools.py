@@ -3,11 +3,26 @@ ADK Companion - 工具集
 """
 
 import os
+import re
 import json
+from itertools import islice
 from pathlib import Path
 from typing import Optional
-from github import Github
+from .github_client import get_github_client
+from .github_graphql import fetch_pull_requests, supports_pr_query
+from .github_checks import get_head_checks
+from .github_mirror import get_mirror_stats, is_mirror_enabled, is_valid_repo_path, mirror_read
+from .github_pr import PRContext
+from .github_prstore import get_pr_store_stats, get_stored_pr, list_stored_prs
+from .singleflight import get_singleflight_stats
+from .github_blobs import get_blob_cache_stats, read_file, remember_tree
+from .github_gitdata import commit_files, filter_tree, point_branch, tree_entries_from_git_tree
+from .github_cache import get_cache_stats
+from .github_ratelimit import BULK, get_scheduler, request_priority, token_key
 from dotenv import load_dotenv
+from .adk_index import SearchBudget, get_adk_index_within, stream_search
+from .adk_symbols import get_symbol_table
+from .adk_api_diff import compute_api_diff, format_diff_markdown, load_cached_diff, read_tree_version
 load_dotenv()
 
 def find_adk_site_packages() -> Optional[Path]:
@@ -19,43 +34,213 @@ def find_adk_site_packages() -> Optional[Path]:
     except ImportError:
         return None
 
-def read_adk_codebase(keyword: str, max_results: int = 10) -> list[str]:
-    """在 ADK 源码中搜索关键词并返回匹配的文件内容片段"""
+def read_adk_codebase(
+    keyword: str,
+    max_results: int = 10,
+    regex: bool = False,
+    context_lines: int = 2,
+    file_types: str = "py,md,json",
+    timeout_seconds: float = 10.0
+) -> list[str]:
+    """
+    在 ADK 包中搜索关键词并返回匹配的文件内容片段
+
+    Args:
+        keyword: 搜索关键词，regex=True 时为正则表达式
+        max_results: 最大结果数（默认 10）
+        regex: 是否按正则表达式匹配，例如 r"class \\w+Agent\\("（默认 False）
+        context_lines: 每处命中前后保留的代码行数（默认 2）
+        file_types: 搜索的文件类型，逗号分隔（默认 "py,md,json"），.py 源码的命中排在资源文件之前
+        timeout_seconds: 搜索的时间预算（秒，默认 10，必须为正数），包括等待索引就绪的时间；
+                         索引未在预算内就绪时本次改为逐文件扫描，超时后返回已找到的部分结果
+
+    Returns:
+        list[str]: 按 BM25 相关度排序的文件，每个文件附带命中行附近带行号的代码窗口；
+                   时间预算耗尽时最后一项为部分结果提示
+    """
     adk_path = find_adk_site_packages()
     if not adk_path:
         return ["ADK 未安装在当前环境中"]
-    
+
+    if not timeout_seconds or timeout_seconds <= 0:
+        return [f"timeout_seconds 必须为正数: {timeout_seconds}"]
+
     results = []
     try:
-        # 简单实现：遍历 .py 文件并搜索关键词
-        for py_file in adk_path.rglob("*.py"):
-            if len(results) >= max_results:
-                break
+        if regex:
             try:
-                content = py_file.read_text(encoding="utf-8")
-                if keyword.lower() in content.lower():
-                    results.append(f"文件: {py_file.relative_to(adk_path)}\n{content[:500]}...")
-            except Exception:
-                continue
+                re.compile(keyword)
+            except re.error as e:
+                return [f"正则表达式无效: {e}"]
+
+        # 时间预算从这里开始计算，等待索引加载或构建也计入预算
+        budget = SearchBudget(timeout_seconds)
+        suffixes = tuple(f".{t.strip().lstrip('.')}" for t in file_types.split(",") if t.strip())
+        # 优先使用按版本持久化的索引，索引未在预算内就绪时 .py 源码也改为逐文件扫描
+        index = None
+        if ".py" in suffixes:
+            index = get_adk_index_within(adk_path, budget.remaining())
+            if index is None:
+                print("[adk_index] 索引尚未就绪，本次退回逐文件扫描")
+        results = list(islice(
+            stream_search(adk_path, keyword, regex, max(0, context_lines), suffixes, index, budget, max_results),
+            max_results,
+        ))
+        if budget.exhausted:
+            results.append(f"⚠️ 搜索超出 {timeout_seconds} 秒时间预算，以上为部分结果")
     except Exception as e:
         results.append(f"搜索出错: {e}")
-    
-    return results[:max_results]
+
+    return results
+
+def lookup_adk_symbol(name: str, max_results: int = 5) -> dict:
+    """
+    在 ADK 符号表中查找类、函数或方法的定义
+
+    Args:
+        name: 符号名称，可以是短名称（LlmAgent）、类成员（BaseTool.process_llm_request）
+              或完整限定名（google.adk.agents.llm_agent.LlmAgent）
+        max_results: 最大返回数量（默认 5）
+
+    Returns:
+        dict: 包含定义位置、签名、文档字符串、基类和行号范围
+    """
+    adk_path = find_adk_site_packages()
+    if not adk_path:
+        return {"error": "ADK 未安装在当前环境中"}
+
+    try:
+        table = get_symbol_table(adk_path)
+        matches = table.lookup(name)
+        if not matches:
+            return {
+                "status": "not_found",
+                "query": name,
+                "adk_version": table.version,
+                "suggestions": table.suggest(name),
+                "message": f"未找到符号 {name}"
+            }
+        return {
+            "status": "success",
+            "query": name,
+            "adk_version": table.version,
+            "total_matches": len(matches),
+            "matches": matches[:max_results]
+        }
+    except Exception as e:
+        return {"error": f"查找符号失败: {str(e)}"}
+
+def find_adk_references(name: str, kind: str = "all", max_results: int = 30) -> dict:
+    """
+    在 ADK 源码的交叉引用图中查找“谁调用/继承/重写/导入/访问了 X”
+
+    Args:
+        name: 符号名称，如 process_llm_request、BaseTool.process_llm_request、BaseAgent
+        kind: 引用类型，可选 calls（调用点）、subclasses（直接与间接子类）、
+              overrides（定义了该方法的类，"类.方法" 形式时只看该类的子类）、
+              imports（导入处）、attributes（属性访问）或 all（默认）
+        max_results: 每种类型的最大返回数量（默认 30）
+
+    Returns:
+        dict: 按引用类型分组的结果，每条包含文件、行号、所在作用域和目标表达式
+    """
+    kinds = ["calls", "subclasses", "overrides", "imports", "attributes"]
+    if kind != "all" and kind not in kinds:
+        return {"error": f"不支持的引用类型: {kind}，可选值: all, {', '.join(kinds)}"}
+
+    adk_path = find_adk_site_packages()
+    if not adk_path:
+        return {"error": "ADK 未安装在当前环境中"}
+
+    try:
+        table = get_symbol_table(adk_path)
+        finders = {
+            "calls": lambda: table.find_references(name, "call"),
+            "subclasses": lambda: table.subclasses(name),
+            "overrides": lambda: table.overrides(name),
+            "imports": lambda: table.find_references(name, "import"),
+            "attributes": lambda: table.find_references(name, "attribute"),
+        }
+        references = {}
+        totals = {}
+        for key in (kinds if kind == "all" else [kind]):
+            found = finders[key]()
+            totals[key] = len(found)
+            references[key] = found[:max_results]
+        if not any(totals.values()):
+            return {
+                "status": "not_found",
+                "query": name,
+                "adk_version": table.version,
+                "suggestions": table.suggest(name),
+                "message": f"未找到 {name} 的引用"
+            }
+        return {
+            "status": "success",
+            "query": name,
+            "adk_version": table.version,
+            "totals": totals,
+            "references": references
+        }
+    except Exception as e:
+        return {"error": f"查找引用失败: {str(e)}"}
+
+def diff_adk_api(new_adk_path: str, base_adk_path: str = None, max_items: int = 50) -> dict:
+    """
+    对比两个 ADK 版本的公开 API（新增、删除、移动和签名变化的类/函数/方法）
+
+    Args:
+        new_adk_path: 新版本 ADK 源码目录（解压后的 wheel/sdist 目录或 google/adk 包目录）
+        base_adk_path: 基准版本源码目录（默认使用当前环境中安装的 ADK）
+        max_items: 每类变化的最大返回数量（默认 50）
+
+    Returns:
+        dict: 包含两侧版本号、变化统计和各类变化明细，结果按版本对缓存
+    """
+    base = base_adk_path or find_adk_site_packages()
+    if not base:
+        return {"error": "ADK 未安装在当前环境中，请通过 base_adk_path 指定基准版本源码目录"}
+
+    try:
+        diff = compute_api_diff(base, new_adk_path)
+    except ValueError as e:
+        return {"error": str(e)}
+    except Exception as e:
+        return {"error": f"计算 API 差异失败: {str(e)}"}
+
+    result = {
+        "status": "success",
+        "old_version": diff["old_version"],
+        "new_version": diff["new_version"],
+        "cached": diff["cached"],
+        "summary": diff["summary"],
+    }
+    for key in ("added", "removed", "moved", "changed"):
+        result[key] = diff[key][:max_items]
+    return result
 
 def check_upstream_release() -> dict:
     """检查上游 ADK 仓库的最新发布版本"""
     try:
         # 使用 GitHub API 获取最新发布
-        token = os.getenv("GITHUB_TOKEN")
-        g = Github(token) if token else Github()
-        repo = g.get_repo("google/adk-python")
+        repo = get_github_client("GITHUB_TOKEN").get_repo("google/adk-python")
         latest_release = repo.get_latest_release()
         
-        return {
+        result = {
             "tag_name": latest_release.tag_name,
             "published_at": latest_release.published_at.isoformat(),
             "body": latest_release.body[:1000] + "..." if len(latest_release.body) > 1000 else latest_release.body
         }
+
+        # 若已为“当前安装版本 → 最新版本”计算过 API 差异，直接附上统计
+        adk_path = find_adk_site_packages()
+        if adk_path:
+            installed_version = read_tree_version(adk_path)
+            result["installed_version"] = installed_version
+            cached_diff = load_cached_diff(installed_version, latest_release.tag_name.lstrip("v"))
+            if cached_diff:
+                result["api_diff_summary"] = cached_diff["summary"]
+        return result
     except Exception as e:
         return {"error": str(e)}
 
@@ -104,11 +289,11 @@ def generate_pr(
         if '/' not in target_repo or len(target_repo.split('/')) != 2:
             return {"error": "target_repo 格式错误，应为 'owner/repo'"}
         
-        g = Github(token)
+        client = get_github_client("GITHUB_TOKEN")
         
         # 验证仓库存在且可访问
         try:
-            github_repo = g.get_repo(target_repo)
+            github_repo = client.get_repo(target_repo)
         except Exception as e:
             return {"error": f"无法访问仓库 {target_repo}: {str(e)}"}
         
@@ -142,71 +327,12 @@ def generate_pr(
             # 获取基础分支的最新提交
             base_branch_ref = github_repo.get_branch(base_branch)
             base_sha = base_branch_ref.commit.sha
-            
-            # 创建新分支
-            try:
-                github_repo.create_git_ref(
-                    ref=f"refs/heads/{branch_name}",
-                    sha=base_sha
-                )
-            except Exception as e:
-                if "already exists" in str(e):
-                    # 分支已存在，删除后重新创建
-                    try:
-                        github_repo.get_git_ref(f"heads/{branch_name}").delete()
-                        github_repo.create_git_ref(
-                            ref=f"refs/heads/{branch_name}",
-                            sha=base_sha
-                        )
-                    except Exception as delete_e:
-                        return {"error": f"无法创建分支 {branch_name}: {str(delete_e)}"}
-                else:
-                    return {"error": f"无法创建分支 {branch_name}: {str(e)}"}
-            
-            # 更新或创建文件
-            all_files_changed = []
-            
-            # 处理要修改的文件
-            if files_to_modify:
-                for file_path, new_content in files_to_modify.items():
-                    try:
-                        # 获取当前文件内容（如果存在）
-                        try:
-                            current_file = github_repo.get_contents(file_path, ref=base_branch)
-                            github_repo.update_file(
-                                path=file_path,
-                                message=f"Update {file_path}",
-                                content=new_content,
-                                sha=current_file.sha,
-                                branch=branch_name
-                            )
-                        except Exception:
-                            # 文件不存在，创建新文件
-                            github_repo.create_file(
-                                path=file_path,
-                                message=f"Create {file_path}",
-                                content=new_content,
-                                branch=branch_name
-                            )
-                        all_files_changed.append(file_path)
-                    except Exception as e:
-                        return {"error": f"处理文件 {file_path} 失败: {str(e)}"}
-            
-            # 处理要创建的文件
-            if files_to_create:
-                for file_path, content in files_to_create.items():
-                    try:
-                        github_repo.create_file(
-                            path=file_path,
-                            message=f"Add {file_path}",
-                            content=content,
-                            branch=branch_name
-                        )
-                        all_files_changed.append(file_path)
-                    except Exception as e:
-                        return {"error": f"创建文件 {file_path} 失败: {str(e)}"}
-            
-            # 创建 PR
+
+            # 修改和新建的文件合并为一次提交（files_to_modify 中不存在的文件同样会被创建）
+            files = dict(files_to_modify or {})
+            files.update(files_to_create or {})
+            all_files_changed = list(files)
+
             commit_message = f"""{title}
 
 {description}
@@ -214,6 +340,17 @@ def generate_pr(
 ---
 Generated by ADK Companion at {datetime.now().isoformat()}
 Files changed: {', '.join(all_files_changed)}"""
+
+            # 并发创建 blob → 一个 tree → 一个提交 → 只移动一次分支引用
+            try:
+                commit_sha = commit_files(github_repo, base_sha, files, f"{title}\n\n{description}",
+                                          keep_modes=bool(files_to_modify))
+            except Exception as e:
+                return {"error": f"提交文件失败: {str(e)}"}
+            try:
+                point_branch(github_repo, branch_name, commit_sha)
+            except Exception as e:
+                return {"error": f"无法创建分支 {branch_name}: {str(e)}"}
             
             pr = github_repo.create_pull(
                 title=title,
@@ -240,7 +377,10 @@ def read_github_repo(
     repo_path: str = None,
     file_path: str = None,
     branch: str = "main",
-    max_files: int = 50
+    max_files: int = 50,
+    path_prefix: str = None,
+    pattern: str = None,
+    max_depth: int = None
 ) -> dict:
     """
     读取 GitHub 仓库的项目结构或指定文件内容
@@ -249,14 +389,17 @@ def read_github_repo(
         repo_path: 仓库路径，格式为 "owner/repo"，默认使用当前项目仓库
         file_path: 指定文件路径（相对于仓库根目录），如果为空则返回目录结构
         branch: 分支名，默认为 main
-        max_files: 最大文件数量限制（仅在读取目录结构时生效）
+        max_files: 最大返回条目数（仅在读取目录结构时生效）
+        path_prefix: 只列出该目录下的内容，例如 "src/agents"（仅目录结构）
+        pattern: glob 过滤，例如 "*.py" 或 "src/*/test_*.py"，指定后只返回文件（仅目录结构）
+        max_depth: 相对 path_prefix 的最大深度，0 表示只列出直接子项，默认不限（仅目录结构）
     
     Returns:
-        dict: 包含文件结构或文件内容的字典
+        dict: 包含文件结构或文件内容的字典；目录结构中的 total_files / total_dirs 为过滤后的总数，
+              仓库过大导致 GitHub 截断 tree 时带有 truncated 标记
     """
     try:
-        token = os.getenv("GITHUB_TOKEN")
-        g = Github(token) if token else Github()
+        client = get_github_client("GITHUB_TOKEN")
         
         # 如果没有指定仓库，尝试从当前 git remote 获取
         if not repo_path:
@@ -273,12 +416,37 @@ def read_github_repo(
             except Exception:
                 return {"error": "无法自动获取仓库信息，请手动指定 repo_path 参数"}
         
+        if not is_valid_repo_path(repo_path):
+            return {"error": f"无效的仓库路径: {repo_path}，应为 owner/name 形式"}
+
+        # 本地裸镜像模式：从本地 git 对象读取，不消耗 API 额度；镜像不可用时改用 API
+        if is_mirror_enabled():
+            try:
+                return mirror_read(repo_path, file_path, branch, max_files, path_prefix, pattern, max_depth)
+            except Exception as e:
+                print(f"[github_mirror] 镜像读取失败，改用 GitHub API: {e}")
+        
         # 获取仓库对象
-        repo = g.get_repo(repo_path)
+        repo = client.get_repo(repo_path)
         
         if file_path:
             # 读取指定文件内容
             try:
+                # 分支 → tree → blob SHA（每次重新验证分支），内容未变化的文件直接取自本地 blob 存储
+                blob = read_file(repo, file_path, branch, token_key(client.token))
+                if blob is not None:
+                    if blob["type"] == "missing":
+                        return {"error": f"读取文件 '{file_path}' 失败: 文件不存在"}
+                    if blob["type"] != "blob":
+                        return {"error": f"'{file_path}' 是一个目录，不是文件"}
+                    return {
+                        "file_path": file_path,
+                        "content": blob["content"].decode('utf-8'),
+                        "size": blob["size"],
+                        "sha": blob["sha"]
+                    }
+
+                # tree 被 GitHub 截断时退回 Contents API
                 file_content = repo.get_contents(file_path, ref=branch)
                 if file_content.type == "file":
                     return {
@@ -292,50 +460,23 @@ def read_github_repo(
             except Exception as e:
                 return {"error": f"读取文件 '{file_path}' 失败: {str(e)}"}
         else:
-            # 获取目录结构
+            # 获取目录结构：Git Trees API 一次取回整棵树，再按前缀、glob 和深度过滤
             try:
-                file_tree = []
-                contents = repo.get_contents("", ref=branch)
-                
-                def process_directory(contents, prefix="", depth=0):
-                    if depth > 3 or len(file_tree) >= max_files:  # 限制深度和数量
-                        return
-                    
-                    for content in contents:
-                        if len(file_tree) >= max_files:
-                            break
-                            
-                        if content.type == "dir":
-                            file_tree.append({
-                                "type": "dir",
-                                "path": f"{prefix}{content.name}/",
-                                "size": 0
-                            })
-                            
-                            # 递归获取子目录内容（限制深度）
-                            if depth < 2:
-                                try:
-                                    sub_contents = repo.get_contents(content.path, ref=branch)
-                                    process_directory(sub_contents, f"{prefix}{content.name}/", depth + 1)
-                                except:
-                                    continue
-                        else:
-                            file_tree.append({
-                                "type": "file",
-                                "path": f"{prefix}{content.name}",
-                                "size": content.size,
-                                "sha": content.sha
-                            })
-                
-                process_directory(contents)
-                
-                return {
+                tree = repo.get_git_tree(branch, recursive=True)
+                remember_tree(token_key(client.token), repo.full_name, tree.raw_data)
+                file_tree = filter_tree(tree_entries_from_git_tree(tree), path_prefix, pattern, max_depth)
+
+                result = {
                     "repo": repo_path,
                     "branch": branch,
                     "total_files": len([f for f in file_tree if f["type"] == "file"]),
                     "total_dirs": len([f for f in file_tree if f["type"] == "dir"]),
                     "file_tree": file_tree[:max_files]
                 }
+                # 超大仓库的递归 tree 会被 GitHub 截断，此时提示用 path_prefix 缩小范围
+                if tree.raw_data.get("truncated"):
+                    result["truncated"] = True
+                return result
                 
             except Exception as e:
                 return {"error": f"获取目录结构失败: {str(e)}"}
@@ -343,7 +484,13 @@ def read_github_repo(
     except Exception as e:
         return {"error": f"GitHub API 调用失败: {str(e)}"}
 
-def generate_evolution_pr(target_version: str, sample_code: str, dependency_changes: str, target_repo: str = None) -> dict:
+def generate_evolution_pr(
+    target_version: str,
+    sample_code: str,
+    dependency_changes: str,
+    target_repo: str = None,
+    new_adk_path: str = None
+) -> dict:
     """
     生成 ADK 升级 PR - 使用通用 PR 生成器的特化版本
     
@@ -352,6 +499,7 @@ def generate_evolution_pr(target_version: str, sample_code: str, dependency_chan
         sample_code: 示例代码内容
         dependency_changes: 依赖变更说明
         target_repo: 目标仓库，格式为 "owner/repo"
+        new_adk_path: 目标版本 ADK 源码目录（可选），提供时在 PR 描述中附上与当前安装版本的 API 差异
     """
     from datetime import datetime
     
@@ -363,6 +511,14 @@ Changes:
 - Add new feature sample: new_feature_{target_version}.py
 
 {dependency_changes}"""
+
+    # 附上预先计算（或按版本对缓存）的 API 差异，而不是让模型逐个文件阅读源码
+    adk_path = find_adk_site_packages()
+    if new_adk_path and adk_path:
+        try:
+            description += "\n\n" + format_diff_markdown(compute_api_diff(adk_path, new_adk_path))
+        except Exception as e:
+            print(f"[generate_evolution_pr] 计算 API 差异失败: {e}")
     
     # 修改 requirements.txt
     files_to_modify = {}
@@ -430,35 +586,30 @@ def review_pr(
         if not token:
             return {"error": f"需要设置 {token_env} 环境变量"}
         
-        g = Github(token)
-        repo = g.get_repo(repo_path)
-        pr = repo.get_pull(pr_number)
+        return _review_pr(PRContext.load(repo_path, pr_number, token_env), approve, review_comment)
         
-        # 检查是否是自己的PR
-        current_user = g.get_user()
-        is_own_pr = pr.user.login == current_user.login
+    except Exception as e:
+        return {"error": f"审查 PR 失败: {str(e)}"}
+
+def _review_pr(ctx: PRContext, approve: bool = False, review_comment: str = None) -> dict:
+    """review_pr 的实现，PR、文件列表和当前用户取自 ctx"""
+    try:
+        pr = ctx.pr
+        token_env = ctx.token_env
         
-        if is_own_pr and approve:
+        # 检查是否是自己的PR
+        if ctx.is_own_pr and approve:
             return {
                 "error": "无法批准自己的PR",
-                "pr_author": pr.user.login,
-                "current_user": current_user.login,
+                "pr_author": ctx.author,
+                "current_user": ctx.current_login,
                 "token_used": token_env,
                 "suggestion": "您可以：1) 使用 request_pr_review 请求其他用户审查，2) 只添加评论而不批准",
                 "can_comment": True
             }
         
         # 获取 PR 文件变更
-        files_changed = []
-        for file in pr.get_files():
-            files_changed.append({
-                "filename": file.filename,
-                "status": file.status,
-                "additions": file.additions,
-                "deletions": file.deletions,
-                "changes": file.changes,
-                "patch": file.patch[:1000] + "..." if len(file.patch) > 1000 else file.patch
-            })
+        files_changed = ctx.file_summaries(1000)
         
         # 获取 PR 详情
         pr_details = {
@@ -504,7 +655,7 @@ def review_pr(
             "status": "success",
             "pr_details": pr_details,
             "token_used": token_env,
-            "message": f"Successfully reviewed PR #{pr_number}"
+            "message": f"Successfully reviewed PR #{ctx.pr_number}"
         }
         
     except Exception as e:
@@ -537,9 +688,18 @@ def merge_pr(
         if not token:
             return {"error": f"需要设置 {token_env} 环境变量"}
         
-        g = Github(token)
-        repo = g.get_repo(repo_path)
-        pr = repo.get_pull(pr_number)
+        return _merge_pr(PRContext.load(repo_path, pr_number, token_env), merge_method, commit_title, commit_message)
+        
+    except Exception as e:
+        return {"error": f"合并 PR 失败: {str(e)}"}
+
+def _merge_pr(ctx: PRContext, merge_method: str = "merge", commit_title: str = None,
+              commit_message: str = None) -> dict:
+    """merge_pr 的实现，PR 取自 ctx"""
+    try:
+        pr = ctx.pr
+        pr_number = ctx.pr_number
+        token_env = ctx.token_env
         
         # 检查 PR 是否可合并
         if not pr.mergeable:
@@ -555,26 +715,26 @@ def merge_pr(
         
         # 检查是否需要 CI 通过
         if pr.mergeable_state == "blocked":
-            # 获取状态检查
-            status_checks = []
+            # 只查询头提交的提交状态和 check run（一次请求，短时缓存）
+            blocked = {
+                "error": "PR 被阻止合并，可能需要 CI 检查通过或审查批准",
+                "status_checks": [],
+                "head_sha": pr.head.sha
+            }
             try:
-                for commit in pr.get_commits():
-                    for status in commit.get_status().statuses:
-                        status_checks.append({
-                            "context": status.context,
-                            "state": status.state,
-                            "description": status.description,
-                            "target_url": status.target_url
-                        })
+                checks = get_head_checks(ctx.client, ctx.repo_path, pr.head.sha)
+                blocked["status_checks"] = checks["checks"]
+                blocked["combined_state"] = checks["state"]
             except Exception:
                 pass
             
-            return {
-                "error": "PR 被阻止合并，可能需要 CI 检查通过或审查批准",
-                "status_checks": status_checks
-            }
+            return blocked
         
-        # 执行合并
+        # 执行合并；PyGithub 不接受 None，未指定时使用默认的提交信息和标题
+        if not commit_message:
+            commit_message = f"Merge PR #{pr_number}"
+        if not commit_title:
+            commit_title = f"Merge pull request #{pr_number} from {pr.head.ref}"
         print(f"[DEBUG] 开始执行合并操作...")
         try:
             print(f"[DEBUG] 使用合并方法: {merge_method}")
@@ -593,6 +753,15 @@ def merge_pr(
             print(f"[DEBUG] merge_result.sha: {merge_result.sha}")
             print(f"[DEBUG] merge_result.message: {merge_result.message}")
             
+            # 合并接口的响应不含合并时间，合并成功后重新读取 PR
+            merged_at = None
+            if merge_result.merged:
+                try:
+                    merged = ctx.repo.get_pull(pr_number).merged_at
+                    merged_at = merged.isoformat() if merged else None
+                except Exception:
+                    pass
+            
             return {
                 "status": "success",
                 "merged": merge_result.merged,
@@ -600,7 +769,7 @@ def merge_pr(
                 "message": merge_result.message,
                 "pr_number": pr_number,
                 "merge_method": merge_method,
-                "merged_at": merge_result.merged_at.isoformat() if merge_result.merged_at else None,
+                "merged_at": merged_at,
                 "token_used": token_env
             }
             
@@ -641,6 +810,12 @@ def merge_pr(
             elif error_msg and "merge conflict" in error_msg.lower():
                 print(f"[DEBUG] 识别错误: 合并冲突")
                 return {"error": "合并失败：存在合并冲突"}
+            elif error_msg and "Base branch was modified" in error_msg:
+                print(f"[DEBUG] 识别错误: 基础分支已被修改")
+                return {"error": "合并失败：基础分支已被修改，请更新PR"}
+            elif error_msg and "Pull Request is not mergeable" in error_msg:
+                print(f"[DEBUG] 识别错误: PR不可合并")
+                return {"error": "合并失败：PR不可合并"}
             else:
                 print(f"[DEBUG] 未识别的错误类型，构造详细错误信息")
                 detailed_error = f"合并失败: {error_msg if error_msg else '未知错误'} (类型: {type(e).__name__})"
@@ -688,32 +863,46 @@ def check_pr_author(repo_path: str, pr_number: int, token_env: str = "GITHUB_TOK
         if not token:
             return {"error": f"需要设置 {token_env} 环境变量"}
         
-        g = Github(token)
-        repo = g.get_repo(repo_path)
-        pr = repo.get_pull(pr_number)
+        # PR 存储中有该 PR 时直接本地读取（按陈旧上限增量同步），不再请求仓库和 PR
+        client = get_github_client(token_env)
+        try:
+            stored = get_stored_pr(client, repo_path, pr_number)
+        except Exception as e:
+            print(f"[github_prstore] 读取 PR 存储失败，直接查询 GitHub: {e}")
+            stored = None
+        if stored is not None:
+            return _author_result(pr_number, stored["author"], client.get_login(), stored["title"],
+                                  stored["state"], token_env)
         
-        # 获取当前用户信息
-        current_user = g.get_user()
+        return _check_pr_author(PRContext.load(repo_path, pr_number, token_env))
         
-        # 检查是否是自己的PR
-        is_own_pr = pr.user.login == current_user.login
-        
-        return {
-            "status": "success",
-            "pr_number": pr_number,
-            "pr_author": pr.user.login,
-            "current_user": current_user.login,
-            "is_own_pr": is_own_pr,
-            "pr_title": pr.title,
-            "pr_state": pr.state,
-            "can_approve": not is_own_pr,
-            "token_used": token_env,
-            "message": "这是您自己的PR，无法自己批准" if is_own_pr else "可以批准此PR"
-        }
+    except Exception as e:
+        return {"error": f"检查 PR 作者失败: {str(e)}"}
+
+def _check_pr_author(ctx: PRContext) -> dict:
+    """check_pr_author 的实现，PR 和当前用户取自 ctx"""
+    try:
+        return _author_result(ctx.pr_number, ctx.author, ctx.current_login, ctx.pr.title, ctx.pr.state,
+                              ctx.token_env)
         
     except Exception as e:
         return {"error": f"检查 PR 作者失败: {str(e)}"}
 
+def _author_result(pr_number: int, author: str, current_login: str, title: str, state: str, token_env: str) -> dict:
+    is_own_pr = author == current_login
+    return {
+        "status": "success",
+        "pr_number": pr_number,
+        "pr_author": author,
+        "current_user": current_login,
+        "is_own_pr": is_own_pr,
+        "pr_title": title,
+        "pr_state": state,
+        "can_approve": not is_own_pr,
+        "token_used": token_env,
+        "message": "这是您自己的PR，无法自己批准" if is_own_pr else "可以批准此PR"
+    }
+
 def request_pr_review(repo_path: str, pr_number: int, reviewers: str = None, team_reviewers: str = None, token_env: str = "GITHUB_TOKEN") -> dict:
     """
     请求其他用户审查 PR
@@ -737,23 +926,29 @@ def request_pr_review(repo_path: str, pr_number: int, reviewers: str = None, tea
         if not token:
             return {"error": f"需要设置 {token_env} 环境变量"}
         
-        g = Github(token)
-        repo = g.get_repo(repo_path)
-        pr = repo.get_pull(pr_number)
+        return _request_pr_review(PRContext.load(repo_path, pr_number, token_env), reviewers, team_reviewers)
         
-        # 检查是否是自己的PR
-        current_user = g.get_user()
-        is_own_pr = pr.user.login == current_user.login
+    except Exception as e:
+        return {"error": f"请求 PR 审查失败: {str(e)}"}
+
+def _request_pr_review(ctx: PRContext, reviewers: list = None, team_reviewers: list = None) -> dict:
+    """request_pr_review 的实现，仓库、PR 和当前用户取自 ctx"""
+    try:
+        pr = ctx.pr
+        pr_number = ctx.pr_number
+        token_env = ctx.token_env
+        current_login = ctx.current_login
         
-        if not is_own_pr:
+        # 检查是否是自己的PR
+        if not ctx.is_own_pr:
             return {"error": "只能请求审查自己的PR"}
         
         # 如果没有指定审查者，尝试获取仓库的贡献者
         if not reviewers and not team_reviewers:
             try:
-                contributors = [contributor.login for contributor in repo.get_contributors()]
+                contributors = [contributor.login for contributor in ctx.repo.get_contributors()]
                 # 排除自己
-                contributors = [user for user in contributors if user != current_user.login]
+                contributors = [user for user in contributors if user != current_login]
                 if contributors:
                     reviewers = contributors[:3]  # 最多请求3个审查者
             except Exception:
@@ -764,7 +959,9 @@ def request_pr_review(repo_path: str, pr_number: int, reviewers: str = None, tea
         
         # 创建审查请求
         try:
-            pr.create_review_request(reviewers=reviewers, team_reviewers=team_reviewers)
+            # PyGithub 不接受 None，只传入指定了的审查者
+            pr.create_review_request(**{key: value for key, value in
+                                        (("reviewers", reviewers), ("team_reviewers", team_reviewers)) if value})
             
             return {
                 "status": "success",
@@ -808,54 +1005,90 @@ def list_prs(
         dict: 包含 PR 列表或错误信息
     """
     try:
-        token = os.getenv(token_env)
-        g = Github(token) if token else Github()
-        repo = g.get_repo(repo_path)
-        
+        client = get_github_client(token_env)
+
+        # 本地 PR 存储：超过陈旧上限时先增量同步，再本地查询
+        try:
+            stored = list_stored_prs(client, repo_path, state, sort, direction, limit)
+        except Exception as e:
+            print(f"[github_prstore] 读取 PR 存储失败，直接查询 GitHub: {e}")
+            stored = None
+        if stored is not None:
+            return {
+                "status": "success",
+                "repo": repo_path,
+                "state": state,
+                "total_prs": len(stored["prs"]),
+                "prs": stored["prs"],
+                "token_used": token_env,
+                "api": "store",
+                "age_seconds": stored["age"]
+            }
+
+        # 有 Token 时用一次 GraphQL 查询取回整页 PR 的详情和审查计数，失败时回退到 REST
+        if client.token and supports_pr_query(state, sort, direction):
+            try:
+                pr_list = fetch_pull_requests(client, repo_path, state, sort, direction, limit)
+                return {
+                    "status": "success",
+                    "repo": repo_path,
+                    "state": state,
+                    "total_prs": len(pr_list),
+                    "prs": pr_list,
+                    "token_used": token_env,
+                    "api": "graphql"
+                }
+            except Exception as e:
+                print(f"[list_prs] GraphQL 查询失败，回退到 REST: {e}")
+
+        repo = client.get_repo(repo_path)
+
         # 获取 PR 列表
         pulls = repo.get_pulls(state=state, sort=sort, direction=direction)
-        
+
         pr_list = []
         count = 0
-        for pr in pulls:
-            if count >= limit:
-                break
+        # 逐个 PR 补充详情和审查状态属于批量请求，额度紧张时给交互式请求让行
+        with request_priority(BULK):
+            for pr in pulls:
+                if count >= limit:
+                    break
                 
-            pr_info = {
-                "number": pr.number,
-                "title": pr.title,
-                "body": pr.body[:200] + "..." if pr.body and len(pr.body) > 200 else pr.body,
-                "state": pr.state,
-                "head_branch": pr.head.ref,
-                "base_branch": pr.base.ref,
-                "author": pr.user.login,
-                "created_at": pr.created_at.isoformat(),
-                "updated_at": pr.updated_at.isoformat(),
-                "mergeable": pr.mergeable,
-                "mergeable_state": pr.mergeable_state,
-                "commits": pr.commits,
-                "additions": pr.additions,
-                "deletions": pr.deletions,
-                "changed_files": pr.changed_files,
-                "url": pr.html_url
-            }
+                pr_info = {
+                    "number": pr.number,
+                    "title": pr.title,
+                    "body": pr.body[:200] + "..." if pr.body and len(pr.body) > 200 else pr.body,
+                    "state": pr.state,
+                    "head_branch": pr.head.ref,
+                    "base_branch": pr.base.ref,
+                    "author": pr.user.login,
+                    "created_at": pr.created_at.isoformat(),
+                    "updated_at": pr.updated_at.isoformat(),
+                    "mergeable": pr.mergeable,
+                    "mergeable_state": pr.mergeable_state,
+                    "commits": pr.commits,
+                    "additions": pr.additions,
+                    "deletions": pr.deletions,
+                    "changed_files": pr.changed_files,
+                    "url": pr.html_url
+                }
             
-            # 获取审查状态
-            try:
-                reviews = pr.get_reviews()
-                approvals = sum(1 for review in reviews if review.state == "APPROVED")
-                changes_requested = sum(1 for review in reviews if review.state == "CHANGES_REQUESTED")
+                # 获取审查状态
+                try:
+                    reviews = pr.get_reviews()
+                    approvals = sum(1 for review in reviews if review.state == "APPROVED")
+                    changes_requested = sum(1 for review in reviews if review.state == "CHANGES_REQUESTED")
                 
-                pr_info["review_status"] = {
-                    "approvals": approvals,
-                    "changes_requested": changes_requested,
-                    "total_reviews": reviews.totalCount
-                }
-            except Exception:
-                pr_info["review_status"] = {"approvals": 0, "changes_requested": 0, "total_reviews": 0}
+                    pr_info["review_status"] = {
+                        "approvals": approvals,
+                        "changes_requested": changes_requested,
+                        "total_reviews": reviews.totalCount
+                    }
+                except Exception:
+                    pr_info["review_status"] = {"approvals": 0, "changes_requested": 0, "total_reviews": 0}
             
-            pr_list.append(pr_info)
-            count += 1
+                pr_list.append(pr_info)
+                count += 1
         
         return {
             "status": "success",
@@ -863,7 +1096,8 @@ def list_prs(
             "state": state,
             "total_prs": len(pr_list),
             "prs": pr_list,
-            "token_used": token_env
+            "token_used": token_env,
+            "api": "rest"
         }
         
     except Exception as e:
@@ -903,37 +1137,23 @@ def smart_review_pr(
         if merge_method not in ["merge", "squash", "rebase"]:
             return {"error": "merge_method 必须是 'merge', 'squash', 或 'rebase'"}
         
-        # 首先检查 PR 作者信息
-        author_check = check_pr_author(repo_path, pr_number, token_env)
-        if "error" in author_check:
-            return author_check
-        
-        # 获取 PR 详细信息进行审查
         token = os.getenv(token_env)
         if not token:
             return {"error": f"需要设置 {token_env} 环境变量"}
         
-        g = Github(token)
-        repo = g.get_repo(repo_path)
-        pr = repo.get_pull(pr_number)
+        # PR 元数据、文件列表和当前用户只加载一次，作者检查、审查、评论、合并共用
+        ctx = PRContext.load(repo_path, pr_number, token_env)
+        pr = ctx.pr
+        
+        # 首先检查 PR 作者信息
+        author_check = _check_pr_author(ctx)
+        if "error" in author_check:
+            return author_check
         
         # 收集 PR 信息用于审查
-        files_info = []
-        total_additions = 0
-        total_deletions = 0
-        
-        for file in pr.get_files():
-            file_info = {
-                "filename": file.filename,
-                "status": file.status,
-                "additions": file.additions,
-                "deletions": file.deletions,
-                "changes": file.changes,
-                "patch": file.patch[:2000] + "..." if len(file.patch) > 2000 else file.patch
-            }
-            files_info.append(file_info)
-            total_additions += file.additions
-            total_deletions += file.deletions
+        files_info = ctx.file_summaries(2000)
+        total_additions = sum(file["additions"] for file in files_info)
+        total_deletions = sum(file["deletions"] for file in files_info)
         
         # 构建 PR 摘要
         pr_summary = {
@@ -955,18 +1175,16 @@ def smart_review_pr(
         }
         
         # 执行智能审查逻辑
-        review_result = _perform_intelligent_review(json.dumps(pr_summary), repo)
+        review_result = _perform_intelligent_review(json.dumps(pr_summary), ctx)
         
         # 根据审查结果执行相应操作
         if review_result["decision"] == "approve_and_merge" and auto_merge:
             # 尝试合并 PR
-            merge_result = merge_pr(
-                repo_path=repo_path,
-                pr_number=pr_number,
+            merge_result = _merge_pr(
+                ctx,
                 merge_method=merge_method,
                 commit_title=f"Merge PR #{pr_number}: {pr.title}",
-                commit_message=f"Auto-merged after review: {review_result['summary']}",
-                token_env=token_env
+                commit_message=f"Auto-merged after review: {review_result['summary']}"
             )
             
             if merge_result.get("status") == "success":
@@ -982,7 +1200,7 @@ def smart_review_pr(
             else:
                 # 合并失败，添加审查评论但不合并
                 comment = f"✅ 审查通过，但自动合并失败：{merge_result.get('error', '未知错误')}\n\n{review_result['summary']}"
-                review_result = review_pr(repo_path, pr_number, approve=False, review_comment=comment, token_env=token_env)
+                review_result = _review_pr(ctx, approve=False, review_comment=comment)
                 return {
                     "status": "partial_success",
                     "action": "approved_but_merge_failed",
@@ -995,7 +1213,7 @@ def smart_review_pr(
         elif review_result["decision"] == "request_changes":
             # 要求修改，添加详细评论
             comment = f"❌ 需要修改\n\n{review_result['summary']}\n\n**修改建议：**\n{review_result['suggestions']}"
-            review_result = review_pr(repo_path, pr_number, approve=False, review_comment=comment, token_env=token_env)
+            review_result = _review_pr(ctx, approve=False, review_comment=comment)
             return {
                 "status": "changes_requested",
                 "action": "requested_changes",
@@ -1009,14 +1227,14 @@ def smart_review_pr(
             # 请求人工审查
             if pr_summary["is_own_pr"]:
                 # 如果是自己的PR，请求其他用户审查
-                request_result = request_pr_review(repo_path, pr_number, token_env=token_env)
+                request_result = _request_pr_review(ctx)
                 comment = f"🤔 需要人工审查\n\n{review_result['summary']}\n\n已请求其他用户协助审查。"
             else:
                 # 如果不是自己的PR，添加评论请求更多审查
                 comment = f"🤔 需要进一步审查\n\n{review_result['summary']}\n\n建议请求其他维护者参与审查。"
                 request_result = {"status": "commented"}
             
-            review_result = review_pr(repo_path, pr_number, approve=False, review_comment=comment, token_env=token_env)
+            review_result = _review_pr(ctx, approve=False, review_comment=comment)
             return {
                 "status": "human_review_requested",
                 "action": "requested_human_review",
@@ -1071,82 +1289,7 @@ def review_pr_with_review_token(
         if not token:
             return {"error": f"需要设置 {token_env} 环境变量"}
         
-        g = Github(token)
-        repo = g.get_repo(repo_path)
-        pr = repo.get_pull(pr_number)
-        
-        # 检查是否是自己的PR
-        current_user = g.get_user()
-        is_own_pr = pr.user.login == current_user.login
-        
-        if is_own_pr and approve:
-            return {
-                "error": "无法批准自己的PR",
-                "pr_author": pr.user.login,
-                "current_user": current_user.login,
-                "token_used": token_env,
-                "suggestion": "您可以：1) 使用 request_pr_review 请求其他用户审查，2) 只添加评论而不批准",
-                "can_comment": True
-            }
-        
-        # 获取 PR 文件变更
-        files_changed = []
-        for file in pr.get_files():
-            files_changed.append({
-                "filename": file.filename,
-                "status": file.status,
-                "additions": file.additions,
-                "deletions": file.deletions,
-                "changes": file.changes,
-                "patch": file.patch[:1000] + "..." if len(file.patch) > 1000 else file.patch
-            })
-        
-        # 获取 PR 详情
-        pr_details = {
-            "number": pr.number,
-            "title": pr.title,
-            "body": pr.body,
-            "state": pr.state,
-            "head_branch": pr.head.ref,
-            "base_branch": pr.base.ref,
-            "author": pr.user.login,
-            "created_at": pr.created_at.isoformat(),
-            "updated_at": pr.updated_at.isoformat(),
-            "mergeable": pr.mergeable,
-            "mergeable_state": pr.mergeable_state,
-            "files_changed": files_changed,
-            "commits": pr.commits,
-            "additions": pr.additions,
-            "deletions": pr.deletions,
-            "changed_files": pr.changed_files
-        }
-        
-        # 如果需要批准或添加评论
-        if approve or review_comment:
-            try:
-                # 创建审查
-                if approve:
-                    pr.create_review(
-                        body=review_comment or "LGTM! Approved by ADK Companion.",
-                        event="APPROVE"
-                    )
-                    pr_details["review_action"] = "approved"
-                elif review_comment:
-                    pr.create_review(
-                        body=review_comment,
-                        event="COMMENT"
-                    )
-                    pr_details["review_action"] = "commented"
-                    
-            except Exception as e:
-                return {"error": f"创建审查失败: {str(e)}"}
-        
-        return {
-            "status": "success",
-            "pr_details": pr_details,
-            "token_used": token_env,
-            "message": f"Successfully reviewed PR #{pr_number}"
-        }
+        return _review_pr(PRContext.load(repo_path, pr_number, token_env), approve, review_comment)
         
     except Exception as e:
         return {"error": f"审查 PR 失败: {str(e)}"}
@@ -1182,101 +1325,12 @@ def merge_pr_with_review_token(
         if merge_method not in ["merge", "squash", "rebase"]:
             return {"error": "merge_method 必须是 'merge', 'squash', 或 'rebase'"}
         
-        # 使用审查专用Token
-        token_env = "REVIEW_GITHUB_TOKEN"
-        token = os.getenv(token_env)
-        if not token:
-            return {"error": f"需要设置 {token_env} 环境变量"}
-        
-        g = Github(token)
-        repo = g.get_repo(repo_path)
-        pr = repo.get_pull(pr_number)
-        
-        # 检查 PR 是否可合并
-        if not pr.mergeable:
-            return {
-                "error": "PR 不可合并",
-                "mergeable_state": pr.mergeable_state,
-                "status": pr.raw_data.get('status', 'unknown')
-            }
-        
-        # 检查是否有合并冲突
-        if pr.mergeable_state == "dirty":
-            return {"error": "PR 有合并冲突，无法自动合并"}
-        
-        # 检查是否需要 CI 通过
-        if pr.mergeable_state == "blocked":
-            # 获取状态检查
-            status_checks = []
-            try:
-                for commit in pr.get_commits():
-                    for status in commit.get_status().statuses:
-                        status_checks.append({
-                            "context": status.context,
-                            "state": status.state,
-                            "description": status.description,
-                            "target_url": status.target_url
-                        })
-            except Exception:
-                pass
-            
-            return {
-                "error": "PR 被阻止合并，可能需要 CI 检查通过或审查批准",
-                "status_checks": status_checks
-            }
-        
-        try:
-            # 确保参数格式正确
-            if not commit_message:
-                commit_message = f"Merge PR #{pr_number}"
-            
-            if not commit_title:
-                commit_title = f"Merge pull request #{pr_number} from {pr.head.ref}"
-            
-            merge_result = pr.merge(
-                commit_message=commit_message,
-                commit_title=commit_title,
-                merge_method=merge_method
-            )
-            
-            return {
-                "status": "success",
-                "merged": merge_result.merged,
-                "sha": merge_result.sha,
-                "message": merge_result.message,
-                "pr_number": pr_number,
-                "merge_method": merge_method,
-                "merged_at": merge_result.merged_at.isoformat() if merge_result.merged_at else None,
-                "token_used": token_env
-            }
-            
-        except Exception as e:
-            error_msg = str(e) if e else "未知错误"
-            if not error_msg or error_msg == "None":
-                error_msg = "合并失败，可能是参数错误或权限问题"
-            
-            # 提供更详细的错误信息
-            if "Required status check" in error_msg:
-                return {"error": "合并失败：必需的状态检查未通过"}
-            elif "Review required" in error_msg:
-                return {"error": "合并失败：需要代码审查"}
-            elif "not authorized" in error_msg.lower():
-                return {"error": "合并失败：没有权限合并此 PR"}
-            elif "merge conflict" in error_msg.lower():
-                return {"error": "合并失败：存在合并冲突"}
-            elif "Base branch was modified" in error_msg:
-                return {"error": "合并失败：基础分支已被修改，请更新PR"}
-            elif "Pull Request is not mergeable" in error_msg:
-                return {"error": "合并失败：PR不可合并"}
-            else:
-                return {"error": f"合并失败: {error_msg}"}
+        # 使用审查专用Token，检查与合并逻辑与 merge_pr 共用
+        return merge_pr(repo_path, pr_number, merge_method, commit_title, commit_message,
+                        token_env="REVIEW_GITHUB_TOKEN")
         
     except Exception as e:
-        # 外层异常处理
-        error_msg = str(e) if e else "未知错误"
-        if not error_msg or error_msg == "None":
-            error_msg = "合并PR操作失败，可能是参数错误或网络问题"
-        return {"error": f"合并 PR 失败: {error_msg}"}
+        return {"error": f"合并 PR 失败: {str(e)}"}
 
 def check_pr_author_with_review_token(
     repo_path: str,
@@ -1300,34 +1354,8 @@ def check_pr_author_with_review_token(
         if not pr_number or not isinstance(pr_number, int):
             return {"error": "pr_number 必须是有效的整数"}
         
-        # 使用审查专用Token
-        token_env = "REVIEW_GITHUB_TOKEN"
-        token = os.getenv(token_env)
-        if not token:
-            return {"error": f"需要设置 {token_env} 环境变量"}
-        
-        g = Github(token)
-        repo = g.get_repo(repo_path)
-        pr = repo.get_pull(pr_number)
-        
-        # 获取当前用户信息
-        current_user = g.get_user()
-        
-        # 检查是否是自己的PR
-        is_own_pr = pr.user.login == current_user.login
-        
-        return {
-            "status": "success",
-            "pr_number": pr_number,
-            "pr_author": pr.user.login,
-            "current_user": current_user.login,
-            "is_own_pr": is_own_pr,
-            "pr_title": pr.title,
-            "pr_state": pr.state,
-            "can_approve": not is_own_pr,
-            "token_used": token_env,
-            "message": "这是您自己的PR，无法自己批准" if is_own_pr else "可以批准此PR"
-        }
+        # 使用审查专用Token，与 check_pr_author 共用 PR 存储和 PRContext
+        return check_pr_author(repo_path, pr_number, token_env="REVIEW_GITHUB_TOKEN")
         
     except Exception as e:
         return {"error": f"检查 PR 作者失败: {str(e)}"}
@@ -1387,13 +1415,32 @@ def list_prs_with_review_token(
         token_env="REVIEW_GITHUB_TOKEN"
     )
 
-def _perform_intelligent_review(pr_summary_json: str, repo) -> dict:
+def get_github_api_stats() -> dict:
+    """
+    查看 GitHub API 调用统计
+
+    Returns:
+        dict: 条件请求缓存和 blob 内容缓存的命中/未命中/写入/淘汰次数、命中率和缓存大小，
+              每个 Token 的速率限制剩余额度和调度统计（节流、让行、限流重试次数），
+              GitHub / GitLab 相同并发请求的合并次数（singleflight），本地裸镜像的同步和读取次数，
+              以及 PR 存储的同步和本地查询次数
+    """
+    return {
+        "http_cache": get_cache_stats(),
+        "blob_cache": get_blob_cache_stats(),
+        "rate_limits": get_scheduler().snapshot(),
+        "singleflight": get_singleflight_stats(),
+        "mirrors": get_mirror_stats(),
+        "pr_store": get_pr_store_stats()
+    }
+
+def _perform_intelligent_review(pr_summary_json: str, ctx: PRContext) -> dict:
     """
     执行智能审查逻辑
     
     Args:
         pr_summary_json: PR 摘要信息 (JSON 字符串)
-        repo: GitHub 仓库对象
+        ctx: PR 上下文（已加载的仓库、PR 和文件列表，不再发出额外请求）
     
     Returns:
         dict: 审查结果
@@ -1445,8 +1492,8 @@ def _perform_intelligent_review(pr_summary_json: str, repo) -> dict:
         if filename.endswith((".py", ".js", ".ts", ".java", ".cpp", ".c", ".go", ".rs")):
             has_code = True
             
-            # 简单的代码质量检查
-            patch = file_info["patch"]
+            # 简单的代码质量检查（GitHub 对大文件和二进制文件不返回 patch）
+            patch = file_info["patch"] or ""
             if "TODO" in patch or "FIXME" in patch:
                 issues.append(f"文件 {file_info['filename']} 包含未完成的 TODO/FIXME")
                 score -= 5
@@ -0,0 +1,108 @@
+"""
+read_adk_codebase 基准测试：对比全量扫描与索引查询（关键词与正则）
+
+用法:
+    python benchmarks/bench_read_adk_codebase.py
+    python benchmarks/bench_read_adk_codebase.py --root /path/to/pkg --keywords LlmAgent ToolContext
+    python benchmarks/bench_read_adk_codebase.py --regexes "class \\w+Agent\\("
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from adk_companion.adk_builder import get_worker_count
+from adk_companion.adk_index import AdkIndex, scan_keyword, scan_regex, get_adk_version
+from adk_companion.adk_pack import KnowledgePack, write_pack
+from adk_companion.adk_symbols import SymbolTable
+
+DEFAULT_KEYWORDS = ["LlmAgent", "ToolContext", "before_model_callback", "session_service", "run_async"]
+DEFAULT_REGEXES = [r"class \w+Agent\(", r"def _run_async_impl\(", r"async def \w+_callback"]
+
+
+def find_adk_root():
+    try:
+        import google.adk
+        return Path(google.adk.__file__).parent
+    except ImportError:
+        return None
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--root", type=Path, help="要搜索的源码目录（默认使用已安装的 google.adk）")
+    parser.add_argument("--keywords", nargs="+", default=DEFAULT_KEYWORDS)
+    parser.add_argument("--regexes", nargs="*", default=DEFAULT_REGEXES)
+    parser.add_argument("--max-results", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=get_worker_count(), help="并行构建使用的进程数")
+    args = parser.parse_args()
+
+    root = args.root or find_adk_root()
+    if not root:
+        print("ADK 未安装在当前环境中，请使用 --root 指定源码目录")
+        return 1
+
+    version = get_adk_version()
+    with tempfile.TemporaryDirectory() as tmp:
+        index_path = Path(tmp) / "inverted_index.json"
+
+        start = time.perf_counter()
+        AdkIndex.build(root, version, workers=1)
+        serial_build_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        index = AdkIndex.build(root, version, workers=args.workers)
+        build_ms = (time.perf_counter() - start) * 1000
+        index.save(index_path)
+
+        start = time.perf_counter()
+        index = AdkIndex.load(index_path, root)
+        load_ms = (time.perf_counter() - start) * 1000
+
+        pack_path = Path(tmp) / "knowledge.pack"
+        write_pack(pack_path, index, SymbolTable.build(root, version, workers=args.workers))
+        start = time.perf_counter()
+        KnowledgePack(pack_path, root).index()
+        pack_ms = (time.perf_counter() - start) * 1000
+
+        print(f"源码目录: {root}")
+        print(f"文件数: {len(index.files)}  词表大小: {len(index.postings)}  trigram 数: {len(index.trigrams)}  "
+              f"索引大小: {index_path.stat().st_size / 1024:.0f} KiB")
+        print(f"单进程构建: {serial_build_ms:.1f} ms  {args.workers} 进程并行构建: {build_ms:.1f} ms  "
+              f"加载索引: {load_ms:.1f} ms  mmap 打开知识包: {pack_ms:.1f} ms\n")
+
+        # 关键词查询：全量扫描返回文件开头 500 字符，索引查询返回 BM25 排序后的命中窗口，
+        # 因此只比较耗时和输出字符数；正则查询两者格式一致，额外校验结果相同
+        cases = [(keyword, scan_keyword, index.search, False) for keyword in args.keywords]
+        cases += [(pattern, scan_regex, index.search_regex, True) for pattern in args.regexes]
+        print(f"{'查询':<28}{'全量扫描(ms)':>14}{'索引查询(ms)':>14}{'加速比':>10}{'输出字符(扫描/索引)':>24}")
+        for query, scan_fn, index_fn, check in cases:
+            scan_ms = timed(lambda: scan_fn(root, query, args.max_results), args.repeat)
+            index_ms = timed(lambda: index_fn(query, args.max_results), args.repeat)
+            scan_results = scan_fn(root, query, args.max_results)
+            index_results = index_fn(query, args.max_results)
+            if check and scan_results != index_results:
+                print(f"  警告: 查询 {query!r} 的索引结果与全量扫描不一致")
+            speedup = scan_ms / index_ms if index_ms else float("inf")
+            chars = f"{sum(map(len, scan_results))}/{sum(map(len, index_results))}"
+            print(f"{query:<28}{scan_ms:>14.2f}{index_ms:>14.2f}{speedup:>9.1f}x{chars:>24}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
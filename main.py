@@ -0,0 +1,17 @@
+"""
+ADK Companion Web 应用
+与 `adk web` 相同的 ADK FastAPI 应用（Web UI + API），另外挂载 GitHub webhook 路由（POST /webhooks/github）。
+启动：uvicorn main:app --host 0.0.0.0 --port 8000
+"""
+
+import os
+
+from google.adk.cli.fast_api import get_fast_api_app
+
+from adk_companion.github_webhook import router as github_webhook_router
+
+# 智能体所在目录（adk_companion 包的上一级），与在仓库根目录执行 `adk web` 相同
+AGENTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+app = get_fast_api_app(agents_dir=AGENTS_DIR, web=True)
+app.include_router(github_webhook_router)
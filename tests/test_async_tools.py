@@ -0,0 +1,205 @@
+"""
+async_tools 对本地测试桩的端到端测试
+在本机启动一个最小的 GitHub REST / GraphQL 测试桩，通过 GITHUB_API_URL 把异步客户端指向它，
+覆盖 review_pr、list_prs、merge_pr 的主要分支，并确认条件请求缓存的 SQLite 读写不在事件循环线程中执行。
+运行：python -m pytest tests 或 python -m unittest discover tests
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from adk_companion import github_async
+from adk_companion.async_tools import list_prs, merge_pr, review_pr
+from adk_companion.github_cache import get_response_cache
+
+
+def _pull(number: int, author: str, mergeable_state: str = "clean") -> dict:
+    return {
+        "number": number,
+        "title": f"PR {number}",
+        "body": "body",
+        "state": "open",
+        "head": {"ref": f"feature-{number}", "sha": f"head{number}"},
+        "base": {"ref": "main", "sha": "base"},
+        "user": {"login": author},
+        "created_at": "2024-01-01T00:00:00Z",
+        "updated_at": "2024-01-02T00:00:00Z",
+        "merged_at": None,
+        "mergeable": True,
+        "mergeable_state": mergeable_state,
+        "commits": 1,
+        "additions": 3,
+        "deletions": 1,
+        "changed_files": 1,
+        "html_url": f"https://github.com/o/r/pull/{number}",
+    }
+
+
+PULLS = {1: _pull(1, "bob"), 2: _pull(2, "alice"), 3: _pull(3, "bob", "dirty"), 4: _pull(4, "bob")}
+FILES = [{"filename": "a.py", "status": "modified", "additions": 3, "deletions": 1, "changes": 4,
+          "patch": "@@ -1 +1 @@\n-a\n+b\n"}]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """GitHub API 测试桩：PR 详情带 ETag，GraphQL 一律返回错误以走 REST 路径"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, payload=None, etag: str = None):
+        body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        path = self.path.split("?")[0]
+        self.server.requests.append((self.command, path, body))
+
+        if path == "/user":
+            return self._send(200, {"login": "alice"})
+        if path == "/graphql":
+            return self._send(200, {"errors": [{"message": "not supported by stub"}]})
+        if path == "/repos/o/r/pulls":
+            return self._send(200, [PULLS[1], PULLS[2]])
+        parts = path.split("/")
+        if len(parts) >= 6 and parts[:5] == ["", "repos", "o", "r", "pulls"] and parts[5].isdigit():
+            pull = PULLS.get(int(parts[5]))
+            if pull is None:
+                return self._send(404, {"message": "Not Found"})
+            rest = parts[6:]
+            if not rest:
+                etag = f'"pull-{pull["number"]}"'
+                if self.headers.get("If-None-Match") == etag:
+                    return self._send(304, etag=etag)
+                return self._send(200, pull, etag=etag)
+            if rest == ["files"]:
+                return self._send(200, FILES)
+            if rest == ["reviews"] and self.command == "GET":
+                return self._send(200, [{"state": "APPROVED"}])
+            if rest == ["reviews"]:
+                return self._send(200, {"id": 1, "state": body["event"]})
+            if rest == ["merge"]:
+                return self._send(200, {"merged": True, "sha": "merged-sha", "message": "Pull Request successfully merged"})
+        return self._send(404, {"message": "Not Found"})
+
+    do_GET = do_POST = do_PUT = _handle
+
+
+class AsyncToolsTest(unittest.IsolatedAsyncioTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        cls.server.requests = []
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.env = mock.patch.dict(os.environ, {
+            "GITHUB_API_URL": f"http://127.0.0.1:{cls.server.server_port}",
+            "GITHUB_TOKEN": "stub-token",
+            "GITHUB_CACHE_DIR": os.path.join(cls.tmp.name, "http"),
+            "GITHUB_BLOB_CACHE_DIR": os.path.join(cls.tmp.name, "blobs"),
+            "GITHUB_PR_STORE": "0",
+            "GITHUB_MIRROR": "0",
+        })
+        cls.env.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.env.stop()
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.tmp.cleanup()
+
+    def setUp(self):
+        self.server.requests.clear()
+
+    async def asyncTearDown(self):
+        await github_async.close_async_github_clients()
+
+    def requested(self, method: str, path: str) -> list:
+        return [body for m, p, body in self.server.requests if (m, p) == (method, path)]
+
+    async def test_review_pr_comments_with_files(self):
+        result = await review_pr("o/r", 1, review_comment="looks fine")
+
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(result["pr_details"]["author"], "bob")
+        self.assertEqual(result["pr_details"]["review_action"], "commented")
+        self.assertEqual(result["pr_details"]["files_changed"][0]["filename"], "a.py")
+        self.assertEqual(self.requested("POST", "/repos/o/r/pulls/1/reviews"),
+                         [{"body": "looks fine", "event": "COMMENT"}])
+
+    async def test_review_pr_refuses_to_approve_own_pr(self):
+        result = await review_pr("o/r", 2, approve=True)
+
+        self.assertEqual(result["error"], "无法批准自己的PR")
+        self.assertEqual(self.requested("POST", "/repos/o/r/pulls/2/reviews"), [])
+
+    async def test_list_prs_falls_back_to_rest(self):
+        result = await list_prs("o/r", limit=5)
+
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(result["api"], "rest")
+        self.assertEqual([pr["number"] for pr in result["prs"]], [1, 2])
+        self.assertEqual(result["prs"][0]["review_status"]["approvals"], 1)
+        self.assertEqual(result["prs"][0]["created_at"], "2024-01-01T00:00:00+00:00")
+
+    async def test_merge_pr(self):
+        result = await merge_pr("o/r", 1, merge_method="squash")
+
+        self.assertEqual(result["status"], "success")
+        self.assertTrue(result["merged"])
+        self.assertEqual(result["sha"], "merged-sha")
+        self.assertEqual(self.requested("PUT", "/repos/o/r/pulls/1/merge"), [{"merge_method": "squash"}])
+
+    async def test_merge_pr_refuses_conflicts(self):
+        result = await merge_pr("o/r", 3)
+
+        self.assertEqual(result["error"], "PR 有合并冲突，无法自动合并")
+        self.assertEqual(self.requested("PUT", "/repos/o/r/pulls/3/merge"), [])
+
+    async def test_response_cache_runs_off_the_event_loop(self):
+        cache = get_response_cache()
+        calls = []
+
+        def recording(name):
+            method = getattr(cache, name)
+
+            def wrapper(*args, **kwargs):
+                try:
+                    asyncio.get_running_loop()
+                    calls.append((name, "event loop"))
+                except RuntimeError:
+                    calls.append((name, "worker thread"))
+                return method(*args, **kwargs)
+            return wrapper
+
+        with mock.patch.object(cache, "get", recording("get")), \
+                mock.patch.object(cache, "put", recording("put")), \
+                mock.patch.object(cache, "touch", recording("touch")):
+            client = github_async.get_async_github_client()
+            # 第一次未命中并写入缓存，第二次带 If-None-Match 得到 304
+            await client.get_json("/repos/o/r/pulls/4")
+            await client.get_json("/repos/o/r/pulls/4")
+
+        self.assertEqual({name for name, _ in calls}, {"get", "put", "touch"})
+        self.assertEqual({where for _, where in calls}, {"worker thread"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+"""
+github_mirror 对本地 file:// 远端的测试
+在临时目录中建一个 git 仓库作为远端，通过 GITHUB_MIRROR_REMOTE 把镜像指向它，
+确认 read_github_repo 的文件和目录读取由镜像提供，pull_diff 返回相对合并基础的 hunk，
+以及包含 .. 的仓库路径不能逃出镜像目录。
+运行：python -m pytest tests 或 python -m unittest discover tests
+"""
+
+import os
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from adk_companion.github_mirror import get_mirror, is_valid_repo_path, pull_diff
+from adk_companion.tools import read_github_repo
+
+
+def _git(cwd: Path, *args) -> str:
+    return subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", "-c", "init.defaultBranch=main",
+         *args],
+        cwd=cwd, check=True, capture_output=True, text=True,
+    ).stdout.strip()
+
+
+class MirrorTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        root = Path(cls.tmp.name)
+        remote = root / "remotes" / "o" / "r"
+        remote.mkdir(parents=True)
+        _git(remote, "init", "-q")
+        (remote / "src").mkdir()
+        (remote / "README.md").write_text("# r\n")
+        (remote / "src" / "app.py").write_text("def main():\n    return 1\n")
+        _git(remote, "add", "-A")
+        _git(remote, "commit", "-qm", "init")
+
+        # PR 分支：修改 app.py 并新增文件
+        _git(remote, "checkout", "-qb", "feature")
+        (remote / "src" / "app.py").write_text("def main():\n    return 2\n")
+        (remote / "src" / "util.py").write_text("X = 1\n")
+        _git(remote, "add", "-A")
+        _git(remote, "commit", "-qm", "feature")
+        cls.head = _git(remote, "rev-parse", "HEAD")
+
+        # 分叉后 main 又前进了一个提交，它的改动不应出现在 PR 的 diff 中
+        _git(remote, "checkout", "-q", "main")
+        (remote / "README.md").write_text("# r\n\nmoved on\n")
+        _git(remote, "commit", "-qam", "main moves")
+        cls.base = _git(remote, "rev-parse", "HEAD")
+        # 与来自 fork 的 PR 一样，头提交只能通过 refs/pull/<编号>/head 取到
+        _git(remote, "branch", "-D", "feature")
+        _git(remote, "update-ref", "refs/pull/1/head", cls.head)
+
+        cls.mirror_dir = root / "mirrors"
+        cls.env = mock.patch.dict(os.environ, {
+            "GITHUB_MIRROR": "1",
+            "GITHUB_MIRROR_DIR": str(cls.mirror_dir),
+            "GITHUB_MIRROR_REMOTE": f"file://{root}/remotes/{{repo}}",
+            # 镜像读取失败时会改用 API，指向不可用的地址让这种情况直接失败
+            "GITHUB_API_URL": "http://127.0.0.1:9",
+            "GITHUB_TOKEN": "stub-token",
+            "GITHUB_CACHE_DIR": str(root / "http"),
+            "GITHUB_PR_STORE": "0",
+        })
+        cls.env.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.env.stop()
+        cls.tmp.cleanup()
+
+    def test_file_read_is_served_from_mirror(self):
+        result = read_github_repo("o/r", file_path="src/app.py")
+
+        self.assertEqual(result["source"], "mirror")
+        self.assertEqual(result["content"], "def main():\n    return 1\n")
+
+    def test_tree_read_is_served_from_mirror(self):
+        result = read_github_repo("o/r", max_files=10)
+
+        self.assertEqual(result["source"], "mirror")
+        self.assertEqual(result["total_files"], 2)
+        self.assertIn("src/app.py", [entry["path"] for entry in result["file_tree"]])
+
+    def test_missing_file_is_reported(self):
+        result = read_github_repo("o/r", file_path="src/missing.py")
+
+        self.assertIn("文件不存在", result["error"])
+
+    def test_pull_diff_is_relative_to_merge_base(self):
+        files = {file["filename"]: file for file in pull_diff("o/r", 1, self.base, self.head)}
+
+        self.assertEqual(sorted(files), ["src/app.py", "src/util.py"])
+        self.assertEqual(files["src/app.py"]["status"], "modified")
+        self.assertEqual((files["src/app.py"]["additions"], files["src/app.py"]["deletions"]), (1, 1))
+        self.assertTrue(files["src/app.py"]["patch"].startswith("@@ "))
+        self.assertIn("-    return 1\n+    return 2", files["src/app.py"]["patch"])
+        self.assertEqual(files["src/util.py"]["status"], "added")
+        self.assertNotIn("truncated", files["src/app.py"])
+
+    def test_pull_diff_budget(self):
+        files = pull_diff("o/r", 1, self.base, self.head, total_limit=10)
+
+        self.assertTrue(all(file["truncated"] for file in files))
+        self.assertEqual(sum(len(file["patch"] or "") for file in files), len("...") + 10)
+
+    def test_repo_path_escapes_are_rejected(self):
+        for repo_path in ("../x", "o/..", "../../etc", "o/../r", "..", "o/r/..", "/o/r", "o", ""):
+            with self.subTest(repo_path=repo_path):
+                self.assertFalse(is_valid_repo_path(repo_path))
+                with self.assertRaises(ValueError):
+                    get_mirror(repo_path)
+        self.assertIn("无效的仓库路径", read_github_repo("../x")["error"])
+        # 被拒绝的路径没有在镜像目录之外创建镜像
+        self.assertFalse((self.mirror_dir.parent / "x.git").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
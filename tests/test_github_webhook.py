@@ -0,0 +1,162 @@
+"""
+github_webhook 对临时 PR 存储的测试
+把 fixtures/webhook_deliveries.jsonl 中记录的 pull_request、pull_request_review、status、check_run 事件
+重放到临时目录中的 PR 存储，检查重复投递的去重、审查计数和检查状态汇总；
+再通过 FastAPI 路由确认签名缺失或错误的投递被拒绝，且不会修改存储。
+运行：python -m pytest tests 或 python -m unittest discover tests
+"""
+
+import hashlib
+import hmac
+import json
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from adk_companion import github_prstore
+from adk_companion.github_prstore import PRStore
+from adk_companion.github_webhook import apply_event, replay, router
+
+FIXTURE = Path(__file__).parent / "fixtures" / "webhook_deliveries.jsonl"
+SCOPE = "test-scope"
+SECRET = "webhook-secret"
+
+
+def _load_fixture() -> list:
+    with open(FIXTURE, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class WebhookReplayTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = PRStore(Path(self.tmp.name) / "prs.sqlite3")
+        # 事件只应用到已同步过该仓库的分区
+        self.store.mark_synced(SCOPE, "o/r", time.time(), None)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_replay_dedupes_redelivered_events(self):
+        counts = replay(FIXTURE, self.store)
+
+        self.assertEqual(counts, {"applied": 7, "duplicate": 3})
+        # 再次重放时所有投递都已处理过
+        self.assertEqual(replay(FIXTURE, self.store), {"duplicate": 10})
+
+    def test_replay_counts_reviews(self):
+        replay(FIXTURE, self.store)
+
+        pr = self.store.get(SCOPE, "o/r", 7)
+        self.assertEqual(pr["review_status"], {"approvals": 1, "changes_requested": 1, "total_reviews": 3})
+        # 审查事件中的 PR 不含统计字段，沿用 pull_request 事件写入的值
+        self.assertEqual(pr["additions"], 14)
+        self.assertEqual(pr["author"], "carol")
+
+    def test_dismissed_review_decrements_its_counter(self):
+        replay(FIXTURE, self.store)
+        approved = next(entry for entry in _load_fixture() if entry["delivery"] == "d-review-1")
+        dismissed = dict(approved["payload"], action="dismissed",
+                         review=dict(approved["payload"]["review"], state="dismissed"))
+
+        result = apply_event("pull_request_review", dismissed, "d-review-1-dismissed", self.store)
+
+        self.assertEqual(result["status"], "applied")
+        self.assertEqual(self.store.get(SCOPE, "o/r", 7)["review_status"],
+                         {"approvals": 0, "changes_requested": 1, "total_reviews": 3})
+
+    def test_replay_rolls_up_checks(self):
+        replay(FIXTURE, self.store)
+
+        self.assertEqual(self.store.get(SCOPE, "o/r", 7)["checks_state"], "success")
+        failed = {"action": "completed", "repository": {"full_name": "o/r"},
+                  "check_run": {"head_sha": "abc123", "name": "tests", "status": "completed",
+                                "conclusion": "failure"}}
+        apply_event("check_run", failed, "d-check-2", self.store)
+        self.assertEqual(self.store.get(SCOPE, "o/r", 7)["checks_state"], "failure")
+
+    def test_new_head_drops_previous_checks(self):
+        replay(FIXTURE, self.store)
+        opened = _load_fixture()[0]["payload"]
+        pull = dict(opened["pull_request"], updated_at="2024-05-02T09:00:00Z",
+                    head=dict(opened["pull_request"]["head"], sha="def456"))
+
+        apply_event("pull_request", dict(opened, action="synchronize", pull_request=pull), "d-pr-sync", self.store)
+
+        pr = self.store.get(SCOPE, "o/r", 7)
+        self.assertEqual(pr["head_sha"], "def456")
+        self.assertIsNone(pr["checks_state"])
+        self.assertEqual(pr["review_status"]["approvals"], 1)
+
+
+class WebhookRouteTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = PRStore(Path(self.tmp.name) / "prs.sqlite3")
+        self.store.mark_synced(SCOPE, "o/r", time.time(), None)
+        # 路由使用进程内共享的存储，这里换成临时存储
+        self.patches = [
+            mock.patch.dict(os.environ, {"GITHUB_PR_STORE": "1", "GITHUB_WEBHOOK_SECRET": SECRET}),
+            mock.patch.object(github_prstore, "_store", self.store),
+        ]
+        for patch in self.patches:
+            patch.start()
+        self.entry = _load_fixture()[0]
+        self.body = json.dumps(self.entry["payload"]).encode("utf-8")
+        app = FastAPI()
+        app.include_router(router)
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        for patch in reversed(self.patches):
+            patch.stop()
+        self.tmp.cleanup()
+
+    def post(self, signature: str = None):
+        headers = {"X-GitHub-Event": self.entry["event"], "X-GitHub-Delivery": self.entry["delivery"],
+                   "Content-Type": "application/json"}
+        if signature is not None:
+            headers["X-Hub-Signature-256"] = signature
+        return self.client.post("/webhooks/github", content=self.body, headers=headers)
+
+    def sign(self, secret: str) -> str:
+        return "sha256=" + hmac.new(secret.encode(), self.body, hashlib.sha256).hexdigest()
+
+    def assert_untouched(self):
+        self.assertFalse(self.store.has_delivery(self.entry["delivery"]))
+        self.assertIsNone(self.store.get(SCOPE, "o/r", 7))
+
+    def test_missing_signature_is_rejected(self):
+        self.assertEqual(self.post().status_code, 401)
+        self.assert_untouched()
+
+    def test_wrong_signature_is_rejected(self):
+        self.assertEqual(self.post(self.sign("not-the-secret")).status_code, 401)
+        self.assertEqual(self.post("sha1=" + hashlib.sha1(self.body).hexdigest()).status_code, 401)
+        self.assert_untouched()
+
+    def test_unconfigured_secret_rejects_everything(self):
+        with mock.patch.dict(os.environ, {"GITHUB_WEBHOOK_SECRET": ""}):
+            self.assertEqual(self.post(self.sign(SECRET)).status_code, 503)
+        self.assert_untouched()
+
+    def test_signed_delivery_is_applied_once(self):
+        first = self.post(self.sign(SECRET))
+        second = self.post(self.sign(SECRET))
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.json()["status"], "applied")
+        self.assertEqual(second.json()["status"], "duplicate")
+        self.assertEqual(self.store.get(SCOPE, "o/r", 7)["title"], "Add retry to uploader")
+
+
+if __name__ == "__main__":
+    unittest.main()